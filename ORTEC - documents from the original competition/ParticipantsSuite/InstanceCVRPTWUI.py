@@ -1,9 +1,17 @@
 #! /usr/bin/env python
 
-import argparse
+import argparse, io, struct, sys
 import xml.etree.ElementTree as ET
 import math
+from array import array
+from operator import add
+from itertools import chain
 import baseCVRPTWUI as base
+import profileCVRPTWUI as profiling
+import distanceCVRPTWUI as distances
+import spatialCVRPTWUI as spatial
+import calendarCVRPTWUI as calendars
+import boundsCVRPTWUI as bounds
 from pprint import pprint as pprint
 
 class InstanceCVRPTWUI(base.BaseParser):
@@ -68,8 +76,19 @@ class InstanceCVRPTWUI(base.BaseParser):
             vehicleCost = 'fix_cost'
             vehicleDayCost = 'cost_x_time'
             distanceCost = 'cost_x_distance'
+        # Binary instance file, little endian: the header, the dataset and name in utf-8, and then int64 columns
+        # for the tools (weight, amount, cost), the coordinates (X, Y) and the requests (node, from-day, to-day,
+        # number of days, tool, tool count), followed by the optional distance matrix with distanceSize bytes
+        # per distance. The IDs are not stored, they follow from the positions.
+        class BIN:
+            magic = b'CVRPINST'
+            version = 1
+            # magic, version, distanceSize, days, capacity, max trip distance, depot, vehicle cost,
+            # vehicle day cost, distance cost, number of tools, coordinates and requests, dataset and name length
+            header = struct.Struct('<8sHBx7q3Q2I')
     
     class Tool(object):
+        __slots__ = ('ID','weight','amount','cost')
         def __init__(self,ID,weight,amount,cost):
             self.ID = ID
             self.weight = weight
@@ -79,6 +98,7 @@ class InstanceCVRPTWUI(base.BaseParser):
             return '%d\t%d\t%d\t%d' % (self.ID,self.weight,self.amount, self.cost)
     
     class Request(object):
+        __slots__ = ('ID','node','fromDay','toDay','numDays','tool','toolCount')
         def __init__(self,ID,node,fromDay,toDay,numDays,tool,toolCount):
             self.ID = ID
             self.node = node
@@ -91,6 +111,7 @@ class InstanceCVRPTWUI(base.BaseParser):
             return '%d\t%d\t%d\t%d\t%d\t%d\t%d' % (self.ID,self.node,self.fromDay,self.toDay,self.numDays,self.tool,self.toolCount)
     
     class Coordinate(object):
+        __slots__ = ('ID','X','Y')
         def __init__(self,ID,X,Y):
             self.ID = ID
             self.X = X
@@ -98,11 +119,23 @@ class InstanceCVRPTWUI(base.BaseParser):
         def __repr__(self):
             return '%d\t%d\t%d' % (self.ID,self.X,self.Y)
     
-    def __init__(self, inputfile=None,filetype=None,continueOnErr=False):
+    def __init__(self, inputfile=None,filetype=None,continueOnErr=False,distanceEngine='list',distanceCache=False):
+        if distanceEngine not in distances.ENGINES:
+            raise ValueError("Unknown distance engine '%s', expected one of: %s." % (distanceEngine, ', '.join(distances.ENGINES)))
+        self.distanceEngine = distanceEngine
+        self.distanceCache = distanceCache
         if inputfile is not None:
             self._doinit(inputfile,filetype,continueOnErr)
         else:
+            self.inputfile = None
+            self.errorReport = []
+            self.warningReport = []
             self._initData()
+        if self.distanceEngine == 'numpy' and not distances.hasNumpy():
+            self.warningReport.append( "NumPy is not available, using the 'list' distance engine." )
+            self.distanceEngine = 'list'
+        if self.distanceCache and self.distanceEngine != 'numpy':
+            self.warningReport.append( "The distance cache is only used with the 'numpy' distance engine." )
         
     def _initData(self):
         self.Tools = []
@@ -110,6 +143,42 @@ class InstanceCVRPTWUI(base.BaseParser):
         self.Coordinates = []
         self.ReadDistance = None
         self.calcDistance = None
+        self.lazyDistance = None
+        self.requestNode = self.requestTool = self.requestToolCount = None
+        self.toolWeight = self.coordX = self.coordY = None
+        self.spatialIndex = None
+        self.calendar = None
+        self.lowerBounds = None
+    
+    # Flat lists with the fields used while checking solutions, indexed like Requests, Tools and Coordinates.
+    # They share the int objects with the records, so they only add one pointer per value.
+    def buildArrays(self):
+        if self.requestNode is not None:
+            return
+        self.requestNode = [r.node for r in self.Requests]
+        self.requestTool = [r.tool for r in self.Requests]
+        self.requestToolCount = [r.toolCount for r in self.Requests]
+        self.toolWeight = [t.weight for t in self.Tools]
+        self.coordX = [c.X for c in self.Coordinates]
+        self.coordY = [c.Y for c in self.Coordinates]
+    
+    # Grid index over the request locations for nearest neighbour and radius queries, see GridIndex
+    def buildSpatialIndex(self):
+        if self.spatialIndex is None:
+            self.spatialIndex = spatial.GridIndex(self.Coordinates,sorted(set(r.node for r in self.Requests)))
+        return self.spatialIndex
+    
+    # Requests per day and the tools in use in every schedule, see RequestCalendar
+    def buildCalendar(self):
+        if self.calendar is None:
+            self.calendar = calendars.RequestCalendar(self)
+        return self.calendar
+    
+    # Lower bounds on the cost fields of every solution, see LowerBounds
+    def buildLowerBounds(self):
+        if self.lowerBounds is None:
+            self.lowerBounds = bounds.LowerBounds(self)
+        return self.lowerBounds
     
     def _initTXT(self):
         try:
@@ -118,91 +187,182 @@ class InstanceCVRPTWUI(base.BaseParser):
             self.errorReport.append( 'Instance file %s could not be read.' % self.inputfile )
             return
         
+        with fd:
+            text = fd.read()
+        if not self._initTXTBlocks(text):
+            # read the file again line by line to find the detailed error messages
+            self._initData()
+            self._readTXTLines(io.StringIO(text))
+            
+    # Fast path: parses every section as one block and validates it in bulk. It only accepts
+    # instances that _readTXTLines also accepts, anything else returns False without reporting.
+    def _initTXTBlocks(self,text):
         try:
-            with fd:
-                self.Dataset = self._checkAssignment(fd,self.LANG.TXT.dataset,'string')
-                self.Name = self._checkAssignment(fd,self.LANG.TXT.name,'string')
-                
-                self.Days = self._checkInt( 'Days', self._checkAssignment(fd,self.LANG.TXT.days) )
-                self.Capacity = self._checkInt( 'Capacity', self._checkAssignment(fd,self.LANG.TXT.capacity) )
-                self.MaxDistance = self._checkInt( 'Max trip distance', self._checkAssignment(fd,self.LANG.TXT.maxTripDistance) )
-                self.DepotCoordinate = self._checkInt( 'Depot', self._checkAssignment(fd,self.LANG.TXT.depot) )
+            lines = list(filter(None, map(str.strip, text.split('\n'))))
+            pos = 0
+            header = []
+            for key in (self.LANG.TXT.dataset, self.LANG.TXT.name, self.LANG.TXT.days, self.LANG.TXT.capacity, self.LANG.TXT.maxTripDistance,
+                        self.LANG.TXT.depot, self.LANG.TXT.vehicleCost, self.LANG.TXT.vehicleDayCost, self.LANG.TXT.distanceCost):
+                splitLine = lines[pos].split(None,2)
+                if len(splitLine) != 3 or splitLine[0] != key or splitLine[1] != '=':
+                    return False
+                header.append(splitLine[2])
+                pos += 1
+            Dataset, Name = header[:2]
+            Days, Capacity, MaxDistance, DepotCoordinate, VehicleCost, VehicleDayCost, DistanceCost = [int(x) for x in header[2:]]
+            
+            def readBlock(key,width):
+                splitLine = lines[pos].split(None,2)
+                if len(splitLine) != 3 or splitLine[0] != key or splitLine[1] != '=':
+                    return None
+                count = int(splitLine[2])
+                rows = list(map(str.split, lines[pos+1:pos+1+count]))
+                if count < 0 or len(rows) != count or (rows and set(map(len,rows)) != {width}):
+                    return None
+                values = list(map(int, chain.from_iterable(rows)))
+                return [values[i::width] for i in range(width)]
+            
+            tools = readBlock(self.LANG.TXT.tools,4)
+            if tools is None:
+                return False
+            toolIDs, weights, amounts, costs = tools
+            Num_tools = len(toolIDs)
+            pos += Num_tools + 1
+            if toolIDs != list(range(1,Num_tools+1)):
+                return False
+            
+            coordinates = readBlock(self.LANG.TXT.coordinates,3)
+            if coordinates is None:
+                return False
+            locIDs, X, Y = coordinates
+            Num_coordinates = len(locIDs)
+            pos += Num_coordinates + 1
+            if not 0 <= DepotCoordinate < Num_coordinates or locIDs != list(range(Num_coordinates)):
+                return False
+            
+            requests = readBlock(self.LANG.TXT.requests,7)
+            if requests is None:
+                return False
+            requestIDs, nodes, fromDays, toDays, numDays, toolNrs, toolCounts = requests
+            pos += len(requestIDs) + 1
+            if requestIDs != list(range(1,len(requestIDs)+1)) or \
+                    not self._requestsInRange(Days,Num_coordinates,amounts,nodes,fromDays,toDays,numDays,toolNrs,toolCounts):
+                return False
+            
+            ReadDistance = None
+            if pos < len(lines) and lines[pos] == self.LANG.TXT.distance:
+                rows = lines[pos+1:pos+1+Num_coordinates]
+                ReadDistance = [list(map(int,row.split())) for row in rows]
+                if len(rows) != Num_coordinates or (rows and set(map(len,ReadDistance)) != {Num_coordinates}):
+                    return False
+        except (ValueError,IndexError):
+            return False
+        
+        self.Dataset = Dataset
+        self.Name = Name
+        self.Days = Days
+        self.Capacity = Capacity
+        self.MaxDistance = MaxDistance
+        self.DepotCoordinate = DepotCoordinate
+        self.VehicleCost = VehicleCost
+        self.VehicleDayCost = VehicleDayCost
+        self.DistanceCost = DistanceCost
+        self.Tools = list(map(self.Tool,toolIDs,weights,amounts,costs))
+        self.Coordinates = list(map(self.Coordinate,locIDs,X,Y))
+        self.Requests = list(map(self.Request,requestIDs,nodes,fromDays,toDays,numDays,toolNrs,toolCounts))
+        self.ReadDistance = ReadDistance
+        return True
+    
+    # The checks of _readTXTLines on the request fields, on whole columns
+    @staticmethod
+    def _requestsInRange(Days,Num_coordinates,amounts,nodes,fromDays,toDays,numDays,toolNrs,toolCounts):
+        def inRange(values,low,high):
+            return not values or (low <= min(values) and (high is None or max(values) <= high))
+        return inRange(nodes,0,Num_coordinates-1) and inRange(fromDays,1,Days) and inRange(toDays,1,Days) and inRange(numDays,1,Days) \
+                and inRange(list(map(add,toDays,numDays)),2,Days) and inRange(toolNrs,1,len(amounts)) and inRange(toolCounts,1,None) \
+                and all(count <= amounts[tool-1] for tool, count in zip(toolNrs,toolCounts))
+    
+    def _readTXTLines(self,fd):
+        try:
+            self.Dataset = self._checkAssignment(fd,self.LANG.TXT.dataset,'string')
+            self.Name = self._checkAssignment(fd,self.LANG.TXT.name,'string')
+            
+            self.Days = self._checkInt( 'Days', self._checkAssignment(fd,self.LANG.TXT.days) )
+            self.Capacity = self._checkInt( 'Capacity', self._checkAssignment(fd,self.LANG.TXT.capacity) )
+            self.MaxDistance = self._checkInt( 'Max trip distance', self._checkAssignment(fd,self.LANG.TXT.maxTripDistance) )
+            self.DepotCoordinate = self._checkInt( 'Depot', self._checkAssignment(fd,self.LANG.TXT.depot) )
+            
+            self.VehicleCost = self._checkInt( 'Vehicle Cost', self._checkAssignment(fd,self.LANG.TXT.vehicleCost) )
+            self.VehicleDayCost = self._checkInt( 'Vehicle Day Cost', self._checkAssignment(fd,self.LANG.TXT.vehicleDayCost) )
+            self.DistanceCost = self._checkInt( 'Distance Cost', self._checkAssignment(fd,self.LANG.TXT.distanceCost) )
+            
+            Num_tools = self._checkInt("Number of tools", self._checkAssignment(fd,self.LANG.TXT.tools))
+            for i in range(Num_tools):
+                line = self._getNextLine(fd)
+                ToolsLine = line.split()
+                self._check(len(ToolsLine) == 4, "Expected four integers on a tools line. Found: '%s'.", line)
+                toolID = self._checkInt('Tool ID', ToolsLine[0] )
+                weight = self._checkInt('Tool weight', ToolsLine[1], 'for tool %d ', toolID )
+                amount = self._checkInt('Tool amount', ToolsLine[2], 'for tool %d ', toolID )
+                cost = self._checkInt('Tool cost', ToolsLine[3], 'for tool %d ', toolID )
+                self.Tools.append( self.Tool(toolID,weight,amount,cost) )
+                self._check(toolID == len(self.Tools), 'The indexing of the Tools is incorrect at Tool nr. %d.', toolID)
                 
-                self.VehicleCost = self._checkInt( 'Vehicle Cost', self._checkAssignment(fd,self.LANG.TXT.vehicleCost) )
-                self.VehicleDayCost = self._checkInt( 'Vehicle Day Cost', self._checkAssignment(fd,self.LANG.TXT.vehicleDayCost) )
-                self.DistanceCost = self._checkInt( 'Distance Cost', self._checkAssignment(fd,self.LANG.TXT.distanceCost) )
+            Num_coordinates = self._checkInt("Number of coordinates", self._checkAssignment(fd,self.LANG.TXT.coordinates))
+            self._checkError('Depot (%s) is not a valid coordinate', 0 <= self.DepotCoordinate < Num_coordinates )
+            for i in range(Num_coordinates):
+                line = self._getNextLine(fd)
+                CoordinateLine = line.split()
+                self._check(len(CoordinateLine) == 3, "Expected three integers on a coordinate line. Found: '%s'.", line)
+                locID = self._checkInt('Coordinate ID', CoordinateLine[0] )
+                self._check(locID == len(self.Coordinates), 'The indexing of the Coordinates is incorrect at Coordinate nr. %d.', locID)
+                X = self._checkInt('Coordinate X', CoordinateLine[1], 'for Coordinate %d ', locID )
+                Y = self._checkInt('Coordinate Y', CoordinateLine[2], 'for Coordinate %d ', locID )
+                self.Coordinates.append( self.Coordinate(locID,X,Y) )
+            
+            Num_requests = self._checkInt("Number of requests", self._checkAssignment(fd,self.LANG.TXT.requests))
+            for i in range(Num_requests):
+                line = self._getNextLine(fd)
+                RequestLine = line.split()
+                self._check(len(RequestLine) == 7, "Expected seven integers on a request line. Found: '%s'.", line)
+                requestID = self._checkInt('Request ID', RequestLine[0] )
+                node = self._checkInt('Request node', RequestLine[1], 'for Request %d ', requestID )
+                self._check(0 <= node < Num_coordinates, 'Request node %d is larger then the number of coordinates (%d) for request %d', node, self.Days, requestID)
+                fromDay = self._checkInt('Request from-day', RequestLine[2], 'for Request %d ', requestID )
+                self._check(0 < fromDay <= self.Days, 'Request from-day %d is larger then the horizon (%d) for request %d', fromDay, self.Days, requestID)
+                toDay = self._checkInt('Request to-day', RequestLine[3], 'for Request %d ', requestID )
+                self._check(0 < toDay <= self.Days, 'Request to-day %d is larger then the horizon (%d) for request %d', toDay, self.Days, requestID)
+                numDays = self._checkInt('Request number of days', RequestLine[4], 'for Request %d ', requestID )
+                self._check(toDay+numDays <= self.Days, 'Request last pickup day %d is larger then the horizon (%d) for request %d', toDay+numDays, self.Days, requestID)
+                self._check(0 < numDays, 'Request number of days is not strict positive (%d) for request %d', numDays, requestID)
+                tool = self._checkInt('Request tool', RequestLine[5], 'for Request %d ', requestID )
+                self._check(0 < tool <= Num_tools, 'Request tool %d is larger then the number of tools (%d) for request %d', tool, Num_tools, requestID)
+                toolCount = self._checkInt('Request tool count', RequestLine[6], 'for Request %d ', requestID )
+                self._check(toolCount <= self.Tools[tool-1].amount, 'Request tool count %d is larger then the number of available tools (%d) for request %d', toolCount, self.Tools[tool-1].amount, requestID)
+                self._check(0 < toolCount, 'Request number of tools is not strict positive (%d) for request %d', toolCount, requestID)
+                self.Requests.append( self.Request(requestID,node,fromDay,toDay,numDays,tool,toolCount) )
+                self._check(requestID == len(self.Requests), 'The indexing of the Requests is incorrect at Request nr. %d.', requestID)
                 
-                Num_tools = self._checkInt("Number of tools", self._checkAssignment(fd,self.LANG.TXT.tools))
-                for i in range(Num_tools):
-                    line = self._getNextLine(fd)
-                    ToolsLine = line.split()
-                    self._checkError("Expected four integers on a tools line. Found: '%s'." % line,
-                                    len(ToolsLine) == 4)
-                    toolID = self._checkInt('Tool ID', ToolsLine[0] )
-                    weight = self._checkInt('Tool weight', ToolsLine[1], 'for tool %d ' % toolID )
-                    amount = self._checkInt('Tool amount', ToolsLine[2], 'for tool %d ' % toolID )
-                    cost = self._checkInt('Tool cost', ToolsLine[3], 'for tool %d ' % toolID )
-                    self.Tools.append( self.Tool(toolID,weight,amount,cost) )
-                    self._checkError('The indexing of the Tools is incorrect at Tool nr. %d.' % toolID, toolID == len(self.Tools) )
-                    
-                Num_coordinates = self._checkInt("Number of coordinates", self._checkAssignment(fd,self.LANG.TXT.coordinates))
-                self._checkError('Depot (%s) is not a valid coordinate', 0 <= self.DepotCoordinate < Num_coordinates )
+            line = self._getNextLine(fd)
+            if line == self.LANG.TXT.distance:
+                self.ReadDistance = []
                 for i in range(Num_coordinates):
                     line = self._getNextLine(fd)
-                    CoordinateLine = line.split()
-                    self._checkError("Expected three integers on a coordinate line. Found: '%s'." % line,
-                                    len(CoordinateLine) == 3)
-                    locID = self._checkInt('Coordinate ID', CoordinateLine[0] )
-                    self._checkError('The indexing of the Coordinates is incorrect at Coordinate nr. %d.' % locID, locID == len(self.Coordinates) )
-                    X = self._checkInt('Coordinate X', CoordinateLine[1], 'for Coordinate %d ' % locID )
-                    Y = self._checkInt('Coordinate Y', CoordinateLine[2], 'for Coordinate %d ' % locID )
-                    self.Coordinates.append( self.Coordinate(locID,X,Y) )
-                
-                Num_requests = self._checkInt("Number of requests", self._checkAssignment(fd,self.LANG.TXT.requests))
-                for i in range(Num_requests):
-                    line = self._getNextLine(fd)
-                    RequestLine = line.split()
-                    self._checkError("Expected seven integers on a request line. Found: '%s'." % line,
-                                    len(RequestLine) == 7)
-                    requestID = self._checkInt('Request ID', RequestLine[0] )
-                    node = self._checkInt('Request node', RequestLine[1], 'for Request %d ' % requestID )
-                    self._checkError('Request node %d is larger then the number of coordinates (%d) for request %d' % (node, self.Days, requestID), 0 <= node < Num_coordinates )
-                    fromDay = self._checkInt('Request from-day', RequestLine[2], 'for Request %d ' % requestID )
-                    self._checkError('Request from-day %d is larger then the horizon (%d) for request %d' % (fromDay, self.Days, requestID), 0 < fromDay <= self.Days )
-                    toDay = self._checkInt('Request to-day', RequestLine[3], 'for Request %d ' % requestID )
-                    self._checkError('Request to-day %d is larger then the horizon (%d) for request %d' % (toDay, self.Days, requestID), 0 < toDay <= self.Days )
-                    numDays = self._checkInt('Request number of days', RequestLine[4], 'for Request %d ' % requestID )
-                    self._checkError('Request last pickup day %d is larger then the horizon (%d) for request %d' % (toDay+numDays, self.Days, requestID), toDay+numDays <= self.Days )
-                    self._checkError('Request number of days is not strict positive (%d) for request %d' % (numDays, requestID), 0 < numDays )
-                    tool = self._checkInt('Request tool', RequestLine[5], 'for Request %d ' % requestID )
-                    self._checkError('Request tool %d is larger then the number of tools (%d) for request %d' % (tool, Num_tools, requestID), 0 < tool <= Num_tools )
-                    toolCount = self._checkInt('Request tool count', RequestLine[6], 'for Request %d ' % requestID )
-                    self._checkError('Request tool count %d is larger then the number of available tools (%d) for request %d' % (toolCount, self.Tools[tool-1].amount, requestID), toolCount <= self.Tools[tool-1].amount )
-                    self._checkError('Request number of tools is not strict positive (%d) for request %d' % (toolCount, requestID), 0 < toolCount )
-                    self.Requests.append( self.Request(requestID,node,fromDay,toDay,numDays,tool,toolCount) )
-                    self._checkError('The indexing of the Requests is incorrect at Request nr. %d.' % requestID, requestID == len(self.Requests) )
-                    
-                line = self._getNextLine(fd)
-                if line == self.LANG.TXT.distance:
-                    self.ReadDistance = []
-                    for i in range(Num_coordinates):
-                        line = self._getNextLine(fd)
-                        distLine = line.split()
-                        self._checkError('Expected %d integers on a distance line. Found %d: %s.' % (Num_coordinates,len(distLine),line),
-                                        len(distLine) == Num_coordinates)
+                    distLine = line.split()
+                    self._check(len(distLine) == Num_coordinates, 'Expected %d integers on a distance line. Found %d: %s.', Num_coordinates, len(distLine), line)
 
-                        try:
-                            dists = [int(x) for x in distLine]
-                        except ValueError as err:
-                            field = err.message.split(':',1)[1].strip().strip("'")
-                            self._checkError('Expected %d integers on a distance line. Found incorrect data (%s): %s.' % (Num_coordinates,field,line),
-                                              False)
-                        except:
-                            self._checkError('Expected %d integers on a distance line. Found incorrect data: %s.' % (Num_coordinates,line),
-                                              False)
-                        
-                        self.ReadDistance.append(dists)
-                
+                    try:
+                        dists = [int(x) for x in distLine]
+                    except ValueError as err:
+                        field = err.message.split(':',1)[1].strip().strip("'")
+                        self._checkError('Expected %d integers on a distance line. Found incorrect data (%s): %s.' % (Num_coordinates,field,line),
+                                          False)
+                    except:
+                        self._checkError('Expected %d integers on a distance line. Found incorrect data: %s.' % (Num_coordinates,line),
+                                          False)
+                    
+                    self.ReadDistance.append(dists)
+            
         except self.BaseParseException:
             pass
         except:
@@ -210,6 +370,84 @@ class InstanceCVRPTWUI(base.BaseParser):
             print( '\t' + '\n\t'.join(self.errorReport) )
             raise
             
+    def _initBIN(self):
+        try:
+            fd = open(self.inputfile, 'rb')
+        except:
+            self.errorReport.append( 'Instance file %s could not be read.' % self.inputfile )
+            return
+        
+        with fd:
+            data = fd.read()
+        try:
+            self._readBIN(data)
+        except self.BaseParseException:
+            pass
+    
+    def _readBIN(self,data):
+        header = self.LANG.BIN.header
+        isBinary = len(data) >= header.size and data[:len(self.LANG.BIN.magic)] == self.LANG.BIN.magic
+        self._checkError('Instance file %s is not a binary CVRPTWUI instance file.' % self.inputfile, isBinary)
+        if not isBinary:
+            return
+        magic, version, distanceSize, self.Days, self.Capacity, self.MaxDistance, self.DepotCoordinate, self.VehicleCost, self.VehicleDayCost, \
+            self.DistanceCost, Num_tools, Num_coordinates, Num_requests, datasetLength, nameLength = header.unpack_from(data)
+        size = header.size + datasetLength + nameLength + 8*(3*Num_tools + 2*Num_coordinates + 6*Num_requests) + distanceSize*Num_coordinates**2
+        self._check(version == self.LANG.BIN.version, 'Unsupported binary instance file version %d (expected %d).', version, self.LANG.BIN.version)
+        self._check(distanceSize in (0,4,8), 'Unsupported distance size %d in the binary instance file.', distanceSize)
+        self._check(len(data) == size, 'Expected %d bytes in the binary instance file. Found: %d.', size, len(data))
+        if version != self.LANG.BIN.version or distanceSize not in (0,4,8) or len(data) != size:
+            return
+        
+        view = memoryview(data)
+        pos = header.size
+        def readColumns(width,count,typecode='q'):
+            nonlocal pos
+            values = array(typecode)
+            end = pos + width*count*values.itemsize
+            values.frombytes(view[pos:end])
+            if sys.byteorder == 'big':
+                values.byteswap()
+            pos = end
+            values = values.tolist()
+            return [values[i*count:(i+1)*count] for i in range(width)]
+        
+        self.Dataset = bytes(view[pos:pos+datasetLength]).decode('utf-8','replace')
+        self.Name = bytes(view[pos+datasetLength:pos+datasetLength+nameLength]).decode('utf-8','replace')
+        pos += datasetLength + nameLength
+        weights, amounts, costs = readColumns(3,Num_tools)
+        X, Y = readColumns(2,Num_coordinates)
+        nodes, fromDays, toDays, numDays, toolNrs, toolCounts = readColumns(6,Num_requests)
+        self.Tools = list(map(self.Tool,range(1,Num_tools+1),weights,amounts,costs))
+        self.Coordinates = list(map(self.Coordinate,range(Num_coordinates),X,Y))
+        self.Requests = list(map(self.Request,range(1,Num_requests+1),nodes,fromDays,toDays,numDays,toolNrs,toolCounts))
+        self._check(0 <= self.DepotCoordinate < Num_coordinates, 'Depot (%s) is not a valid coordinate', self.DepotCoordinate)
+        if not self._requestsInRange(self.Days,Num_coordinates,amounts,nodes,fromDays,toDays,numDays,toolNrs,toolCounts):
+            self._checkRequests()
+        
+        if distanceSize:
+            if self.distanceEngine == 'numpy' and distances.hasNumpy():
+                dtype = '<i4' if distanceSize == 4 else '<i8'
+                self.ReadDistance = distances.np.frombuffer(data, dtype=dtype, count=Num_coordinates**2, offset=pos).reshape((Num_coordinates,Num_coordinates))
+            else:
+                self.ReadDistance = readColumns(Num_coordinates,Num_coordinates,'i' if distanceSize == 4 else 'q')
+    
+    # The request checks of _readTXTLines, one request at a time to report the first error
+    def _checkRequests(self):
+        Num_coordinates = len(self.Coordinates)
+        Num_tools = len(self.Tools)
+        for request in self.Requests:
+            requestID = request.ID
+            self._check(0 <= request.node < Num_coordinates, 'Request node %d is larger then the number of coordinates (%d) for request %d', request.node, Num_coordinates, requestID)
+            self._check(0 < request.fromDay <= self.Days, 'Request from-day %d is larger then the horizon (%d) for request %d', request.fromDay, self.Days, requestID)
+            self._check(0 < request.toDay <= self.Days, 'Request to-day %d is larger then the horizon (%d) for request %d', request.toDay, self.Days, requestID)
+            self._check(request.toDay+request.numDays <= self.Days, 'Request last pickup day %d is larger then the horizon (%d) for request %d', request.toDay+request.numDays, self.Days, requestID)
+            self._check(0 < request.numDays, 'Request number of days is not strict positive (%d) for request %d', request.numDays, requestID)
+            self._check(0 < request.tool <= Num_tools, 'Request tool %d is larger then the number of tools (%d) for request %d', request.tool, Num_tools, requestID)
+            if 0 < request.tool <= Num_tools:
+                self._check(request.toolCount <= self.Tools[request.tool-1].amount, 'Request tool count %d is larger then the number of available tools (%d) for request %d', request.toolCount, self.Tools[request.tool-1].amount, requestID)
+            self._check(0 < request.toolCount, 'Request number of tools is not strict positive (%d) for request %d', request.toolCount, requestID)
+            
     def _initXML(self):
         try:
             fd = open(self.inputfile, 'r')
@@ -219,8 +457,7 @@ class InstanceCVRPTWUI(base.BaseParser):
         
         try:
             with fd:
-                tree = ET.parse(fd)
-                root = tree.getroot()                
+                root, streamedLinks = self._streamXML(fd)
                 self._checkError('Root tag is not equal to instance.',root.tag == self.LANG.XML.instance)
                 
                 info = self._findTag(root, self.LANG.XML.info )
@@ -247,10 +484,10 @@ class InstanceCVRPTWUI(base.BaseParser):
                 for resource in resources.findall(self.LANG.XML.resource):
                     Num_tools += 1
                     toolID = self._checkInt('Tool ID', self._findAttribute(resource, self.LANG.XML.attr_id) )
-                    self._checkError('The indexing of the Tools is incorrect at Tool nr. %d.' % toolID, toolID == Num_tools )
-                    weight = self._checkInt('Tool size', self._findAttribute(resource, self.LANG.XML.attr_size, ' (tool id=%d)' % toolID), 'for tool %d ' % toolID )
-                    amount = self._checkInt('Tool amount', resource.text, 'for tool %d ' % toolID )
-                    cost = self._checkInt('Tool cost', self._findAttribute(resource, self.LANG.XML.attr_cost, ' (tool id=%d)' % toolID), 'for tool %d ' % toolID )
+                    self._check(toolID == Num_tools, 'The indexing of the Tools is incorrect at Tool nr. %d.', toolID)
+                    weight = self._checkInt('Tool size', self._findAttribute(resource, self.LANG.XML.attr_size, ' (tool id=%d)', toolID), 'for tool %d ', toolID )
+                    amount = self._checkInt('Tool amount', resource.text, 'for tool %d ', toolID )
+                    cost = self._checkInt('Tool cost', self._findAttribute(resource, self.LANG.XML.attr_cost, ' (tool id=%d)', toolID), 'for tool %d ', toolID )
                     self.Tools.append( self.Tool(toolID,weight,amount,cost) )
                 
                 network = self._findTag(root, self.LANG.XML.network )
@@ -261,11 +498,11 @@ class InstanceCVRPTWUI(base.BaseParser):
                 Num_coordinates = 0
                 for node in nodes.findall(self.LANG.XML.node):
                     locID = self._checkInt('Node ID', self._findAttribute(node, self.LANG.XML.attr_id) )
-                    self._checkError('The indexing of the Coordinates is incorrect at Coordinate nr. %d.' % locID, locID == Num_coordinates )
-                    nodeType = self._checkInt('Node type', self._findAttribute(node, self.LANG.XML.attr_type, ' (node id=%d)' % locID) )
-                    self._checkError('Incorrect node type (%d) for node %d, expected %d' % (nodeType,locID,1 if self.DepotCoordinate == locID else 0), (self.DepotCoordinate == locID and nodeType == 0) or (self.DepotCoordinate != locID and nodeType == 1) )
-                    X = self._checkInt('Coordinate X', self._findTag(node, self.LANG.XML.cx ).text, 'for Node %d ' % locID )
-                    Y = self._checkInt('Coordinate Y', self._findTag(node, self.LANG.XML.cy ).text, 'for Node %d ' % locID )
+                    self._check(locID == Num_coordinates, 'The indexing of the Coordinates is incorrect at Coordinate nr. %d.', locID)
+                    nodeType = self._checkInt('Node type', self._findAttribute(node, self.LANG.XML.attr_type, ' (node id=%d)', locID) )
+                    self._check((self.DepotCoordinate == locID and nodeType == 0) or (self.DepotCoordinate != locID and nodeType == 1), 'Incorrect node type (%d) for node %d, expected %d', nodeType, locID, 1 if self.DepotCoordinate == locID else 0)
+                    X = self._checkInt('Coordinate X', self._findTag(node, self.LANG.XML.cx ).text, 'for Node %d ', locID )
+                    Y = self._checkInt('Coordinate Y', self._findTag(node, self.LANG.XML.cy ).text, 'for Node %d ', locID )
                     self.Coordinates.append( self.Coordinate(locID,X,Y) )
                     Num_coordinates += 1
                 self._checkError('Depot (%s) is not a valid coordinate', 0 <= self.DepotCoordinate < Num_coordinates )
@@ -276,45 +513,48 @@ class InstanceCVRPTWUI(base.BaseParser):
                 for request in requests.findall(self.LANG.XML.request):
                     Num_requests += 1
                     requestID = self._checkInt('Request ID', self._findAttribute(request, self.LANG.XML.attr_id) )
-                    self._checkError('The indexing of the Requests is incorrect at Request nr. %d.' % requestID, requestID == Num_requests )
-                    node = self._checkInt('Request node', self._findAttribute(request, self.LANG.XML.attr_node, ' (request id=%d)' % requestID), 'for Request %d ' % requestID )
-                    self._checkError('Request node %d is larger then the number of coordinates (%d) for request %d' % (node, Num_coordinates, requestID), 0 <= node < Num_coordinates )
-                    custom = self._findTag(request, self.LANG.XML.custom, ' (id=%d)' % requestID )
-                    fromDay = self._checkInt('Request from-day', self._findTag(custom, self.LANG.XML.firstDeliverDay, ' (request id=%d)' % requestID ).text, 'for Request %d ' % requestID )
-                    self._checkError('Request from-day %d is larger then the horizon (%d) for request %d' % (fromDay, self.Days, requestID), 0 < fromDay <= self.Days )
-                    toDay = self._checkInt('Request to-day', self._findTag(custom, self.LANG.XML.lastDeliverDay, ' (request id=%d)' % requestID ).text, 'for Request %d ' % requestID )
-                    self._checkError('Request to-day %d is larger then the horizon (%d) for request %d' % (toDay, self.Days, requestID), 0 < toDay <= self.Days )
-                    numDays = self._checkInt('Request number of days', self._findTag(custom, self.LANG.XML.daysNeeded, ' (request id=%d)' % requestID ).text, 'for Request %d ' % requestID )
-                    self._checkError('Request last pickup day %d is larger then the horizon (%d) for request %d' % (toDay+numDays, self.Days, requestID), toDay+numDays <= self.Days )
-                    self._checkError('Request number of days is not strict positive (%d) for request %s' % (numDays, requestID), 0 < numDays )
-                    resource = self._findTag(request, self.LANG.XML.resource, ' (request id=%d)' % requestID )
-                    tool = self._checkInt('Request tool', self._findAttribute(resource, self.LANG.XML.attr_id, ' (request id=%d)' % requestID), 'for Request %d ' % requestID )
-                    self._checkError('Request tool %d is larger then the number of tools (%d) for request %s' % (tool, Num_tools, requestID), 0 < tool <= Num_tools )
-                    toolCount = self._checkInt('Request tool count', resource.text, 'for Request %d ' % requestID )
-                    self._checkError('Request tool count %d is larger then the number of available tools (%d) for request %s' % (toolCount, self.Tools[tool-1].amount, requestID), toolCount <= self.Tools[tool-1].amount )
-                    self._checkError('Request number of tools is not strict positive (%d) for request %s' % (toolCount, requestID), 0 < toolCount )
-                    quantity = self._checkInt('Request quantity', self._findTag(request, self.LANG.XML.quantity ).text, 'for Request %d ' % requestID )
-                    self._checkError('Incorrect quantity (%d) for request %d, expected %d' % (quantity,requestID,toolCount * self.Tools[tool-1].weight), quantity == toolCount * self.Tools[tool-1].weight )
+                    self._check(requestID == Num_requests, 'The indexing of the Requests is incorrect at Request nr. %d.', requestID)
+                    node = self._checkInt('Request node', self._findAttribute(request, self.LANG.XML.attr_node, ' (request id=%d)', requestID), 'for Request %d ', requestID )
+                    self._check(0 <= node < Num_coordinates, 'Request node %d is larger then the number of coordinates (%d) for request %d', node, Num_coordinates, requestID)
+                    custom = self._findTag(request, self.LANG.XML.custom, ' (id=%d)', requestID )
+                    fromDay = self._checkInt('Request from-day', self._findTag(custom, self.LANG.XML.firstDeliverDay, ' (request id=%d)', requestID ).text, 'for Request %d ', requestID )
+                    self._check(0 < fromDay <= self.Days, 'Request from-day %d is larger then the horizon (%d) for request %d', fromDay, self.Days, requestID)
+                    toDay = self._checkInt('Request to-day', self._findTag(custom, self.LANG.XML.lastDeliverDay, ' (request id=%d)', requestID ).text, 'for Request %d ', requestID )
+                    self._check(0 < toDay <= self.Days, 'Request to-day %d is larger then the horizon (%d) for request %d', toDay, self.Days, requestID)
+                    numDays = self._checkInt('Request number of days', self._findTag(custom, self.LANG.XML.daysNeeded, ' (request id=%d)', requestID ).text, 'for Request %d ', requestID )
+                    self._check(toDay+numDays <= self.Days, 'Request last pickup day %d is larger then the horizon (%d) for request %d', toDay+numDays, self.Days, requestID)
+                    self._check(0 < numDays, 'Request number of days is not strict positive (%d) for request %s', numDays, requestID)
+                    resource = self._findTag(request, self.LANG.XML.resource, ' (request id=%d)', requestID )
+                    tool = self._checkInt('Request tool', self._findAttribute(resource, self.LANG.XML.attr_id, ' (request id=%d)', requestID), 'for Request %d ', requestID )
+                    self._check(0 < tool <= Num_tools, 'Request tool %d is larger then the number of tools (%d) for request %s', tool, Num_tools, requestID)
+                    toolCount = self._checkInt('Request tool count', resource.text, 'for Request %d ', requestID )
+                    self._check(toolCount <= self.Tools[tool-1].amount, 'Request tool count %d is larger then the number of available tools (%d) for request %s', toolCount, self.Tools[tool-1].amount, requestID)
+                    self._check(0 < toolCount, 'Request number of tools is not strict positive (%d) for request %s', toolCount, requestID)
+                    quantity = self._checkInt('Request quantity', self._findTag(request, self.LANG.XML.quantity ).text, 'for Request %d ', requestID )
+                    self._check(quantity == toolCount * self.Tools[tool-1].weight, 'Incorrect quantity (%d) for request %d, expected %d', quantity, requestID, toolCount * self.Tools[tool-1].weight)
                     self.Requests.append( self.Request(requestID,node,fromDay,toDay,numDays,tool,toolCount) )
                 
                 links = network.find( self.LANG.XML.links )
                 if links is not None:
                     self._checkError( 'The links are not given as symmetric', self._findAttribute(links, self.LANG.XML.attr_symmetric ) == 'true' )
-                    self.ReadDistance = [[None for x in range(Num_coordinates)] for x in range(Num_coordinates)]
-                    for i in range(Num_coordinates):
-                        self.ReadDistance[i][i] = 0
-                    for link in links.findall( self.LANG.XML.link ):
-                        head = self._checkInt('Link head', self._findAttribute(link, self.LANG.XML.attr_head) )
-                        tail = self._checkInt('Link tail', self._findAttribute(link, self.LANG.XML.attr_tail) )
-                        length = self._checkInt('Link length', self._findTag(link, self.LANG.XML.length).text )
-                        self._checkError( 'Link head and tail should be different, not equal (%d).' % head, head != tail )
-                        self._checkError( 'Link head (%d) is an incorrect coordinate.' % head, 0 <= head < Num_coordinates )
-                        self._checkError( 'Link tail (%d) is an incorrect coordinate.' % tail, 0 <= tail < Num_coordinates )
-                        self._checkError( 'Head (%d) and tail (%d) combination, or vice versa, is encountered twice.' % (head,tail), self.ReadDistance[head][tail] == None )
-                        self.ReadDistance[head][tail] = self.ReadDistance[tail][head] = length
-                    for i in range(Num_coordinates):
-                        for j in range(i,Num_coordinates):
-                            self._checkError( 'Head (%d) and tail (%d) combination, or vice versa, is not encountered.' % (i,j), self.ReadDistance[i][j] != None )                        
+                    lengths, seen = streamedLinks or self._emptyLinks(Num_coordinates)
+                    remaining = links.findall( self.LANG.XML.link )
+                    if not remaining:
+                        self._checkLinks(lengths, seen, Num_coordinates)
+                    else:
+                        self.ReadDistance = self._linkMatrix(lengths, seen, Num_coordinates)
+                        for link in remaining:
+                            head = self._checkInt('Link head', self._findAttribute(link, self.LANG.XML.attr_head) )
+                            tail = self._checkInt('Link tail', self._findAttribute(link, self.LANG.XML.attr_tail) )
+                            length = self._checkInt('Link length', self._findTag(link, self.LANG.XML.length).text )
+                            self._check(head != tail, 'Link head and tail should be different, not equal (%d).', head)
+                            self._check(0 <= head < Num_coordinates, 'Link head (%d) is an incorrect coordinate.', head)
+                            self._check(0 <= tail < Num_coordinates, 'Link tail (%d) is an incorrect coordinate.', tail)
+                            self._check(self.ReadDistance[head][tail] == None, 'Head (%d) and tail (%d) combination, or vice versa, is encountered twice.', head, tail)
+                            self.ReadDistance[head][tail] = self.ReadDistance[tail][head] = length
+                        for i in range(Num_coordinates):
+                            for j in range(i,Num_coordinates):
+                                self._check(self.ReadDistance[i][j] != None, 'Head (%d) and tail (%d) combination, or vice versa, is not encountered.', i, j)                        
                                 
         except self.BaseParseException:
             pass
@@ -323,38 +563,189 @@ class InstanceCVRPTWUI(base.BaseParser):
             print( '\t' + '\n\t'.join(self.errorReport) )
             raise
     
+    # Parses the xml file with iterparse. The links of the network are dropped from the tree as they arrive and
+    # their lengths are stored in a flat upper triangle, with a mask of the pairs that were seen. From the first link that
+    # would not pass the checks in _initXML on, the links are kept in the tree, so they are reported in order.
+    def _streamXML(self,fd):
+        XML = self.LANG.XML
+        linkTag, headAttr, tailAttr, lengthTag = XML.link, XML.attr_head, XML.attr_tail, XML.length
+        root = None
+        stack = []
+        linksElem = None
+        streamedLinks = None
+        for event, elem in ET.iterparse(fd, events=('start','end')):
+            if event == 'end':
+                stack.pop()
+                if linksElem is not None and elem.tag == linkTag and stack[-1] is linksElem:
+                    try:
+                        head = int(elem.attrib[headAttr])
+                        tail = int(elem.attrib[tailAttr])
+                        length = int(elem.find(lengthTag).text)
+                        if head == tail or not 0 <= head < numLocs or not 0 <= tail < numLocs:
+                            raise ValueError
+                        pair = rowStarts[head] + tail if head < tail else rowStarts[tail] + head
+                        if seen[pair]:
+                            raise ValueError
+                        lengths[pair] = length
+                    except (KeyError,AttributeError,TypeError,ValueError,OverflowError):
+                        linksElem = None
+                        continue
+                    seen[pair] = 1
+                    linksElem.remove(elem)
+                continue
+            
+            if root is None:
+                root = elem
+            elif elem.tag == XML.links and len(stack) == 2 and stack[1].tag == XML.network and streamedLinks is None \
+                    and root.find(XML.network) is stack[1] and stack[1].find(XML.links) is elem:
+                # the parser reads ahead, so only a nodes tag before the links is known to be complete
+                children = list(stack[1])
+                nodes = stack[1].find(XML.nodes)
+                if nodes is not None and children.index(nodes) < children.index(elem):
+                    numLocs = len(nodes.findall(XML.node))
+                    streamedLinks = lengths, seen = self._emptyLinks(numLocs)
+                    rowStarts = [distances.rowStart(i,numLocs) for i in range(numLocs)]
+                    linksElem = elem
+            stack.append(elem)
+        return root, streamedLinks
+    
+    @staticmethod
+    def _emptyLinks(numLocs):
+        numPairs = numLocs*(numLocs-1)//2
+        return array('q', bytes(8*numPairs)), bytearray(numPairs)
+    
+    # the links as a list of rows, with None for the pairs that were not seen
+    @staticmethod
+    def _linkMatrix(lengths, seen, numLocs):
+        res = distances.CondensedDistance(lengths, numLocs).matrix()
+        for i, j in InstanceCVRPTWUI._missingLinks(seen, numLocs):
+            res[i][j] = res[j][i] = None
+        return res
+    
+    @staticmethod
+    def _missingLinks(seen, numLocs):
+        for i in range(numLocs):
+            start = distances.rowStart(i,numLocs)
+            j = seen.find(0, start+i+1, start+numLocs)
+            while j >= 0:
+                yield i, j - start
+                j = seen.find(0, j+1, start+numLocs)
+    
+    def _checkLinks(self, lengths, seen, numLocs):
+        complete = seen.find(0) < 0
+        if complete and self.distanceEngine == 'condensed':
+            self.ReadDistance = distances.CondensedDistance(lengths, numLocs)
+        elif complete and self.distanceEngine == 'numpy':
+            self.ReadDistance = distances.CondensedDistance(lengths, numLocs).fullArray()
+        else:
+            self.ReadDistance = self._linkMatrix(lengths, seen, numLocs)
+        for i, j in self._missingLinks(seen, numLocs):
+            self._check(False, 'Head (%d) and tail (%d) combination, or vice versa, is not encountered.', i, j)
+    
     def calculateDistances(self):
         if not self.isValid() or self.calcDistance is not None:
             return
+        with profiling.phase('instance.calculateDistances', engine=self.distanceEngine):
+            self._calculateDistances()
+
+    def _calculateDistances(self):
+        if self.distanceEngine == 'numpy':
+            if self.distanceCache and self.inputfile:
+                self._cachedDistances(self.inputfile + distances.CACHE_EXTENSION)
+            else:
+                self.calcDistance = distances.calculateDistanceArray(self.Coordinates)
+            return
+        if self.distanceEngine == 'condensed':
+            self.calcDistance = distances.calculateCondensedDistances(self.Coordinates)
+            return
+        self.buildArrays()
+        X, Y = self.coordX, self.coordY
         numLocs = len(self.Coordinates)
         self.calcDistance = [[0 for x in range(numLocs)] for x in range(numLocs)]
         for i in range(numLocs): 
-            cI = self.Coordinates[i]
+            row = self.calcDistance[i]
+            xI, yI = X[i], Y[i]
             for j in range(i,numLocs):
-                cJ = self.Coordinates[j]
-                dist = math.floor( math.sqrt( pow(cI.X-cJ.X,2) + pow(cI.Y-cJ.Y,2) ) )
-                self.calcDistance[i][j] = self.calcDistance[j][i] = int(dist)
+                dist = math.floor( math.sqrt( pow(xI-X[j],2) + pow(yI-Y[j],2) ) )
+                row[j] = self.calcDistance[j][i] = int(dist)
+                
+    def _cachedDistances(self,filename):
+        digest = distances.coordinateHash(self.Coordinates)
+        self.calcDistance = distances.loadDistanceCache(filename,digest)
+        if self.calcDistance is not None:
+            return
+        self.calcDistance = distances.calculateDistanceArray(self.Coordinates)
+        try:
+            distances.writeDistanceCache(filename,digest,self.calcDistance)
+        except (IOError,OSError):
+            self.warningReport.append( 'Distance cache %s could not be written.' % filename )
                 
+    def getDistance(self,i,j):
+        if self.calcDistance is None and self.distanceEngine != 'lazy':
+            self.calculateDistances()
+        if self.distanceEngine == 'condensed' and self.calcDistance is not None:
+            return self.calcDistance.get(i,j)
+        if self.calcDistance is not None:
+            return int(self.calcDistance[i][j])
+        return self.getLazyDistance(i,j)
+    
+    # The distance without calculating a matrix, whatever the distance engine is
+    def getLazyDistance(self,i,j):
+        if self.lazyDistance is None:
+            self.lazyDistance = distances.LazyDistance(self.Coordinates)
+        return self.lazyDistance.get(i,j)
+    
     def isValid(self):
         return not self.errorReport
         
-    def areDistancesValid(self):
+    # With allDifferences the message lists every incorrect distance instead of only the first
+    def areDistancesValid(self,allDifferences=False):
+        with profiling.phase('instance.areDistancesValid'):
+            return self._areDistancesValid(allDifferences)
+
+    def _areDistancesValid(self,allDifferences):
         if self.ReadDistance is None:
             return (True,'Distances are not given.')
         self.calculateDistances()
-        if self.ReadDistance != self.calcDistance:
-            numLocs = len(self.Coordinates)
-            for i in range(numLocs): 
-                for j in range(numLocs):
-                    if self.ReadDistance[i][j] != self.calcDistance[i][j]:
-                        return (False,'Incorrect Distances. First difference is at location %d,%d: %d should be %d' % (i,j,self.ReadDistance[i][j],self.calcDistance[i][j])  )
-        return (True,'The given distances are correct')
+        given, calculated = self.ReadDistance, self.calcDistance
+        if self.distanceEngine == 'numpy':
+            differs = not distances.np.array_equal(given, calculated)
+        elif self.distanceEngine == 'condensed':
+            if isinstance(given, distances.CondensedDistance):
+                differs = given.values != calculated.values
+                given = given.matrix() if differs else given
+            else:
+                differs = True
+            calculated = calculated.matrix() if differs else calculated
+            differs = differs and given != calculated
+        else:
+            differs = given != calculated
+        if not differs:
+            # equal to the calculated distances, so also complete and symmetric
+            return (True,'The given distances are correct')
+        differences, numDifferences, asymmetric = distances.compareDistanceMatrices(given, calculated, None if allDifferences else 1)
+        def describe(difference):
+            i, j, given, calculated = difference
+            if given is None:
+                return 'location %d,%d: missing, should be %d' % (i,j,calculated)
+            return 'location %d,%d: %d should be %d' % (i,j,given,calculated)
+        message = 'Incorrect Distances. First difference is at %s' % describe(differences[0])
+        if numDifferences > 1:
+            message += '\n%d distances are incorrect' % numDifferences
+        if asymmetric:
+            message += '\nThe given distances are not symmetric for %d pairs' % asymmetric
+        if allDifferences:
+            message += ''.join('\n\t%s' % describe(difference) for difference in differences[1:])
+        return (False,message)
         
     def writeInstance(self,filename,writeMatrix):
-        if filename.endswith('.xml'):
-            res = self._writeInstanceXML(filename,writeMatrix)
-        else:
-            res = self._writeInstanceTXT(filename,writeMatrix)
+        with profiling.phase('instance.write', file=filename):
+            if filename.endswith('.xml'):
+                res = self._writeInstanceXML(filename,writeMatrix)
+            elif filename.endswith('.bin'):
+                res = self._writeInstanceBIN(filename,writeMatrix)
+            else:
+                res = self._writeInstanceTXT(filename,writeMatrix)
         if res[0]:
             print('Instance file written to %s' % filename)
         else:
@@ -405,66 +796,118 @@ class InstanceCVRPTWUI(base.BaseParser):
         return (True, '')
     
     def _writeInstanceXML(self,filename,writeMatrix):
-        root = ET.Element(self.LANG.XML.instance)
-        root.attrib[self.LANG.XML.attr_days] = str(self.Days)
-        
-        info = ET.SubElement( root, self.LANG.XML.info )
-        ET.SubElement( info, self.LANG.XML.dataset ).text = self.Dataset
-        ET.SubElement( info, self.LANG.XML.name ).text = self.Name
+        try:
+            fd = open(filename,  mode='w')
+        except:
+            return (False, 'Could not write to file.')
         
-        network = ET.SubElement( root, self.LANG.XML.network )
-        nodes = ET.SubElement( network, self.LANG.XML.nodes )
-        ET.SubElement( network, self.LANG.XML.euclidean )
-        ET.SubElement( network, self.LANG.XML.floor )
-        for i in range(len(self.Coordinates)):
-            coord = self.Coordinates[i]
-            node = ET.SubElement( nodes, self.LANG.XML.node, {self.LANG.XML.attr_id: str(coord.ID), self.LANG.XML.attr_type: '0' if i == self.DepotCoordinate else '1' } )
-            ET.SubElement( node, self.LANG.XML.cx ).text = str(coord.X)
-            ET.SubElement( node, self.LANG.XML.cy ).text = str(coord.Y)
+        with fd:
+            fd.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            xml = base.XMLWriter(fd)
+            xml.start( self.LANG.XML.instance, {self.LANG.XML.attr_days: str(self.Days)} )
             
-        if writeMatrix:
-            links = ET.SubElement( network, self.LANG.XML.links, {self.LANG.XML.attr_symmetric: 'true'} )
-            for i in range(len(self.calcDistance)): 
-                for j in range(i+1,len(self.calcDistance)):
-                    ET.SubElement( ET.SubElement( links, self.LANG.XML.link, { self.LANG.XML.attr_head: str(i), self.LANG.XML.attr_tail: str(j) } ), self.LANG.XML.length ).text = str(self.calcDistance[i][j])
-        
-        vehicleProfile = ET.SubElement( ET.SubElement( root, self.LANG.XML.fleet ), self.LANG.XML.vehicleProfile, {self.LANG.XML.attr_type: '1' } )
-        ET.SubElement( vehicleProfile, self.LANG.XML.departureNode ).text = str(self.DepotCoordinate)
-        ET.SubElement( vehicleProfile, self.LANG.XML.arrivalNode ).text = str(self.DepotCoordinate)
-        ET.SubElement( vehicleProfile, self.LANG.XML.capacity ).text = str(self.Capacity)
-        ET.SubElement( vehicleProfile, self.LANG.XML.maxTravelDistance ).text = str(self.MaxDistance)
-        ET.SubElement( vehicleProfile, self.LANG.XML.vehicleCost ).text = str(self.VehicleCost)
-        ET.SubElement( vehicleProfile, self.LANG.XML.distanceCost ).text = str(self.DistanceCost)
-        ET.SubElement( vehicleProfile, self.LANG.XML.vehicleDayCost ).text = str(self.VehicleDayCost)
-        
-        requests = ET.SubElement( root, self.LANG.XML.requests )
-        for i in range(len(self.Requests)):
-            req = self.Requests[i]
-            request = ET.SubElement( requests, self.LANG.XML.request, {self.LANG.XML.attr_id: str(req.ID), self.LANG.XML.node: str(req.node) } )
-            ET.SubElement( request, self.LANG.XML.quantity ).text = str(req.toolCount * self.Tools[req.tool-1].weight)
-            ET.SubElement( request, self.LANG.XML.resource, {self.LANG.XML.attr_id: str(req.tool) } ).text = str(req.toolCount)
-            custom = ET.SubElement( request, self.LANG.XML.custom )
-            ET.SubElement( custom, self.LANG.XML.firstDeliverDay ).text = str(req.fromDay)
-            ET.SubElement( custom, self.LANG.XML.lastDeliverDay ).text = str(req.toDay)
-            ET.SubElement( custom, self.LANG.XML.daysNeeded ).text = str(req.numDays)
+            xml.start( self.LANG.XML.info )
+            xml.element( self.LANG.XML.dataset, self.Dataset )
+            xml.element( self.LANG.XML.name, self.Name )
+            xml.end()
             
-        resources = ET.SubElement( root, self.LANG.XML.resources )
-        for i in range(len(self.Tools)):
-            tool = self.Tools[i]
-            ET.SubElement( resources, self.LANG.XML.resource, {self.LANG.XML.attr_id: str(tool.ID), self.LANG.XML.attr_renewable: 'false', self.LANG.XML.attr_size: str(tool.weight), self.LANG.XML.attr_cost: str(tool.cost) } ).text = str(tool.amount)
-        
-        InstanceCVRPTWUI.indent(root)
+            xml.start( self.LANG.XML.network )
+            xml.start( self.LANG.XML.nodes )
+            for i in range(len(self.Coordinates)):
+                coord = self.Coordinates[i]
+                xml.start( self.LANG.XML.node, {self.LANG.XML.attr_id: str(coord.ID), self.LANG.XML.attr_type: '0' if i == self.DepotCoordinate else '1' } )
+                xml.element( self.LANG.XML.cx, str(coord.X) )
+                xml.element( self.LANG.XML.cy, str(coord.Y) )
+                xml.end()
+            xml.end()
+            xml.element( self.LANG.XML.euclidean )
+            xml.element( self.LANG.XML.floor )
+            
+            if writeMatrix:
+                self.calculateDistances()
+                xml.start( self.LANG.XML.links, {self.LANG.XML.attr_symmetric: 'true'} )
+                for i in range(len(self.calcDistance)):
+                    for j, length in enumerate(distances.upperRow(self.calcDistance,i), i+1):
+                        xml.start( self.LANG.XML.link, { self.LANG.XML.attr_head: str(i), self.LANG.XML.attr_tail: str(j) } )
+                        xml.element( self.LANG.XML.length, str(length) )
+                        xml.end()
+                xml.end()
+            xml.end()
+            
+            xml.start( self.LANG.XML.fleet )
+            xml.start( self.LANG.XML.vehicleProfile, {self.LANG.XML.attr_type: '1' } )
+            xml.element( self.LANG.XML.departureNode, str(self.DepotCoordinate) )
+            xml.element( self.LANG.XML.arrivalNode, str(self.DepotCoordinate) )
+            xml.element( self.LANG.XML.capacity, str(self.Capacity) )
+            xml.element( self.LANG.XML.maxTravelDistance, str(self.MaxDistance) )
+            xml.element( self.LANG.XML.vehicleCost, str(self.VehicleCost) )
+            xml.element( self.LANG.XML.distanceCost, str(self.DistanceCost) )
+            xml.element( self.LANG.XML.vehicleDayCost, str(self.VehicleDayCost) )
+            xml.end()
+            xml.end()
+            
+            xml.start( self.LANG.XML.requests )
+            for i in range(len(self.Requests)):
+                req = self.Requests[i]
+                xml.start( self.LANG.XML.request, {self.LANG.XML.attr_id: str(req.ID), self.LANG.XML.node: str(req.node) } )
+                xml.element( self.LANG.XML.quantity, str(req.toolCount * self.Tools[req.tool-1].weight) )
+                xml.element( self.LANG.XML.resource, str(req.toolCount), {self.LANG.XML.attr_id: str(req.tool) } )
+                xml.start( self.LANG.XML.custom )
+                xml.element( self.LANG.XML.firstDeliverDay, str(req.fromDay) )
+                xml.element( self.LANG.XML.lastDeliverDay, str(req.toDay) )
+                xml.element( self.LANG.XML.daysNeeded, str(req.numDays) )
+                xml.end()
+                xml.end()
+            xml.end()
+            
+            xml.start( self.LANG.XML.resources )
+            for i in range(len(self.Tools)):
+                tool = self.Tools[i]
+                xml.element( self.LANG.XML.resource, str(tool.amount), {self.LANG.XML.attr_id: str(tool.ID), self.LANG.XML.attr_renewable: 'false', self.LANG.XML.attr_size: str(tool.weight), self.LANG.XML.attr_cost: str(tool.cost) } )
+            xml.end()
+            xml.end()
         
+        return (True, '')
+
+    def _writeInstanceBIN(self,filename,writeMatrix):
         try:
-            fd = open(filename,  mode='w')
+            fd = open(filename,  mode='wb')
         except:
             return (False, 'Could not write to file.')
         
+        def column(values,typecode='q'):
+            values = array(typecode,values)
+            if sys.byteorder == 'big':
+                values.byteswap()
+            return values.tobytes()
+        
         with fd:
-            tree = ET.ElementTree(root)
-            fd.write('<?xml version="1.0" encoding="UTF-8"?>\n')
-            tree.write(fd,encoding='utf-8',)
-
+            dataset = self.Dataset.encode('utf-8')
+            name = self.Name.encode('utf-8')
+            numLocs = len(self.Coordinates)
+            distanceSize = 0
+            if writeMatrix:
+                self.calculateDistances()
+                matrix = self.calcDistance
+                if distances.hasNumpy() and isinstance(matrix, distances.np.ndarray):
+                    distanceSize = 4 if matrix.size == 0 or matrix.max() <= 0x7fffffff else 8
+                    matrix = distances.np.ascontiguousarray(matrix, dtype='<i4' if distanceSize == 4 else '<i8').tobytes()
+                else:
+                    distanceSize = 4 if all(max(row) <= 0x7fffffff for row in matrix) else 8
+                    matrix = column(chain.from_iterable(matrix), 'i' if distanceSize == 4 else 'q')
+            fd.write(self.LANG.BIN.header.pack(self.LANG.BIN.magic, self.LANG.BIN.version, distanceSize, self.Days, self.Capacity, self.MaxDistance,
+                                               self.DepotCoordinate, self.VehicleCost, self.VehicleDayCost, self.DistanceCost,
+                                               len(self.Tools), numLocs, len(self.Requests), len(dataset), len(name)))
+            fd.write(dataset)
+            fd.write(name)
+            for field in ('weight', 'amount', 'cost'):
+                fd.write(column(getattr(tool,field) for tool in self.Tools))
+            for field in ('X', 'Y'):
+                fd.write(column(getattr(coord,field) for coord in self.Coordinates))
+            for field in ('node', 'fromDay', 'toDay', 'numDays', 'tool', 'toolCount'):
+                fd.write(column(getattr(req,field) for req in self.Requests))
+            if distanceSize:
+                fd.write(matrix)
         
         return (True, '')
 
@@ -472,26 +915,41 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Read and checks CVRPTWUI instance file.')
     parser.add_argument('--instance', '-i', metavar='INSTANCE_FILE', required=True,
                         help='The instance file')
-    parser.add_argument('--type', '-t', choices=['txt', 'xml'],
+    parser.add_argument('--type', '-t', choices=['txt', 'xml', 'bin'],
                         help='Instance file type')
     parser.add_argument('--skipDistanceCheck', '-S', action='store_true',
                         help='Skip check on given distances')
+    parser.add_argument('--allDistanceErrors', '-D', action='store_true',
+                        help='Report every incorrect given distance instead of only the first')
+    parser.add_argument('--distanceEngine', choices=distances.ENGINES, default='list',
+                        help='Storage of the calculated distance matrix (numpy: compact integer array, lazy: only the distances that are used, condensed: upper triangle only)')
+    parser.add_argument('--distanceCache', action='store_true',
+                        help='Keep the calculated distances in a cache file next to the instance file (numpy engine only)')
     parser.add_argument('--outputFile', '-o', metavar='NEW_INSTANCE_FILE',
-                        help='Write the instance to this file')
+                        help='Write the instance to this file, the type follows from the extension (.txt, .xml or .bin)')
     parser.add_argument('--writeMatrix', '-m', action='store_true',
                         help='Write the matrix in the outputfile')
     parser.add_argument('--continueOnError', '-C', action='store_true',
                         help='Try to continue after the first error in the solution. This may result in a crash (found errors are reported). Note: Any error after the first may be a result of a previous error')
+    parser.add_argument('--profile', nargs='?', const='table', choices=['table', 'json'],
+                        help='Report the time and the process peak memory after the parse, distance and write phases at the end (default: table)')
+    parser.add_argument('--profileMemory', '--profile-memory', action='store_true',
+                        help='With --profile, report the peak memory traced during each phase instead (much slower)')
     args = parser.parse_args()
     
     if args.writeMatrix and not args.outputFile:
         parser.error('--writeMatrix can only be given when --outputFile is also given')
+    if args.profileMemory and not args.profile:
+        parser.error('--profileMemory can only be given when --profile is also given')
     
-    Instance = InstanceCVRPTWUI(args.instance,args.type,args.continueOnError)
+    if args.profile:
+        recorder = profiling.PhaseRecorder(args.profileMemory)
+        recorder.start()
+    Instance = InstanceCVRPTWUI(args.instance,args.type,args.continueOnError,args.distanceEngine,args.distanceCache)
     if Instance.isValid():
         print('Instance %s is a valid CVRPTWUI instance' % args.instance)
         if not args.skipDistanceCheck:
-            res = Instance.areDistancesValid()
+            res = Instance.areDistancesValid(args.allDistanceErrors)
             print(res[1])
         if args.outputFile:
             Instance.writeInstance(args.outputFile,args.writeMatrix)
@@ -504,5 +962,8 @@ if __name__ == "__main__":
         if len(Instance.warningReport) > 0:
             print('There were also warnings:')
             print( '\t' + '\n\t'.join(Instance.warningReport) )
+    if args.profile:
+        recorder.stop()
+        print(recorder.report(args.profile))
 
     
\ No newline at end of file
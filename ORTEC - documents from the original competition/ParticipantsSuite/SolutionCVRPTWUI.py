@@ -1,10 +1,15 @@
 #! /usr/bin/env python
 
-import argparse, copy
+import argparse, glob, json, multiprocessing, os, struct, sys
 import xml.etree.ElementTree as ET
+from contextlib import redirect_stdout
 from InstanceCVRPTWUI import InstanceCVRPTWUI as InstanceCVRPTWUI
 import baseCVRPTWUI as base
+import profileCVRPTWUI as profiling
+from array import array
 from collections import OrderedDict
+from operator import add, sub, mul
+from itertools import chain
 from pprint import pprint as pprint
 
 
@@ -64,6 +69,17 @@ class SolutionCVRPTWUI(base.BaseParser):
             pickup = 'pickup'
             deliver = 'deliver'
             visits = 'visit'
+        # Binary solution file, little endian: the header, the dataset and name in utf-8, the cost fields
+        # (max number of vehicles, number of vehicle days, distance, cost and the tool count per tool) as int64
+        # when extra is set, the day numbers and the number of vehicles per day and the route length per vehicle
+        # as int32, and all routes with the signed request ids of Route, using routeSize bytes per id. When extra
+        # is set it ends with int32 columns for the number of vehicles and the start and finish depot per day,
+        # the int64 distance per vehicle and the int32 tools at every depot visit.
+        class BIN:
+            magic = b'CVRPSOLN'
+            version = 1
+            # magic, version, extra, routeSize, number of tools, days and vehicles, dataset and name length
+            header = struct.Struct('<8sHBB5I')
     class SolutionCost(object):
         def __init__(self):
             self.MaxNumberOfVehicles = None
@@ -104,6 +120,10 @@ class SolutionCVRPTWUI(base.BaseParser):
             self.givenFinishDepot = None
             self.calcStartDepot = None
             self.calcFinishDepot = None
+            self.givenVehicleErrors = None
+        @property
+        def numVehicles(self):
+            return len(self.Vehicles)
         def __str__(self):
             strRepr = 'Day: %d' % self.dayNumber
             if self.GivenNumberOfVehicles is not None:
@@ -121,18 +141,53 @@ class SolutionCVRPTWUI(base.BaseParser):
                 strRepr += '\nVehicle: %d\n%s' % ( i, str(self.Vehicles[i]) )
             return strRepr
             
+    # What stream mode keeps of a calculated day: the depots, and the messages of the checks of the given
+    # values of its vehicles
+    class StreamedDay(object):
+        def __init__(self, day, givenVehicleErrors):
+            self.dayNumber = day.dayNumber
+            self.GivenNumberOfVehicles = day.GivenNumberOfVehicles
+            self.numVehicles = day.numVehicles
+            self.givenStartDepot = day.givenStartDepot
+            self.givenFinishDepot = day.givenFinishDepot
+            self.calcStartDepot = day.calcStartDepot
+            self.calcFinishDepot = day.calcFinishDepot
+            self.givenVehicleErrors = givenVehicleErrors
+        def __str__(self):
+            return 'Day: %d\tNofV: %d\nGSD: %r\nGFD: %r\nCSD: %r\nCFD: %r' % (self.dayNumber, self.numVehicles, self.givenStartDepot, self.givenFinishDepot, self.calcStartDepot, self.calcFinishDepot)
+            
     def __str__(self):
         strRepr = 'GivenCost: %s\nCalcCost: %s\nDAYS:' % (str(self.givenCost),str(self.calcCost))
         for day in self.Days:
                 strRepr += '\n%s\n' % ( str(day) )        
         return strRepr
     
-    def __init__(self, inputfile,Instance,filetype=None,continueOnErr=False):
+    # The running totals of the days and the request bookkeeping while the solution is calculated
+    class SolutionTotals(object):
+        def __init__(self,numRequests,numTools):
+            self.RequestDeliver = [None] * (numRequests + 1)
+            self.RequestPickup  = [None] * (numRequests + 1)
+            self.toolUse     = [0] * numTools
+            self.toolStatus  = [0] * numTools
+            self.maxNumVehicles = 0
+            self.dayNumVehicles = 0
+            self.totalDistance = 0
+    
+    # With stream the txt and xml solutions are calculated day by day while they are read, see _streamDay
+    def __init__(self, inputfile,Instance,filetype=None,continueOnErr=False,text=None,processes=None,stream=False):
         self.Instance = Instance
-        self.Instance.calculateDistances()
-        self._doinit(inputfile,filetype,continueOnErr)
+        self.processes = processes
+        self.stream = stream
+        self.streamed = False
+        self.totals = None
+        self.Instance.buildArrays()
+        # stream mode only calculates the distances of the routes
+        if self.Instance.distanceEngine != 'lazy' and not self.stream:
+            self.Instance.calculateDistances()
+        self._doinit(inputfile,filetype,continueOnErr,text)
         if self.isValid():
-            self._calculateSolution()
+            with profiling.phase('solution.calculateSolution', days=len(self.Days)):
+                self._calculateSolution()
         
     def _initData(self):
         self.Days = []
@@ -142,7 +197,7 @@ class SolutionCVRPTWUI(base.BaseParser):
     def _parseToolsLine(self,field,line):
         ToolsLine = line.split()
         nofTools = len(self.Instance.Tools)
-        self._checkError("Expected %d integers on a tools line (%s). Found: '%s'." % (nofTools,field,line), len(ToolsLine) == nofTools)
+        self._check(len(ToolsLine) == nofTools, "Expected %d integers on a tools line (%s). Found: '%s'.", nofTools, field, line)
         try:
             value = [int(x) for x in ToolsLine]
         except ValueError as err:
@@ -173,13 +228,13 @@ class SolutionCVRPTWUI(base.BaseParser):
         return lastLineAssignment
     
     def _readDay(self, fd, lastLineAssignment):
-        self._checkError('Unexpected string: %s.' % lastLineAssignment[1], lastLineAssignment[0] is not None )
-        self._checkError('Unexpected field: %s.' % lastLineAssignment[0],lastLineAssignment[0] == self.LANG.TXT.day)
+        self._check(lastLineAssignment[0] is not None, 'Unexpected string: %s.', lastLineAssignment[1])
+        self._check(lastLineAssignment[0] == self.LANG.TXT.day, 'Unexpected field: %s.', lastLineAssignment[0])
         newDay = self.SolutionDay(self._checkInt(self.LANG.TXT.day,lastLineAssignment[1]))
-        self._checkError('Day number should be positive, found %d.' % (newDay.dayNumber), newDay.dayNumber > 0 )
-        self._checkError('Day number should be at most %d, found %d.' % (self.Instance.Days,newDay.dayNumber), newDay.dayNumber <= self.Instance.Days )
+        self._check(newDay.dayNumber > 0, 'Day number should be positive, found %d.', newDay.dayNumber)
+        self._check(newDay.dayNumber <= self.Instance.Days, 'Day number should be at most %d, found %d.', self.Instance.Days, newDay.dayNumber)
         lastDay = self.Days[-1].dayNumber if len(self.Days) > 0 else 0
-        self._checkError('Incorrect order of days, found day %d after day %d.' % (newDay.dayNumber, lastDay), newDay.dayNumber > lastDay )
+        self._check(newDay.dayNumber > lastDay, 'Incorrect order of days, found day %d after day %d.', newDay.dayNumber, lastDay)
         lastLineAssignment = self._isAssignment(fd)
         for field, member in self.LANG.TXT.dayfields.items():
             if lastLineAssignment is None or lastLineAssignment[0] is None:
@@ -192,14 +247,14 @@ class SolutionCVRPTWUI(base.BaseParser):
                     value = self._parseToolsLine(field,value)
                 newDay.__setattr__(member,value)
                 lastLineAssignment = self._isAssignment(fd)
-        self._checkError('Expected a route line (day %d)' % newDay.dayNumber, lastLineAssignment is None or lastLineAssignment[0] is None or lastLineAssignment[0] == self.LANG.TXT.day )
+        self._check(lastLineAssignment is None or lastLineAssignment[0] is None or lastLineAssignment[0] == self.LANG.TXT.day, 'Expected a route line (day %d)', newDay.dayNumber)
         while lastLineAssignment is not None and lastLineAssignment[0] is None:
             line = lastLineAssignment[1]
             vehLine = line.split()
-            self._checkError('Expected a route/visit/distance line (day %d)' % newDay.dayNumber, len(vehLine) >= 3 )
-            vehNum = self._checkInt('vehicle number', vehLine[0], '(day %d) ' % newDay.dayNumber)
+            self._check(len(vehLine) >= 3, 'Expected a route/visit/distance line (day %d)', newDay.dayNumber)
+            vehNum = self._checkInt('vehicle number', vehLine[0], '(day %d) ', newDay.dayNumber)
             if vehLine[1] == 'R':
-                self._checkError('Expected route %d, found %d (day %d)' % (len(newDay.Vehicles) + 1,vehNum,newDay.dayNumber), len(newDay.Vehicles) + 1 == vehNum )
+                self._check(len(newDay.Vehicles) + 1 == vehNum, 'Expected route %d, found %d (day %d)', len(newDay.Vehicles) + 1, vehNum, newDay.dayNumber)
                 veh = self.SolutionVehicle()
                 try:
                     veh.Route = [int(x) for x in vehLine[2:]]
@@ -208,33 +263,33 @@ class SolutionCVRPTWUI(base.BaseParser):
                     self._checkError('Expected integers on the route line (day %d). Found incorrect data (%s): %s.' % (newDay.dayNumber,routefield,line),False)
                 except:
                     self._checkError('Expected integers on the route line (day %d). Found incorrect data: %s.' % (newDay.dayNumber,line),False)
-                self._checkError('Route should be at least length 3, found %d (day %d).' % (len(veh.Route),newDay.dayNumber),len(veh.Route)>=3)
-                self._checkError('Route should start at the depot (day %d).' % (newDay.dayNumber),veh.Route[0] == 0)
-                self._checkError('Route should end at the depot (day %d).' % (newDay.dayNumber),veh.Route[-1] == 0)
+                self._check(len(veh.Route)>=3, 'Route should be at least length 3, found %d (day %d).', len(veh.Route), newDay.dayNumber)
+                self._check(veh.Route[0] == 0, 'Route should start at the depot (day %d).', newDay.dayNumber)
+                self._check(veh.Route[-1] == 0, 'Route should end at the depot (day %d).', newDay.dayNumber)
                 newDay.Vehicles.append(veh)
             elif vehLine[1] == 'V':
-                self._checkError('Expected a visit line for route %d (day %d), found %d' % (len(newDay.Vehicles),newDay.dayNumber,vehNum), len(newDay.Vehicles) == vehNum )
-                visitnum = self._checkInt('visit number',vehLine[2],'(day %d, route %d) '%(newDay.dayNumber,vehNum))
+                self._check(len(newDay.Vehicles) == vehNum, 'Expected a visit line for route %d (day %d), found %d', len(newDay.Vehicles), newDay.dayNumber, vehNum)
+                visitnum = self._checkInt('visit number',vehLine[2],'(day %d, route %d) ', newDay.dayNumber, vehNum)
                 veh = newDay.Vehicles[-1]
-                self._checkError('Expected visit line %d (day %d, route %d), found %d' % (len(veh.givenVisits) + 1, newDay.dayNumber, vehNum, visitnum), len(veh.givenVisits) + 1 == visitnum )
+                self._check(len(veh.givenVisits) + 1 == visitnum, 'Expected visit line %d (day %d, route %d), found %d', len(veh.givenVisits) + 1, newDay.dayNumber, vehNum, visitnum)
                 veh.givenVisits.append( self._parseToolsLine('Visit %d (day %d, route %d)' %(visitnum,newDay.dayNumber, vehNum), ' '.join(vehLine[3:]) ) )
             elif vehLine[1] == 'D':
-                self._checkError('Expected a distance for route %d, found %d' % (len(newDay.Vehicles),vehNum), len(newDay.Vehicles) == vehNum )
+                self._check(len(newDay.Vehicles) == vehNum, 'Expected a distance for route %d, found %d', len(newDay.Vehicles), vehNum)
                 veh = newDay.Vehicles[-1]
-                self._checkError('Expected a distance line (day %d, route %d), found %s' % (newDay.dayNumber,vehNum, line), len(vehLine) == 3 )
-                self._checkError('Found a second distance line (day %d, route %d), found %s' % (newDay.dayNumber,vehNum, line), veh.givenDistance == None )
+                self._check(len(vehLine) == 3, 'Expected a distance line (day %d, route %d), found %s', newDay.dayNumber, vehNum, line)
+                self._check(veh.givenDistance == None, 'Found a second distance line (day %d, route %d), found %s', newDay.dayNumber, vehNum, line)
                 veh.givenDistance = self._checkInt('Distance (day %d, route %d)' % (newDay.dayNumber,vehNum), vehLine[2] )
             else:
                 self._checkError('Expected a Route/Visit/Distance line, found %s' % vehLine[1], False )
             lastLineAssignment = self._isAssignment(fd)
-        self.Days.append(newDay) 
+        self._addDay(newDay)
         if len(newDay.Vehicles) == 0:
             self.warningReport.append( 'Empty day %d' % newDay.dayNumber )
         return lastLineAssignment
     
     def _initTXT(self):
         try:
-            fd = open(self.inputfile, 'r')
+            fd = self._openInput()
         except:
             self.errorReport.append( 'Solution file %s could not be read.' % self.inputfile )
             return
@@ -247,7 +302,7 @@ class SolutionCVRPTWUI(base.BaseParser):
                 assignment = self._readTextCost(fd)
                 while assignment:
                     assignment = self._readDay(fd,assignment)
-                self.Days = [d for d in self.Days if len(d.Vehicles) > 0]
+                self.Days = [d for d in self.Days if d.numVehicles > 0]
 
         except self.BaseParseException:
             pass
@@ -263,81 +318,34 @@ class SolutionCVRPTWUI(base.BaseParser):
         for tool in tagWithTools.findall(self.LANG.XML.tool):
             Num_tools += 1
             toolID = self._checkInt('Tool ID', self._findAttribute(tool, self.LANG.XML.attr_id), extra + ' ' )
-            self._checkError('The indexing of the Tools is incorrect at Tool nr. %d (%s).' % (toolID, extra), toolID == Num_tools )
-            used = self._checkInt('Tools used', tool.text, 'for tool %d %s ' % (toolID,extra) )
+            self._check(toolID == Num_tools, 'The indexing of the Tools is incorrect at Tool nr. %d (%s).', toolID, extra)
+            used = self._checkInt('Tools used', tool.text, 'for tool %d %s ', toolID, extra )
             usedTools.append(used)
-        self._checkError("Expected %d tools (%s). Found: %d." % (nofTools,extra,Num_tools), Num_tools == nofTools)
+        self._check(Num_tools == nofTools, "Expected %d tools (%s). Found: %d.", nofTools, extra, Num_tools)
         return usedTools
     
     def _initXML(self):
         try:
-            fd = open(self.inputfile, 'r')
+            fd = self._openInput()
         except:
             self.errorReport.append( 'Solution file %s could not be read.' % self.inputfile )
             return
         
         try:
             with fd:
+                if self.stream:
+                    self._iterXML(fd)
+                    return
                 tree = ET.parse(fd)
                 root = tree.getroot()                
                 self._checkError('Root tag is not equal to solution.',root.tag == self.LANG.XML.solution)
-                
-                info = self._findTag(root, self.LANG.XML.info )
-                self.Dataset = self._findTag(info, self.LANG.XML.dataset ).text
-                self.Name = self._findTag(info, self.LANG.XML.name ).text
-                
+                self._readXMLInfo(self._findTag(root, self.LANG.XML.info ))
                 cost = root.find( self.LANG.XML.cost )
                 if cost is not None:
-                    for field, member in self.LANG.XML.costfields.items():
-                        foundField = cost.find( field )
-                        if foundField is not None:
-                            value = self._checkInt(field, foundField.text )
-                            self.givenCost.__setattr__(member,value)
-                    foundTools = cost.find( self.LANG.XML.tools )
-                    if foundTools is not None:
-                        self.givenCost.ToolCount = self._parseToolsTag(foundTools,'in cost tools tag')
-                
+                    self._readXMLCost(cost)
                 days = self._findTag(root, self.LANG.XML.days )
                 for day in days.findall(self.LANG.XML.day):
-                    newDay = self.SolutionDay(self._checkInt('Day id', self._findAttribute(day, self.LANG.XML.attr_id)))
-                    self._checkError('Day number should be positive, found %d.' % (newDay.dayNumber), newDay.dayNumber > 0 )
-                    self._checkError('Day number should be at most %d, found %d.' % (self.Instance.Days,newDay.dayNumber), newDay.dayNumber <= self.Instance.Days )
-                    lastDay = self.Days[-1].dayNumber if len(self.Days) > 0 else 0
-                    self._checkError('Incorrect order of days, found day %d after day %d.' % (newDay.dayNumber, lastDay), newDay.dayNumber > lastDay )
-                    startDepot = day.find( self.LANG.XML.startDepot )
-                    finishDepot = day.find( self.LANG.XML.finishDepot )
-                    if startDepot is not None:
-                        newDay.givenStartDepot = self._parseToolsTag(startDepot,'in %s tag of day %d' % (self.LANG.XML.startDepot,newDay.dayNumber) )
-                    if finishDepot is not None:
-                        newDay.givenFinishDepot = self._parseToolsTag(finishDepot,'in %s tag of day %d' % (self.LANG.XML.finishDepot,newDay.dayNumber) )
-                    vehicles = self._findTag(day, self.LANG.XML.vehicles )
-                    if self.LANG.XML.attr_nofVehicles in vehicles.attrib:
-                        newDay.GivenNumberOfVehicles = self._checkInt('Number of vehicles',vehicles.attrib[self.LANG.XML.attr_nofVehicles], '(day %d) ' % newDay.dayNumber )
-                    Num_vehicles = 0
-                    for vehicle in vehicles.findall(self.LANG.XML.vehicle):
-                        Num_vehicles += 1
-                        vehicleID = self._checkInt('Vehicle ID', self._findAttribute(vehicle, self.LANG.XML.attr_id), 'of day %d ' % (newDay.dayNumber) )
-                        self._checkError('The indexing of the Vehicle is incorrect at Vehicle nr. %d of day %d.' % (vehicleID, newDay.dayNumber), vehicleID == Num_vehicles )
-                        veh = self.SolutionVehicle()
-                        distance = vehicle.find( self.LANG.XML.distance )
-                        if distance is not None:
-                            veh.givenDistance = self._checkInt('Distance of vehicle %d of day %d ' % (vehicleID,newDay.dayNumber), distance.text )
-                        route = self._findTag(vehicle, self.LANG.XML.route )
-                        for child in route:
-                            if child.tag == self.LANG.XML.depot:
-                                veh.Route.append(0)
-                                if len(child):
-                                    veh.givenVisits.append( self._parseToolsTag(child,'in %s tag of vehicle %d of day %d' % (self.LANG.XML.depot,vehicleID,newDay.dayNumber) ) )
-                            if child.tag == self.LANG.XML.request:
-                                typeAttr = self._findAttribute(child, self.LANG.XML.attr_type)
-                                self._checkError("The type of a reqeust should be '%s' or '%s' (vehicle %d of day %d), found '%s'." % (self.LANG.XML.pickup,self.LANG.XML.deliver,vehicleID,newDay.dayNumber,typeAttr), typeAttr == self.LANG.XML.pickup or typeAttr == self.LANG.XML.deliver )
-                                request = self._checkInt('Request', child.text, 'of vehicle %d of day %d ' % (vehicleID,newDay.dayNumber) )
-                                veh.Route.append(request if typeAttr == self.LANG.XML.deliver else -request)
-                        self._checkError('Route should be at least length 3, found %d (vehicle %d of day %d).' % (len(veh.Route),vehicleID,newDay.dayNumber),len(veh.Route)>=3)
-                        self._checkError('Route should start at the depot (vehicle %d of day %d).' % (vehicleID,newDay.dayNumber),veh.Route[0] == 0)
-                        self._checkError('Route should end at the depot (vehicle %d of day %d).' % (vehicleID,newDay.dayNumber),veh.Route[-1] == 0)
-                        newDay.Vehicles.append(veh)
-                    self.Days.append(newDay)
+                    self._readXMLDay(day)
                              
         except self.BaseParseException:
             pass
@@ -346,141 +354,325 @@ class SolutionCVRPTWUI(base.BaseParser):
             print( '\t' + '\n\t'.join(self.errorReport) )
             raise
     
-    def _calculateSolution(self):
+    def _readXMLInfo(self,info):
+        self.Dataset = self._findTag(info, self.LANG.XML.dataset ).text
+        self.Name = self._findTag(info, self.LANG.XML.name ).text
+    
+    def _readXMLCost(self,cost):
+        for field, member in self.LANG.XML.costfields.items():
+            foundField = cost.find( field )
+            if foundField is not None:
+                value = self._checkInt(field, foundField.text )
+                self.givenCost.__setattr__(member,value)
+        foundTools = cost.find( self.LANG.XML.tools )
+        if foundTools is not None:
+            self.givenCost.ToolCount = self._parseToolsTag(foundTools,'in cost tools tag')
+    
+    def _readXMLDay(self,day):
+        newDay = self.SolutionDay(self._checkInt('Day id', self._findAttribute(day, self.LANG.XML.attr_id)))
+        self._check(newDay.dayNumber > 0, 'Day number should be positive, found %d.', newDay.dayNumber)
+        self._check(newDay.dayNumber <= self.Instance.Days, 'Day number should be at most %d, found %d.', self.Instance.Days, newDay.dayNumber)
+        lastDay = self.Days[-1].dayNumber if len(self.Days) > 0 else 0
+        self._check(newDay.dayNumber > lastDay, 'Incorrect order of days, found day %d after day %d.', newDay.dayNumber, lastDay)
+        startDepot = day.find( self.LANG.XML.startDepot )
+        finishDepot = day.find( self.LANG.XML.finishDepot )
+        if startDepot is not None:
+            newDay.givenStartDepot = self._parseToolsTag(startDepot,'in %s tag of day %d' % (self.LANG.XML.startDepot,newDay.dayNumber) )
+        if finishDepot is not None:
+            newDay.givenFinishDepot = self._parseToolsTag(finishDepot,'in %s tag of day %d' % (self.LANG.XML.finishDepot,newDay.dayNumber) )
+        vehicles = self._findTag(day, self.LANG.XML.vehicles )
+        if self.LANG.XML.attr_nofVehicles in vehicles.attrib:
+            newDay.GivenNumberOfVehicles = self._checkInt('Number of vehicles',vehicles.attrib[self.LANG.XML.attr_nofVehicles], '(day %d) ', newDay.dayNumber )
+        Num_vehicles = 0
+        for vehicle in vehicles.findall(self.LANG.XML.vehicle):
+            Num_vehicles += 1
+            vehicleID = self._checkInt('Vehicle ID', self._findAttribute(vehicle, self.LANG.XML.attr_id), 'of day %d ', newDay.dayNumber )
+            self._check(vehicleID == Num_vehicles, 'The indexing of the Vehicle is incorrect at Vehicle nr. %d of day %d.', vehicleID, newDay.dayNumber)
+            veh = self.SolutionVehicle()
+            distance = vehicle.find( self.LANG.XML.distance )
+            if distance is not None:
+                veh.givenDistance = self._checkInt('Distance of vehicle %d of day %d ' % (vehicleID,newDay.dayNumber), distance.text )
+            route = self._findTag(vehicle, self.LANG.XML.route )
+            for child in route:
+                if child.tag == self.LANG.XML.depot:
+                    veh.Route.append(0)
+                    if len(child):
+                        veh.givenVisits.append( self._parseToolsTag(child,'in %s tag of vehicle %d of day %d' % (self.LANG.XML.depot,vehicleID,newDay.dayNumber) ) )
+                if child.tag == self.LANG.XML.request:
+                    typeAttr = self._findAttribute(child, self.LANG.XML.attr_type)
+                    self._check(typeAttr == self.LANG.XML.pickup or typeAttr == self.LANG.XML.deliver, "The type of a reqeust should be '%s' or '%s' (vehicle %d of day %d), found '%s'.", self.LANG.XML.pickup, self.LANG.XML.deliver, vehicleID, newDay.dayNumber, typeAttr)
+                    request = self._checkInt('Request', child.text, 'of vehicle %d of day %d ', vehicleID, newDay.dayNumber )
+                    veh.Route.append(request if typeAttr == self.LANG.XML.deliver else -request)
+            self._check(len(veh.Route)>=3, 'Route should be at least length 3, found %d (vehicle %d of day %d).', len(veh.Route), vehicleID, newDay.dayNumber)
+            self._check(veh.Route[0] == 0, 'Route should start at the depot (vehicle %d of day %d).', vehicleID, newDay.dayNumber)
+            self._check(veh.Route[-1] == 0, 'Route should end at the depot (vehicle %d of day %d).', vehicleID, newDay.dayNumber)
+            newDay.Vehicles.append(veh)
+        self._addDay(newDay)
+    
+    # _initXML for stream mode: every day element is read and calculated as soon as it ends, and then removed
+    def _iterXML(self,fd):
+        context = ET.iterparse(fd, events=('start', 'end'))
+        event, root = next(context)
+        self._checkError('Root tag is not equal to solution.',root.tag == self.LANG.XML.solution)
+        info = cost = days = None
+        depth = 1
+        for event, elem in context:
+            if event == 'start':
+                depth += 1
+                if depth == 2 and elem.tag == self.LANG.XML.days and days is None:
+                    days = elem
+                continue
+            depth -= 1
+            if depth == 1:
+                if elem.tag == self.LANG.XML.info and info is None:
+                    info = elem
+                    self._readXMLInfo(info)
+                elif elem.tag == self.LANG.XML.cost and cost is None:
+                    cost = elem
+                    self._readXMLCost(cost)
+            elif depth == 2 and elem.tag == self.LANG.XML.day and days is not None and elem in days:
+                self._readXMLDay(elem)
+                # the next day may be started already
+                days.remove(elem)
+        self._findTag(root, self.LANG.XML.info )
+        self._findTag(root, self.LANG.XML.days )
+    
+    def _initBIN(self):
         try:
-            totalDistance = 0
-            maxNumVehicles = 0
-            dayNumVehicles = 0
-            RequestDeliver = [None] * (len(self.Instance.Requests) + 1 )
-            RequestPickup  = [None] * (len(self.Instance.Requests) + 1 )
-            toolUse     = [0] * len(self.Instance.Tools)    
-            toolStatus  = [0] * len(self.Instance.Tools)
-            toolSize = [t.weight for t in self.Instance.Tools]
-            for day in self.Days:
-                day.calcStartDepot = [0] * len(self.Instance.Tools)
-                day.calcFinishDepot = [0] * len(self.Instance.Tools)
-                maxNumVehicles = max(maxNumVehicles,len(day.Vehicles))
-                dayNumVehicles += len(day.Vehicles)
-                for i in range(len(day.Vehicles)):
-                    vehicle = day.Vehicles[i]
-                    distance = 0
-                    lastNode = None
-                    currentTools = [0] * len(self.Instance.Tools)
-                    depotVisits = [[0] * len(self.Instance.Tools)]
-                    nodeVisits = []
-                    for node in vehicle.Route:
-                        if node == 0:
-                            if lastNode is not None:
-                                if lastNode == 0:
-                                    self._checkError('Two consecutive depot visits at vehicle %d of day %d.' % (i+1,day.dayNumber), False )
-                                bringTools  = [0] * len(self.Instance.Tools)
-                                sumTools    = [0] * len(self.Instance.Tools)
-                                for tools in nodeVisits:
-                                    sumTools    = [max(x) for x in zip(tools, sumTools)]
-                                    bringTools  = [min(x) for x in zip(bringTools, tools)]
-                                    sumTools    = [max(0, a) for a in sumTools]
-                                depotVisits[-1] = [sum(x) for x in zip(bringTools, depotVisits[-1])]
-                                
-                                loaded = sum([a*-b for a,b in zip(toolSize,depotVisits[-1])])
-                                self._checkError('Capacity exceeded at vehicle %d of day %d, found %d (maximum %d).' % (i+1, day.dayNumber, loaded, self.Instance.Capacity), loaded <= self.Instance.Capacity )
-                                for tools in nodeVisits:
-                                    loaded = sum([a*(b-c) for a,b,c in zip(toolSize,tools,depotVisits[-1])])
-                                    self._checkError('Capacity exceeded at vehicle %d of day %d, found %d (maximum %d).' % (i+1, day.dayNumber, loaded, self.Instance.Capacity), loaded <= self.Instance.Capacity )
-                                depotVisits.append([b-a for a,b in zip(bringTools, nodeVisits[-1])])
-                                currentTools = [0] * len(self.Instance.Tools)
-                                nodeVisits = []
-                        elif node > 0:
-                            self._checkError('Unknown request %d (current day %d).' % (node,day.dayNumber), node < len(RequestDeliver) )
-                            self._checkError('Deliver of request %d is already planned on day %d (current day %d).' % (node,RequestDeliver[node] if RequestDeliver[node] is not None else 0,day.dayNumber), RequestDeliver[node] == None )
-                            RequestDeliver[node] = day.dayNumber
-                            currentTools[self.Instance.Requests[node-1].tool-1] -= self.Instance.Requests[node-1].toolCount
-                        elif node < 0:
-                            node = - node
-                            self._checkError('Unknown request %d (current day %d).' % (node,day.dayNumber), node < len(RequestPickup) )
-                            self._checkError('Pickup of request %d is already planned on day %d (current day %d).' % (node,RequestPickup[node] if RequestPickup[node] is not None else 0,day.dayNumber), RequestPickup[node] == None )
-                            RequestPickup[node] = day.dayNumber
-                            currentTools[self.Instance.Requests[node-1].tool-1] += self.Instance.Requests[node-1].toolCount
-                        nodeVisits.append(copy.copy(currentTools))
-                        if lastNode is not None:
-                            fromCoord = self.Instance.DepotCoordinate if lastNode == 0 else self.Instance.Requests[lastNode-1].node
-                            toCoord = self.Instance.DepotCoordinate if node == 0 else self.Instance.Requests[node-1].node
-                            distance += self.Instance.calcDistance[fromCoord][toCoord]
-                        lastNode = node
-                    distance += self.Instance.calcDistance[toCoord][self.Instance.DepotCoordinate]
-                    vehicle.calcDistance = distance
-                    self._checkError('Distance of vehicle %d is exceeded, %d (maximum %d) (current day %d).' % (i+1,distance,self.Instance.MaxDistance,day.dayNumber), distance <= self.Instance.MaxDistance )
-                    vehicle.calcVisits = depotVisits
-                    totalDistance += distance
-                    visitTotal          = [0] * len(self.Instance.Tools)
-                    totalUsedAtStart    = [0] * len(self.Instance.Tools)
-                    for visit in vehicle.calcVisits:
-                        visitTotal = [sum(x) for x in zip(visit, visitTotal)]
-                        totalUsedAtStart    = [b - min(0, a) for a,b in zip(visitTotal, totalUsedAtStart)]
-                        visitTotal          = [max(0, a) for a in visitTotal]
-                    day.calcStartDepot  = [b - a for a,b in zip(totalUsedAtStart, day.calcStartDepot)]
-                    day.calcFinishDepot = [b + a for a,b in zip(visitTotal, day.calcFinishDepot)]
-                toolStatus = [sum(x) for x in zip(toolStatus, day.calcStartDepot)]
-                toolUse = [max(-a,b) for a, b in zip(toolStatus, toolUse)]
-                toolStatus = [sum(x) for x in zip(toolStatus, day.calcFinishDepot)]
-            
-            for i in range(1,len(self.Instance.Requests)+1):
-                self._checkError('Deliver for request %d is not executed.' % i, RequestDeliver[i] is not None)
-                self._checkError('Pickup for request %d is not executed.' % i, RequestPickup[i] is not None)
-                if RequestDeliver[i] is not None and RequestPickup[i] is not None:
-                    self._checkError('Number of days between deliver and pickup is not correct for request %d, found %d instead of %d.' % (i,RequestPickup[i] - RequestDeliver[i],self.Instance.Requests[i-1].numDays), RequestPickup[i] - RequestDeliver[i] == self.Instance.Requests[i-1].numDays)
-                    self._checkError('Deliver is not planned on a correct day for request %d, found %d instead of %d-%d.' % (i,RequestDeliver[i],self.Instance.Requests[i-1].fromDay,self.Instance.Requests[i-1].toDay), self.Instance.Requests[i-1].fromDay <= RequestDeliver[i] <= self.Instance.Requests[i-1].toDay)
-            
-            for i in range(len(self.Instance.Tools)):
-                self._checkError('Number of tools used is too high for tool %d, found %d (maximum %d).' % (i+1,toolUse[i],self.Instance.Tools[i].amount), toolUse[i] <= self.Instance.Tools[i].amount)
-            
-            self.calcCost.MaxNumberOfVehicles = maxNumVehicles
-            self.calcCost.NumberOfVehicleDays = dayNumVehicles
-            self.calcCost.Distance = totalDistance
-            self.calcCost.ToolCount = toolUse        
-            self.calcCost.calculateCost(self.Instance)
+            fd = open(self.inputfile, 'rb')
+        except:
+            self.errorReport.append( 'Solution file %s could not be read.' % self.inputfile )
+            return
+        
+        with fd:
+            data = fd.read()
+        try:
+            self._readBIN(data)
+        except self.BaseParseException:
+            pass
     
-            toolStatus = toolUse
-            for day in self.Days:
-                toolStatus = [sum(x) for x in zip(toolStatus, day.calcStartDepot)]
-                day.calcStartDepot = toolStatus
-                toolStatus = [sum(x) for x in zip(toolStatus, day.calcFinishDepot)]
-                day.calcFinishDepot = toolStatus
-            
-            assert (not self.isValid() or toolStatus == toolUse), 'ALL TOOLS SHOULD BE RETURNED'
+    def _readBIN(self,data):
+        header = self.LANG.BIN.header
+        isBinary = len(data) >= header.size and data[:len(self.LANG.BIN.magic)] == self.LANG.BIN.magic
+        self._checkError('Solution file %s is not a binary CVRPTWUI solution file.' % self.inputfile, isBinary)
+        if not isBinary:
+            return
+        magic, version, extra, routeSize, Num_tools, Num_days, Num_vehicles, datasetLength, nameLength = header.unpack_from(data)
+        self._check(version == self.LANG.BIN.version, 'Unsupported binary solution file version %d (expected %d).', version, self.LANG.BIN.version)
+        self._check(routeSize in (2,4), 'Unsupported request id size %d in the binary solution file.', routeSize)
+        if version != self.LANG.BIN.version or routeSize not in (2,4):
+            return
+        
+        view = memoryview(data)
+        pos = header.size
+        def readColumn(count,typecode):
+            nonlocal pos
+            values = array(typecode)
+            end = pos + count*values.itemsize
+            if end > len(data):
+                return None
+            values.frombytes(view[pos:end])
+            if sys.byteorder == 'big':
+                values.byteswap()
+            pos = end
+            return values.tolist()
+        
+        self.Dataset = bytes(view[pos:pos+datasetLength]).decode('utf-8','replace')
+        self.Name = bytes(view[pos+datasetLength:pos+datasetLength+nameLength]).decode('utf-8','replace')
+        pos += datasetLength + nameLength
+        if extra:
+            self._check(Num_tools == len(self.Instance.Tools), 'Expected %d tools in the binary solution file. Found: %d.', len(self.Instance.Tools), Num_tools)
+            cost = readColumn(4 + Num_tools, 'q')
+        dayNumbers = readColumn(Num_days, 'i')
+        vehicleCounts = readColumn(Num_days, 'i')
+        routeLengths = readColumn(Num_vehicles, 'i')
+        complete = None not in (dayNumbers, vehicleCounts, routeLengths) and (not extra or cost is not None) \
+                and sum(vehicleCounts) == Num_vehicles and min(vehicleCounts or [0]) >= 0 and min(routeLengths or [0]) >= 0
+        routes = readColumn(sum(routeLengths), 'h' if routeSize == 2 else 'i') if complete else None
+        if routes is not None:
+            size = pos
+            if extra:
+                size += 4*(Num_days*(1 + 2*Num_tools) + routes.count(0)*Num_tools) + 8*Num_vehicles
+            complete = len(data) == size
+        self._check(routes is not None and complete, 'The binary solution file %s is incomplete or has an incorrect size.', self.inputfile)
+        if routes is None or not complete:
+            return
+        
+        if extra:
+            self.givenCost.MaxNumberOfVehicles, self.givenCost.NumberOfVehicleDays, self.givenCost.Distance, self.givenCost.Cost = cost[:4]
+            self.givenCost.ToolCount = cost[4:]
+            nofVehicles = readColumn(Num_days, 'i')
+            startDepots = readColumn(Num_days*Num_tools, 'i')
+            finishDepots = readColumn(Num_days*Num_tools, 'i')
+            vehicleDistances = readColumn(Num_vehicles, 'q')
+            visits = readColumn(routes.count(0)*Num_tools, 'i')
+        
+        vehicleNr = routePos = visitPos = 0
+        for d in range(Num_days):
+            newDay = self.SolutionDay(dayNumbers[d])
+            self._check(newDay.dayNumber > 0, 'Day number should be positive, found %d.', newDay.dayNumber)
+            self._check(newDay.dayNumber <= self.Instance.Days, 'Day number should be at most %d, found %d.', self.Instance.Days, newDay.dayNumber)
+            lastDay = self.Days[-1].dayNumber if len(self.Days) > 0 else 0
+            self._check(newDay.dayNumber > lastDay, 'Incorrect order of days, found day %d after day %d.', newDay.dayNumber, lastDay)
+            if extra:
+                newDay.GivenNumberOfVehicles = nofVehicles[d]
+                newDay.givenStartDepot = startDepots[d*Num_tools:(d+1)*Num_tools]
+                newDay.givenFinishDepot = finishDepots[d*Num_tools:(d+1)*Num_tools]
+            for v in range(vehicleCounts[d]):
+                veh = self.SolutionVehicle()
+                veh.Route = routes[routePos:routePos+routeLengths[vehicleNr]]
+                routePos += routeLengths[vehicleNr]
+                self._check(len(veh.Route)>=3, 'Route should be at least length 3, found %d (vehicle %d of day %d).', len(veh.Route), v+1, newDay.dayNumber)
+                self._check(veh.Route[0] == 0, 'Route should start at the depot (vehicle %d of day %d).', v+1, newDay.dayNumber)
+                self._check(veh.Route[-1] == 0, 'Route should end at the depot (vehicle %d of day %d).', v+1, newDay.dayNumber)
+                if extra:
+                    veh.givenDistance = vehicleDistances[vehicleNr]
+                    numVisits = veh.Route.count(0)
+                    veh.givenVisits = [visits[i:i+Num_tools] for i in range(visitPos, visitPos + numVisits*Num_tools, Num_tools)]
+                    visitPos += numVisits*Num_tools
+                newDay.Vehicles.append(veh)
+                vehicleNr += 1
+            self.Days.append(newDay)
+            if len(newDay.Vehicles) == 0:
+                self.warningReport.append( 'Empty day %d' % newDay.dayNumber )
+        self.Days = [d for d in self.Days if len(d.Vehicles) > 0]
+    
+    def _calculateSolution(self):
+        try:
+            if not self.streamed:
+                self.totals = self.SolutionTotals(len(self.Instance.Requests),len(self.Instance.Tools))
+                # the routes are evaluated per day, in worker processes when processes is given, and the requests
+                # and tools are checked here in the order of the days. The solution.day phase times the evaluation
+                # and the checks of a day, with worker processes it is the wait for the result and the checks.
+                days = [(day.dayNumber, [vehicle.Route for vehicle in day.Vehicles]) for day in self.Days]
+                results = _dayResults(self.Instance,days,self.processes,self.breakOnError)
+                for day in profiling.phases('solution.day', self.Days, lambda day: {'day': day.dayNumber}):
+                    self._calculateDay(day,next(results))
+            self._finishSolution()
         except self.BaseParseException:
             pass
         except:
             print('Crash during CVRPTWUI solution calculation\nThe following errors were found:')
             print( '\t' + '\n\t'.join(self.errorReport) )
             raise
+    
+    # Checks the requests of a day evaluated by evaluateDay and adds the day to the totals
+    def _calculateDay(self,day,result):
+        totals = self.totals
+        RequestDeliver = totals.RequestDeliver
+        RequestPickup = totals.RequestPickup
+        vehicles, day.calcStartDepot, day.calcFinishDepot, errors = result
+        nextError = 0
+        for i in range(len(day.Vehicles)):
+            for position, node in enumerate(day.Vehicles[i].Route):
+                while nextError < len(errors) and errors[nextError][:2] <= (i, position):
+                    self._checkError(errors[nextError][2], False)
+                    nextError += 1
+                if node > 0:
+                    self._check(node < len(RequestDeliver), 'Unknown request %d (current day %d).', node, day.dayNumber)
+                    self._check(RequestDeliver[node] == None, 'Deliver of request %d is already planned on day %d (current day %d).', node, RequestDeliver[node] if RequestDeliver[node] is not None else 0, day.dayNumber)
+                    RequestDeliver[node] = day.dayNumber
+                elif node < 0:
+                    node = - node
+                    self._check(node < len(RequestPickup), 'Unknown request %d (current day %d).', node, day.dayNumber)
+                    self._check(RequestPickup[node] == None, 'Pickup of request %d is already planned on day %d (current day %d).', node, RequestPickup[node] if RequestPickup[node] is not None else 0, day.dayNumber)
+                    RequestPickup[node] = day.dayNumber
+        for error in errors[nextError:]:
+            self._checkError(error[2], False)
+        
+        totals.maxNumVehicles = max(totals.maxNumVehicles,len(day.Vehicles))
+        totals.dayNumVehicles += len(day.Vehicles)
+        for vehicle, (distance, depotVisits) in zip(day.Vehicles, vehicles):
+            vehicle.calcDistance = distance
+            vehicle.calcVisits = depotVisits
+            totals.totalDistance += distance
+        toolStatus = [sum(x) for x in zip(totals.toolStatus, day.calcStartDepot)]
+        totals.toolUse = [max(-a,b) for a, b in zip(toolStatus, totals.toolUse)]
+        totals.toolStatus = [sum(x) for x in zip(toolStatus, day.calcFinishDepot)]
+    
+    # In stream mode every day is calculated when it is read, with the distances of its routes only. Its
+    # vehicles are not kept: the given values of its vehicles are checked here and reported by
+    # areGivenValuesValid. Returns the StreamedDay that replaces the day.
+    def _streamDay(self,day):
+        if not self.streamed:
+            self.totals = self.SolutionTotals(len(self.Instance.Requests),len(self.Instance.Tools))
+            self.streamed = True
+        with profiling.phase('solution.day', day=day.dayNumber):
+            self._calculateDay(day,evaluateDay(self.Instance,day.dayNumber,[vehicle.Route for vehicle in day.Vehicles],self.breakOnError,True))
+        messages = []
+        def collect(test,message,*args):
+            if not test:
+                messages.append(message % args)
+        self._checkGivenVehicles(day,collect)
+        return self.StreamedDay(day,messages)
+    
+    # Adds a day that was read, in stream mode the day is calculated until the first error. Days without
+    # vehicles are calculated as well, the xml parser keeps them and _finishSolution needs their depots.
+    def _addDay(self,day):
+        self.Days.append(day)
+        if self.stream and self.isValid():
+            self.Days[-1] = self._streamDay(day)
+    
+    # The checks over all days, after the days are calculated
+    def _finishSolution(self):
+        totals = self.totals
+        RequestDeliver = totals.RequestDeliver
+        RequestPickup = totals.RequestPickup
+        toolUse = totals.toolUse
+        for i in range(1,len(self.Instance.Requests)+1):
+            self._check(RequestDeliver[i] is not None, 'Deliver for request %d is not executed.', i)
+            self._check(RequestPickup[i] is not None, 'Pickup for request %d is not executed.', i)
+            if RequestDeliver[i] is not None and RequestPickup[i] is not None:
+                self._check(RequestPickup[i] - RequestDeliver[i] == self.Instance.Requests[i-1].numDays, 'Number of days between deliver and pickup is not correct for request %d, found %d instead of %d.', i, RequestPickup[i] - RequestDeliver[i], self.Instance.Requests[i-1].numDays)
+                self._check(self.Instance.Requests[i-1].fromDay <= RequestDeliver[i] <= self.Instance.Requests[i-1].toDay, 'Deliver is not planned on a correct day for request %d, found %d instead of %d-%d.', i, RequestDeliver[i], self.Instance.Requests[i-1].fromDay, self.Instance.Requests[i-1].toDay)
+        
+        for i in range(len(self.Instance.Tools)):
+            self._check(toolUse[i] <= self.Instance.Tools[i].amount, 'Number of tools used is too high for tool %d, found %d (maximum %d).', i+1, toolUse[i], self.Instance.Tools[i].amount)
+        
+        self.calcCost.MaxNumberOfVehicles = totals.maxNumVehicles
+        self.calcCost.NumberOfVehicleDays = totals.dayNumVehicles
+        self.calcCost.Distance = totals.totalDistance
+        self.calcCost.ToolCount = toolUse        
+        self.calcCost.calculateCost(self.Instance)
+
+        toolStatus = toolUse
+        for day in self.Days:
+            toolStatus = [sum(x) for x in zip(toolStatus, day.calcStartDepot)]
+            day.calcStartDepot = toolStatus
+            toolStatus = [sum(x) for x in zip(toolStatus, day.calcFinishDepot)]
+            day.calcFinishDepot = toolStatus
+        
+        assert (not self.isValid() or toolStatus == toolUse), 'ALL TOOLS SHOULD BE RETURNED'
         
     def isValid(self):
         return not self.errorReport
 
     def areGivenValuesValid(self):
+        with profiling.phase('solution.areGivenValuesValid'):
+            return self._areGivenValuesValid()
+
+    def _areGivenValuesValid(self):
         try:
-            self._checkError('Incorrect max number of vehicles (%d instead of %d).' % (self.givenCost.MaxNumberOfVehicles if self.givenCost.MaxNumberOfVehicles is not None else 0,self.calcCost.MaxNumberOfVehicles), self.givenCost.MaxNumberOfVehicles is None or self.givenCost.MaxNumberOfVehicles == self.calcCost.MaxNumberOfVehicles )
-            self._checkError('Incorrect number of day-vehicles (%d instead of %d).' % (self.givenCost.NumberOfVehicleDays if self.givenCost.NumberOfVehicleDays is not None else 0,self.calcCost.NumberOfVehicleDays), self.givenCost.MaxNumberOfVehicles is None or self.givenCost.NumberOfVehicleDays == self.calcCost.NumberOfVehicleDays )
-            self._checkError('Incorrect distance (%d instead of %d).' % (self.givenCost.Distance if self.givenCost.Distance is not None else 0,self.calcCost.Distance), self.givenCost.Distance is None or self.givenCost.Distance == self.calcCost.Distance )
-            self._checkError('Incorrect cost (%d instead of %d).' % (self.givenCost.Cost if self.givenCost.Cost is not None else 0,self.calcCost.Cost), self.givenCost.Cost is None or self.givenCost.Cost == self.calcCost.Cost )
+            self._check(self.givenCost.MaxNumberOfVehicles is None or self.givenCost.MaxNumberOfVehicles == self.calcCost.MaxNumberOfVehicles, 'Incorrect max number of vehicles (%d instead of %d).', self.givenCost.MaxNumberOfVehicles if self.givenCost.MaxNumberOfVehicles is not None else 0, self.calcCost.MaxNumberOfVehicles)
+            self._check(self.givenCost.MaxNumberOfVehicles is None or self.givenCost.NumberOfVehicleDays == self.calcCost.NumberOfVehicleDays, 'Incorrect number of day-vehicles (%d instead of %d).', self.givenCost.NumberOfVehicleDays if self.givenCost.NumberOfVehicleDays is not None else 0, self.calcCost.NumberOfVehicleDays)
+            self._check(self.givenCost.Distance is None or self.givenCost.Distance == self.calcCost.Distance, 'Incorrect distance (%d instead of %d).', self.givenCost.Distance if self.givenCost.Distance is not None else 0, self.calcCost.Distance)
+            self._check(self.givenCost.Cost is None or self.givenCost.Cost == self.calcCost.Cost, 'Incorrect cost (%d instead of %d).', self.givenCost.Cost if self.givenCost.Cost is not None else 0, self.calcCost.Cost)
             if self.givenCost.ToolCount is not None:
                 for i in range(len(self.calcCost.ToolCount)):
-                    self._checkError('Incorrect tool count for tool %d (%d instead of %d).' % (i+1,self.givenCost.ToolCount[i],self.calcCost.ToolCount[i]), self.givenCost.ToolCount[i] == self.calcCost.ToolCount[i] )
+                    self._check(self.givenCost.ToolCount[i] == self.calcCost.ToolCount[i], 'Incorrect tool count for tool %d (%d instead of %d).', i+1, self.givenCost.ToolCount[i], self.calcCost.ToolCount[i])
             for day in self.Days:
-                self._checkError('Incorrect number of vehicles for day %d (%d instead of %d).' % (day.dayNumber,day.GivenNumberOfVehicles if day.GivenNumberOfVehicles is not None else 0, len(day.Vehicles) ), day.GivenNumberOfVehicles is None or day.GivenNumberOfVehicles == len(day.Vehicles) )
+                self._check(day.GivenNumberOfVehicles is None or day.GivenNumberOfVehicles == day.numVehicles, 'Incorrect number of vehicles for day %d (%d instead of %d).', day.dayNumber, day.GivenNumberOfVehicles if day.GivenNumberOfVehicles is not None else 0, day.numVehicles)
                 if day.givenStartDepot is not None:
                     for i in range(len(day.calcStartDepot)):
-                        self._checkError('Incorrect tool count after the start of day %d for tool %d (%d instead of %d).' % (day.dayNumber,i+1,day.givenStartDepot[i],day.calcStartDepot[i]), day.givenStartDepot[i] == day.calcStartDepot[i] )
+                        self._check(day.givenStartDepot[i] == day.calcStartDepot[i], 'Incorrect tool count after the start of day %d for tool %d (%d instead of %d).', day.dayNumber, i+1, day.givenStartDepot[i], day.calcStartDepot[i])
                 if day.givenFinishDepot is not None:
                     for i in range(len(day.calcFinishDepot)):
-                        self._checkError('Incorrect tool count after the finish of day %d for tool %d (%d instead of %d).' % (day.dayNumber,i+1,day.givenFinishDepot[i],day.calcFinishDepot[i]), day.givenFinishDepot[i] == day.calcFinishDepot[i] )
-                for v in range(len(day.Vehicles)):
-                    vehicle = day.Vehicles[v]
-                    self._checkError('Incorrect distance for vehicle %d of day %d (%d instead of %d).' % (v+1,day.dayNumber,vehicle.givenDistance if vehicle.givenDistance is not None else 0,vehicle.calcDistance), vehicle.givenDistance is None or vehicle.givenDistance == vehicle.calcDistance )
-                    if len(vehicle.givenVisits):
-                        for V in range(len(vehicle.calcVisits)):
-                            for i in range(len(vehicle.calcVisits[V])):
-                                self._checkError('Incorrect tool count for tool %d at visit %d for vehicle %d of day %d (%d instead of %d)' % (i+1,v+1,V+1,day.dayNumber,vehicle.givenVisits[V][i],vehicle.calcVisits[V][i]), vehicle.givenVisits[V][i] == vehicle.calcVisits[V][i] )
+                        self._check(day.givenFinishDepot[i] == day.calcFinishDepot[i], 'Incorrect tool count after the finish of day %d for tool %d (%d instead of %d).', day.dayNumber, i+1, day.givenFinishDepot[i], day.calcFinishDepot[i])
+                if day.givenVehicleErrors is not None:
+                    for message in day.givenVehicleErrors:
+                        self._checkError(message,False)
+                else:
+                    self._checkGivenVehicles(day,self._check)
         except self.BaseParseException as E:
             return (False, E.message if E.message is not None else '')
         except:
@@ -489,12 +681,28 @@ class SolutionCVRPTWUI(base.BaseParser):
             raise
         
         return (True, '')
+    
+    # The given distances and visits of the vehicles of a day, check is called like _check
+    def _checkGivenVehicles(self,day,check):
+        for v in range(len(day.Vehicles)):
+            vehicle = day.Vehicles[v]
+            check(vehicle.givenDistance is None or vehicle.givenDistance == vehicle.calcDistance, 'Incorrect distance for vehicle %d of day %d (%d instead of %d).', v+1, day.dayNumber, vehicle.givenDistance if vehicle.givenDistance is not None else 0, vehicle.calcDistance)
+            if len(vehicle.givenVisits):
+                check(len(vehicle.givenVisits) == len(vehicle.calcVisits), 'Incorrect number of visits for vehicle %d of day %d (%d instead of %d).', v+1, day.dayNumber, len(vehicle.givenVisits), len(vehicle.calcVisits))
+                for V in range(min(len(vehicle.givenVisits),len(vehicle.calcVisits))):
+                    for i in range(len(vehicle.calcVisits[V])):
+                        check(vehicle.givenVisits[V][i] == vehicle.calcVisits[V][i], 'Incorrect tool count for tool %d at visit %d for vehicle %d of day %d (%d instead of %d)', i+1, v+1, V+1, day.dayNumber, vehicle.givenVisits[V][i], vehicle.calcVisits[V][i])
         
     def writeSolution(self,filename,writeExtra):
-        if filename.endswith('.xml'):
-            res = self._writeSolutionXML(filename,writeExtra)
-        else:
-            res = self._writeSolutionTXT(filename,writeExtra)
+        with profiling.phase('solution.write', file=filename):
+            if self.stream:
+                res = (False, 'The routes of a solution read with stream are not kept.')
+            elif filename.endswith('.xml'):
+                res = self._writeSolutionXML(filename,writeExtra)
+            elif filename.endswith('.bin'):
+                res = self._writeSolutionBIN(filename,writeExtra)
+            else:
+                res = self._writeSolutionTXT(filename,writeExtra)
         if res[0]:
             print('Solution file written to %s' % filename)
         else:
@@ -536,88 +744,396 @@ class SolutionCVRPTWUI(base.BaseParser):
                 
         return (True, '')
      
-    def _writeSolutionXML(self,filename,writeExtra):
-        root = ET.Element(self.LANG.XML.solution)
-        
-        info = ET.SubElement( root, self.LANG.XML.info )
-        ET.SubElement( info, self.LANG.XML.dataset ).text = self.Dataset
-        ET.SubElement( info, self.LANG.XML.name ).text = self.Name
+    def _writeSolutionBIN(self,filename,writeExtra):
+        try:
+            fd = open(filename,  mode='wb')
+        except:
+            return (False, 'Could not write to file.')
         
-        if writeExtra:
-            cost = ET.SubElement( root, self.LANG.XML.cost )
-            ET.SubElement( cost, self.LANG.XML.maxNumVehicles ).text = str(self.calcCost.MaxNumberOfVehicles)
-            ET.SubElement( cost, self.LANG.XML.numVehicleDays ).text = str(self.calcCost.NumberOfVehicleDays)
-            ET.SubElement( cost, self.LANG.XML.distance ).text = str(self.calcCost.Distance)
-            ET.SubElement( cost, self.LANG.XML.costValue ).text = str(self.calcCost.Cost)
-            tools = ET.SubElement( cost, self.LANG.XML.tools )
-            for t in range(len(self.calcCost.ToolCount)):
-                ET.SubElement( tools, self.LANG.XML.tool, {self.LANG.XML.attr_id: str(t+1)} ).text = str(self.calcCost.ToolCount[t])
+        def column(values,typecode):
+            values = array(typecode,values)
+            if sys.byteorder == 'big':
+                values.byteswap()
+            return values.tobytes()
         
-        days = ET.SubElement( root, self.LANG.XML.days )
-        for day in self.Days:
-            dayTag = ET.SubElement( days, self.LANG.XML.day, {self.LANG.XML.attr_id: str(day.dayNumber)} )
+        with fd:
+            dataset = self.Dataset.encode('utf-8')
+            name = self.Name.encode('utf-8')
+            vehicles = [v for day in self.Days for v in day.Vehicles]
+            numTools = len(self.Instance.Tools)
+            routeSize = 2 if len(self.Instance.Requests) < 0x8000 else 4
+            fd.write(self.LANG.BIN.header.pack(self.LANG.BIN.magic, self.LANG.BIN.version, 1 if writeExtra else 0, routeSize, numTools,
+                                               len(self.Days), len(vehicles), len(dataset), len(name)))
+            fd.write(dataset)
+            fd.write(name)
             if writeExtra:
-                startDepot = ET.SubElement( dayTag, self.LANG.XML.startDepot )
-                finishDepot = ET.SubElement( dayTag, self.LANG.XML.finishDepot )
-                for t in range(len(day.calcStartDepot)):
-                    ET.SubElement( startDepot, self.LANG.XML.tool, {self.LANG.XML.attr_id: str(t+1)} ).text = str(day.calcStartDepot[t])
-                    ET.SubElement( finishDepot, self.LANG.XML.tool, {self.LANG.XML.attr_id: str(t+1)} ).text = str(day.calcFinishDepot[t])
-
-            vehicles = ET.SubElement( dayTag, self.LANG.XML.vehicles )    
+                cost = self.calcCost
+                fd.write(column([cost.MaxNumberOfVehicles, cost.NumberOfVehicleDays, cost.Distance, cost.Cost] + cost.ToolCount, 'q'))
+            fd.write(column((day.dayNumber for day in self.Days), 'i'))
+            fd.write(column((len(day.Vehicles) for day in self.Days), 'i'))
+            fd.write(column((len(v.Route) for v in vehicles), 'i'))
+            fd.write(column(chain.from_iterable(v.Route for v in vehicles), 'h' if routeSize == 2 else 'i'))
             if writeExtra:
-                vehicles.attrib[self.LANG.XML.attr_nofVehicles] = str(len(day.Vehicles))
-            for v in range(len(day.Vehicles)):
-                vehicle = day.Vehicles[v]
-                vehicleTag = ET.SubElement( vehicles, self.LANG.XML.vehicle, {self.LANG.XML.attr_id: str(v+1)} )
-                if writeExtra:
-                    ET.SubElement( vehicleTag, self.LANG.XML.distance ).text = str(vehicle.calcDistance)
-                route = ET.SubElement( vehicleTag, self.LANG.XML.route )
-                visit = 0;
-                for n in vehicle.Route:
-                    if n == 0:
-                        depot = ET.SubElement( route, self.LANG.XML.depot )
-                        if writeExtra:
-                            for t in range(len(vehicle.calcVisits[visit])):
-                                ET.SubElement( depot, self.LANG.XML.tool, {self.LANG.XML.attr_id: str(t+1)} ).text = str(vehicle.calcVisits[visit][t])                            
-                        visit += 1
-                    else:
-                        ET.SubElement( route, self.LANG.XML.request, {self.LANG.XML.attr_type: self.LANG.XML.pickup if n < 0 else self.LANG.XML.deliver} ).text = str(abs(n))
-                    
-        SolutionCVRPTWUI.indent(root)
+                fd.write(column((len(day.Vehicles) for day in self.Days), 'i'))
+                fd.write(column(chain.from_iterable(day.calcStartDepot for day in self.Days), 'i'))
+                fd.write(column(chain.from_iterable(day.calcFinishDepot for day in self.Days), 'i'))
+                fd.write(column((v.calcDistance for v in vehicles), 'q'))
+                fd.write(column(chain.from_iterable(chain.from_iterable(v.calcVisits) for v in vehicles), 'i'))
         
+        return (True, '')
+     
+    def _writeSolutionXML(self,filename,writeExtra):
         try:
             fd = open(filename,  mode='w')
         except:
             return (False, 'Could not write to file.')
         
         with fd:
-            tree = ET.ElementTree(root)
             fd.write('<?xml version="1.0" encoding="UTF-8"?>\n')
-            tree.write(fd,encoding='utf-8',)
+            xml = base.XMLWriter(fd)
+            xml.start( self.LANG.XML.solution )
+            
+            xml.start( self.LANG.XML.info )
+            xml.element( self.LANG.XML.dataset, self.Dataset )
+            xml.element( self.LANG.XML.name, self.Name )
+            xml.end()
+            
+            if writeExtra:
+                xml.start( self.LANG.XML.cost )
+                xml.element( self.LANG.XML.maxNumVehicles, str(self.calcCost.MaxNumberOfVehicles) )
+                xml.element( self.LANG.XML.numVehicleDays, str(self.calcCost.NumberOfVehicleDays) )
+                xml.element( self.LANG.XML.distance, str(self.calcCost.Distance) )
+                xml.element( self.LANG.XML.costValue, str(self.calcCost.Cost) )
+                xml.start( self.LANG.XML.tools )
+                for t in range(len(self.calcCost.ToolCount)):
+                    xml.element( self.LANG.XML.tool, str(self.calcCost.ToolCount[t]), {self.LANG.XML.attr_id: str(t+1)} )
+                xml.end()
+                xml.end()
+            
+            xml.start( self.LANG.XML.days )
+            for day in self.Days:
+                xml.start( self.LANG.XML.day, {self.LANG.XML.attr_id: str(day.dayNumber)} )
+                if writeExtra:
+                    for depotTag, depotTools in ((self.LANG.XML.startDepot, day.calcStartDepot), (self.LANG.XML.finishDepot, day.calcFinishDepot)):
+                        xml.start( depotTag )
+                        for t in range(len(depotTools)):
+                            xml.element( self.LANG.XML.tool, str(depotTools[t]), {self.LANG.XML.attr_id: str(t+1)} )
+                        xml.end()
+                
+                xml.start( self.LANG.XML.vehicles, {self.LANG.XML.attr_nofVehicles: str(len(day.Vehicles))} if writeExtra else None )
+                for v in range(len(day.Vehicles)):
+                    vehicle = day.Vehicles[v]
+                    xml.start( self.LANG.XML.vehicle, {self.LANG.XML.attr_id: str(v+1)} )
+                    if writeExtra:
+                        xml.element( self.LANG.XML.distance, str(vehicle.calcDistance) )
+                    xml.start( self.LANG.XML.route )
+                    visit = 0;
+                    for n in vehicle.Route:
+                        if n == 0:
+                            if writeExtra:
+                                xml.start( self.LANG.XML.depot )
+                                for t in range(len(vehicle.calcVisits[visit])):
+                                    xml.element( self.LANG.XML.tool, str(vehicle.calcVisits[visit][t]), {self.LANG.XML.attr_id: str(t+1)} )
+                                xml.end()
+                            else:
+                                xml.element( self.LANG.XML.depot )
+                            visit += 1
+                        else:
+                            xml.element( self.LANG.XML.request, str(abs(n)), {self.LANG.XML.attr_type: self.LANG.XML.pickup if n < 0 else self.LANG.XML.deliver} )
+                    xml.end()
+                    xml.end()
+                xml.end()
+                xml.end()
+            xml.end()
+            xml.end()
             
         return (True, '')
 
 
 
+# The instance file next to a solution file: name.sol.xml -> name.xml, name.sol.txt -> name.txt, name.sol.bin -> name.bin
+def instanceForSolution(solution):
+    if solution.endswith('.sol.xml'):
+        return solution[:-7] + 'xml'
+    elif solution.endswith('.sol.txt'):
+        return solution[:-7] + 'txt'
+    elif solution.endswith('.sol.bin'):
+        return solution[:-7] + 'bin'
+    return None
+
+# The lower bounds of the instance as a SolutionCost, with the cost of these bounds
+def lowerBoundCost(Instance):
+    lowerBounds = Instance.buildLowerBounds()
+    cost = SolutionCVRPTWUI.SolutionCost()
+    for field in ('MaxNumberOfVehicles', 'NumberOfVehicleDays', 'Distance', 'ToolCount'):
+        setattr(cost,field,getattr(lowerBounds,field))
+    cost.calculateCost(Instance)
+    return cost
+
+# Relative distance of a cost to its lower bound, an upper bound on how far the solution is from optimal
+def costGap(cost,lowerBound):
+    return (cost - lowerBound) / float(cost) if cost else 0.0
+
+# The outcome of a validation as a dictionary that can be written as json
+def solutionResult(Solution,checkGivenValues=True):
+    result = OrderedDict()
+    result['solution'] = Solution.inputfile
+    result['instance'] = Solution.Instance.inputfile
+    result['valid'] = Solution.isValid()
+    result['cost'] = None
+    if Solution.isValid():
+        if checkGivenValues:
+            res = Solution.areGivenValuesValid()
+            result['givenValuesValid'] = res[0]
+            if not res[0]:
+                result['givenValuesError'] = res[1]
+        cost = Solution.calcCost
+        result['cost'] = OrderedDict((field, getattr(cost,field)) for field in ('MaxNumberOfVehicles', 'NumberOfVehicleDays', 'ToolCount', 'Distance', 'Cost'))
+        lowerBound = lowerBoundCost(Solution.Instance)
+        result['lowerBound'] = OrderedDict((field, getattr(lowerBound,field)) for field in ('MaxNumberOfVehicles', 'NumberOfVehicleDays', 'ToolCount', 'Distance', 'Cost'))
+        result['gap'] = costGap(cost.Cost,lowerBound.Cost)
+    result['errors'] = Solution.errorReport
+    result['warnings'] = Solution.warningReport
+    return result
+
+def failedResult(solution,instance,error):
+    result = OrderedDict()
+    result['solution'] = solution
+    result['instance'] = instance
+    result['valid'] = False
+    result['cost'] = None
+    result['errors'] = [error]
+    result['warnings'] = []
+    return result
+
+# Set in every batch worker before it validates solutions. With the fork start method the
+# instance is inherited from the parent, otherwise it is pickled once per worker.
+_batchInstance = None
+_batchArgs = None
+
+def _initBatchWorker(Instance,args):
+    global _batchInstance, _batchArgs
+    _batchInstance = Instance
+    _batchArgs = args
+
+def _validateBatchSolution(solution):
+    try:
+        # the parsers print crash messages, stdout only gets the json lines
+        with redirect_stdout(sys.stderr):
+            Solution = SolutionCVRPTWUI(solution,_batchInstance,_batchArgs.type,_batchArgs.continueOnError,stream=_batchArgs.stream)
+            return solutionResult(Solution,not _batchArgs.skipExtraDataCheck)
+    except Exception as e:
+        return failedResult(solution,_batchInstance.inputfile,'Crash during solution validation: %s' % e)
+
+# The routes of one day, without the requests that are visited on other days: the distance and the depot
+# visits per vehicle, the tools taken from the start depot and returned to the finish depot, and the errors
+# as (vehicle, position in the route, message) in route order. The evaluation stops at the first error when
+# breakOnError is set, and at an unknown request, which SolutionCVRPTWUI reports. With lazy the distances
+# are calculated when they are needed, unless the instance has its distance matrix already.
+def evaluateDay(Instance,dayNumber,routes,breakOnError=True,lazy=False):
+    toolSize = Instance.toolWeight
+    requestNode = Instance.requestNode
+    requestTool = Instance.requestTool
+    requestToolCount = Instance.requestToolCount
+    depot = Instance.DepotCoordinate
+    getDistance = Instance.getLazyDistance if lazy and Instance.calcDistance is None else Instance.getDistance
+    numTools = len(Instance.Tools)
+    numRequests = len(Instance.Requests)
+    capacity = Instance.Capacity
+    maxDistance = Instance.MaxDistance
+    startDepot = [0] * numTools
+    finishDepot = [0] * numTools
+    vehicles = []
+    errors = []
+    result = (vehicles, startDepot, finishDepot, errors)
+    # Buffers for the current trip, reused for every trip: the tools picked up minus the tools delivered since
+    # the last depot visit, the lowest value of that per tool (what is brought from the depot), and the
+    # weight of the tools in currentTools after every visit, starting with the depot.
+    currentTools = [0] * numTools
+    bringTools  = [0] * numTools
+    noTools     = [0] * numTools
+    loads = [0]
+    for i in range(len(routes)):
+        distance = 0
+        lastNode = None
+        depotVisits = [[0] * numTools]
+        for position, node in enumerate(routes[i]):
+            if node == 0:
+                if lastNode is not None:
+                    if lastNode == 0:
+                        errors.append((i, position, 'Two consecutive depot visits at vehicle %d of day %d.' % (i+1,dayNumber)))
+                        if breakOnError:
+                            return result
+                    depotVisit = depotVisits[-1] = list(map(add, bringTools, depotVisits[-1]))
+                    # the load when leaving the depot is minus the weight of the depot visit, after a visit
+                    # it is the weight in loads on top of that
+                    departure = sum(map(mul, toolSize, depotVisit))
+                    if -departure > capacity:
+                        errors.append((i, position, 'Capacity exceeded at vehicle %d of day %d, found %d (maximum %d).' % (i+1, dayNumber, -departure, capacity)))
+                        if breakOnError:
+                            return result
+                    if maxLoad - departure > capacity:
+                        for load in loads:
+                            if load - departure > capacity:
+                                errors.append((i, position, 'Capacity exceeded at vehicle %d of day %d, found %d (maximum %d).' % (i+1, dayNumber, load - departure, capacity)))
+                                if breakOnError:
+                                    return result
+                    depotVisits.append(list(map(sub, currentTools, bringTools)))
+                    currentTools[:] = noTools
+                    bringTools[:] = noTools
+                del loads[1:]
+                load = maxLoad = 0
+            else:
+                if node > 0:
+                    if node > numRequests:
+                        return result
+                    tool = requestTool[node-1]-1
+                    count = -requestToolCount[node-1]
+                else:
+                    node = - node
+                    if node > numRequests:
+                        return result
+                    tool = requestTool[node-1]-1
+                    count = requestToolCount[node-1]
+                currentTools[tool] += count
+                if currentTools[tool] < bringTools[tool]:
+                    bringTools[tool] = currentTools[tool]
+                load += toolSize[tool] * count
+                loads.append(load)
+                if load > maxLoad:
+                    maxLoad = load
+            if lastNode is not None:
+                fromCoord = depot if lastNode == 0 else requestNode[lastNode-1]
+                toCoord = depot if node == 0 else requestNode[node-1]
+                distance += getDistance(fromCoord,toCoord)
+            lastNode = node
+        distance += getDistance(toCoord,depot)
+        vehicles.append((distance, depotVisits))
+        if distance > maxDistance:
+            errors.append((i, len(routes[i]), 'Distance of vehicle %d is exceeded, %d (maximum %d) (current day %d).' % (i+1, distance, maxDistance, dayNumber)))
+            if breakOnError:
+                return result
+        # tools that are needed before the vehicle returns them come from the start depot,
+        # the rest of the returned tools goes to the finish depot
+        for t in range(numTools):
+            visitTotal = totalUsedAtStart = 0
+            for visit in depotVisits:
+                visitTotal += visit[t]
+                if visitTotal < 0:
+                    totalUsedAtStart -= visitTotal
+                    visitTotal = 0
+            startDepot[t] -= totalUsedAtStart
+            finishDepot[t] += visitTotal
+    return result
+
+def _poolContext():
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+# Set in every day worker, like the batch workers below
+_dayInstance = None
+_dayBreakOnError = True
+
+def _initDayWorker(Instance,breakOnError):
+    global _dayInstance, _dayBreakOnError
+    _dayInstance = Instance
+    _dayBreakOnError = breakOnError
+
+def _evaluateDayWorker(day):
+    return evaluateDay(_dayInstance,day[0],day[1],_dayBreakOnError)
+
+# Solutions with fewer visits are evaluated in this process: starting the pool takes longer than
+# evaluating them (about 20 ms for the 2000 requests of VeRoLog_r2000d65)
+PARALLEL_MIN_VISITS = 100000
+
+# evaluateDay of the (dayNumber, routes) pairs in order, the days are sent to the pool in chunks. The
+# pool is stopped when the results are not all used, after the first error.
+def _dayResults(Instance,days,processes,breakOnError):
+    processes = min(processes or 1, len(days))
+    if processes > 1 and sum(len(route) for dayNumber, routes in days for route in routes) < PARALLEL_MIN_VISITS:
+        processes = 1
+    if processes <= 1:
+        for dayNumber, routes in days:
+            yield evaluateDay(Instance,dayNumber,routes,breakOnError)
+        return
+    pool = _poolContext().Pool(processes,_initDayWorker,(Instance,breakOnError))
+    try:
+        chunksize = max(1, len(days) // (4*processes))
+        for result in pool.imap(_evaluateDayWorker,days,chunksize):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+def _batchResults(Instance,solutions,args):
+    processes = min(args.processes or multiprocessing.cpu_count(), len(solutions))
+    if processes <= 1:
+        _initBatchWorker(Instance,args)
+        for solution in solutions:
+            yield _validateBatchSolution(solution)
+        return
+    pool = _poolContext().Pool(processes,_initBatchWorker,(Instance,args))
+    try:
+        chunksize = max(1, len(solutions) // (4*processes))
+        for result in pool.imap(_validateBatchSolution,solutions,chunksize):
+            yield result
+    finally:
+        pool.close()
+        pool.join()
+
+def findSolutionFiles(pattern):
+    if os.path.isdir(pattern):
+        files = glob.glob(os.path.join(pattern,'*.sol.txt')) + glob.glob(os.path.join(pattern,'*.sol.xml')) + glob.glob(os.path.join(pattern,'*.sol.bin'))
+    else:
+        files = glob.glob(pattern)
+    return sorted(files)
+
+# Validates many solution files and writes one json line per solution. Every instance is
+# read once and its solutions are validated by a pool of worker processes.
+def DoBatch(args):
+    groups = OrderedDict()
+    for solution in findSolutionFiles(args.batch):
+        instance = args.instance or instanceForSolution(solution)
+        groups.setdefault(instance,[]).append(solution)
+    if not groups:
+        print('No solution files found for: %s' % args.batch, file=sys.stderr)
+        return
+    
+    for instance, solutions in groups.items():
+        if not instance:
+            results = (failedResult(solution,None,'No instance file specified and unable to determine one based on the solution file') for solution in solutions)
+        else:
+            Instance = InstanceCVRPTWUI(instance,args.itype,distanceEngine=args.distanceEngine,distanceCache=args.distanceCache)
+            if Instance.isValid():
+                # done once here instead of in every worker
+                if Instance.distanceEngine != 'lazy':
+                    Instance.calculateDistances()
+                Instance.buildArrays()
+                results = _batchResults(Instance,solutions,args)
+            else:
+                error = 'File %s is an invalid CVRPTWUI instance file: %s' % (instance, ' '.join(Instance.errorReport))
+                results = (failedResult(solution,instance,error) for solution in solutions)
+        for result in results:
+            print(json.dumps(result))
+            sys.stdout.flush()
+
 def DoWork(args):
     instance = args.instance
     if not instance:
-        if args.solution.endswith('.sol.xml'):
-            instance = args.solution[:-7] + 'xml'
+        instance = instanceForSolution(args.solution)
+        if instance:
             print('No instance file specified, trying: %s' % instance)
-        elif args.solution.endswith('.sol.txt'):
-            instance = args.solution[:-7] + 'txt'
-            print('No instance file specified, trying: %s ' % instance)
         else:
             print('No instance file specified and unable to determine one based on the solution file')
             return
     
-    Instance = InstanceCVRPTWUI(instance,args.itype)
+    Instance = InstanceCVRPTWUI(instance,args.itype,distanceEngine=args.distanceEngine,distanceCache=args.distanceCache)
     if not Instance.isValid():
         print('File %s is an invalid CVRPTWUI instance file\nIt contains the following errors:' % instance)
         print( '\t' + '\n\t'.join(Instance.errorReport) )
         return
-    Solution = SolutionCVRPTWUI(args.solution,Instance,args.type,args.continueOnError)   
+    Solution = SolutionCVRPTWUI(args.solution,Instance,args.type,args.continueOnError,processes=args.processes,stream=args.stream)   
     if Solution.isValid():
         print('Solution %s is a valid CVRPTWUI solution' % args.solution)
         if not args.skipExtraDataCheck:
@@ -627,6 +1143,9 @@ def DoWork(args):
             else:
                 print(res[1])
         print('\t' + '\n\t'.join(str(Solution.calcCost).split('\n')))
+        lowerBound = lowerBoundCost(Instance)
+        print('Lower bound on the cost: %d (gap %.2f%%)' % (lowerBound.Cost, 100 * costGap(Solution.calcCost.Cost,lowerBound.Cost)))
+        print('\t' + '\n\t'.join(str(lowerBound).split('\n')))
         if args.outputFile:
             Solution.writeSolution(args.outputFile,args.writeExtra)
         if len(Solution.warningReport) > 0:
@@ -643,28 +1162,64 @@ def DoWork(args):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Read and checks CVRPTWUI solution file.')
-    parser.add_argument('--solution', '-s', metavar='SOLUTION_FILE', required=True,
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--solution', '-s', metavar='SOLUTION_FILE',
                         help='The solution file')
+    group.add_argument('--batch', '-b', metavar='SOLUTION_DIR_OR_GLOB',
+                        help='Validate all solution files in a directory (*.sol.txt, *.sol.xml, *.sol.bin) or matching a glob, writing one json line per solution')
     parser.add_argument('--instance', '-i', metavar='INSTANCE_FILE',
                         help='The instance file')
-    parser.add_argument('--type', '-t', choices=['txt', 'xml'],
+    parser.add_argument('--type', '-t', choices=['txt', 'xml', 'bin'],
                         help='Solution file type')
-    parser.add_argument('--itype', choices=['txt', 'xml'],
+    parser.add_argument('--itype', choices=['txt', 'xml', 'bin'],
                         help='instance file type')
+    parser.add_argument('--distanceEngine', choices=['list', 'numpy', 'lazy', 'condensed'], default='list',
+                        help='Storage of the calculated distance matrix (numpy: compact integer array, lazy: only the distances that are used, condensed: upper triangle only)')
+    parser.add_argument('--distanceCache', action='store_true',
+                        help='Keep the calculated distances in a cache file next to the instance file (numpy engine only)')
     parser.add_argument('--outputFile', '-o', metavar='NEW_SOLUTION_FILE',
-                        help='Write the solution to this file')
+                        help='Write the solution to this file, the type follows from the extension (.txt, .xml or .bin)')
     parser.add_argument('--writeExtra', '-e', action='store_true',
                         help='Write the extra data in the outputfile')
     parser.add_argument('--skipExtraDataCheck', '-S', action='store_true',
                         help='Skip extra data check')
     parser.add_argument('--continueOnError', '-C', action='store_true',
                         help='Try to continue after the first error in the solution. This may result in a crash (found errors are reported). Note: Any error after the first may be a result of a previous error')
+    parser.add_argument('--processes', '-p', type=int, metavar='N',
+                        help='Number of worker processes for --batch (default: number of cpus), or for the days of --solution (default: 1, solutions with less than %d visits are always evaluated in one process)' % PARALLEL_MIN_VISITS)
+    parser.add_argument('--stream', action='store_true',
+                        help='Validate a txt or xml solution day by day while reading it and stop at the first error, only the totals of the days are kept and only the distances of the routes are calculated')
+    parser.add_argument('--profile', nargs='?', const='table', choices=['table', 'json'],
+                        help='Report the time and the process peak memory after the parse, distance, validation and write phases at the end (default: table)')
+    parser.add_argument('--profileMemory', '--profile-memory', action='store_true',
+                        help='With --profile, report the peak memory traced during each phase instead (much slower)')
     args = parser.parse_args()
     
     if args.writeExtra and not args.outputFile:
         parser.error('--writeExtra can only be given when --outputFile is also given')
+    if args.batch and args.outputFile:
+        parser.error('--outputFile can not be combined with --batch')
+    if args.batch and args.profile:
+        parser.error('--profile can not be combined with --batch')
+    if args.profileMemory and not args.profile:
+        parser.error('--profileMemory can only be given when --profile is also given')
+    if args.stream and args.outputFile:
+        parser.error('--outputFile can not be combined with --stream')
+    if args.stream and args.continueOnError:
+        parser.error('--continueOnError can not be combined with --stream')
+    if args.stream and args.processes and not args.batch:
+        parser.error('--processes can not be combined with --stream for a single solution')
 
-    DoWork(args)
+    if args.batch:
+        DoBatch(args)
+    elif args.profile:
+        recorder = profiling.PhaseRecorder(args.profileMemory)
+        recorder.start()
+        DoWork(args)
+        recorder.stop()
+        print(recorder.report(args.profile))
+    else:
+        DoWork(args)
     
             
     
@@ -1,4 +1,53 @@
 
+import io
+import profileCVRPTWUI as profiling
+from xml.sax.saxutils import escape
+
+# Writes an xml file tag by tag, in the same layout as ElementTree after BaseParser.indent:
+# one tag per line indented with tabs, and tags without text or children written as <tag />.
+class XMLWriter(object):
+    attribEntities = {'"': '&quot;', '\r': '&#13;', '\n': '&#10;', '\t': '&#09;'}
+    
+    def __init__(self,fd):
+        self.fd = fd
+        self.tags = []
+        self.startOpen = False
+        
+    def _attributes(self,attrib):
+        if not attrib:
+            return ''
+        return ''.join(' %s="%s"' % (key, escape(value,self.attribEntities)) for key, value in attrib.items())
+        
+    def _newChild(self):
+        if self.startOpen:
+            self.fd.write('>')
+            self.startOpen = False
+        if self.tags:
+            self.fd.write('\n' + '\t'*len(self.tags))
+    
+    def start(self,tag,attrib=None):
+        self._newChild()
+        self.fd.write('<%s%s' % (tag, self._attributes(attrib)))
+        self.tags.append(tag)
+        self.startOpen = True
+        
+    def element(self,tag,text=None,attrib=None):
+        self._newChild()
+        if text:
+            self.fd.write('<%s%s>%s</%s>' % (tag, self._attributes(attrib), escape(text), tag))
+        else:
+            self.fd.write('<%s%s />' % (tag, self._attributes(attrib)))
+            
+    def end(self):
+        tag = self.tags.pop()
+        if self.startOpen:
+            self.fd.write(' />')
+            self.startOpen = False
+        else:
+            self.fd.write('\n%s</%s>' % ('\t'*len(self.tags), tag))
+        if not self.tags:
+            self.fd.write('\n')
+
 
 class BaseParser(object):
     
@@ -11,18 +60,22 @@ class BaseParser(object):
         if not filetype:
             if self.inputfile.endswith('.xml'):
                 self.type = 'xml'
+            elif self.inputfile.endswith('.bin'):
+                self.type = 'bin'
             elif not self.inputfile.endswith('.txt'):
                 self.warningReport.append( "Unknown %s file type, assuming 'txt'." % self.parsertype )
         else:
-            if filetype != 'txt' and filetype != 'xml':
+            if filetype not in ('txt', 'xml', 'bin'):
                 self.warningReport.append( "Unknown %s file type: '%s', assuming txt'." % (self.parsertype,filetype) )
-            elif filetype == 'xml':
-                self.type = 'xml'
+            else:
+                self.type = filetype
     
-    def _doinit(self, inputfile,filetype, continueOnErr = False):
+    # When text is given it is parsed instead of the contents of inputfile, which is then only a name
+    def _doinit(self, inputfile,filetype, continueOnErr = False, text = None):
         self.errorReport = []
         self.warningReport = []
         self.inputfile = inputfile
+        self.inputText = text
         self.breakOnError =  not continueOnErr
         
         if not self.inputfile:
@@ -32,13 +85,21 @@ class BaseParser(object):
         self._initType(filetype)
         self._initData()
         
-        if self.type == 'txt':
-            self._initTXT()
-        elif self.type == 'xml':
-            self._initXML()
-        else:
-            assert False, 'INTERNAL ERROR: INCORRECT FILE TYPE!'
+        with profiling.phase('%s.parse' % self.parsertype, file=self.inputfile, type=self.type):
+            if self.type == 'txt':
+                self._initTXT()
+            elif self.type == 'xml':
+                self._initXML()
+            elif self.type == 'bin':
+                self._initBIN()
+            else:
+                assert False, 'INTERNAL ERROR: INCORRECT FILE TYPE!'
             
+    def _openInput(self):
+        if self.inputText is not None:
+            return io.StringIO(self.inputText)
+        return open(self.inputfile, 'r')
+        
     @staticmethod
     def _getNextLine(fd):
         line = '\n'
@@ -52,10 +113,22 @@ class BaseParser(object):
             if self.breakOnError:
                 raise self.BaseParseException(message)
     
-    def _checkInt(self,field,intstr,extra=''):
+    # Same as _checkError, but the message is only built when the test fails:
+    # it is formatted with args, or called when it is a function.
+    def _check(self,test,message,*args):
+        if not test:
+            if args:
+                message = message % args
+            elif callable(message):
+                message = message()
+            self._checkError(message,False)
+    
+    def _checkInt(self,field,intstr,extra='',*extraArgs):
         try:
             return int(intstr)
         except:
+            if extraArgs:
+                extra = extra % extraArgs
             message = '%s (%s) %sis not an integer.' % (field,intstr,extra)
             self._checkError(message,False)
     
@@ -73,17 +146,18 @@ class BaseParser(object):
         line = self._getNextLine(fd)
         splitLine = line.split(None,2)
         errorFormat = "Expected header line for locations is of the form '%s = %s'. Found: '%%s'." % (key,fieldtype)
-        self._checkError(errorFormat % line, 
-                        len(splitLine) == 3 and splitLine[0] == key and splitLine[1] == '=')
+        self._check(len(splitLine) == 3 and splitLine[0] == key and splitLine[1] == '=', errorFormat, line)
         return splitLine[2]
         
-    def _findTag(self,elem,match,extra=''):
+    def _findTag(self,elem,match,extra='',*extraArgs):
         res = elem.find(match)
-        self._checkError("No '%s' tag found under '%s' tag%s" % (match, elem.tag,extra), res is not None )
+        if res is None:
+            self._checkError("No '%s' tag found under '%s' tag%s" % (match, elem.tag,extra % extraArgs if extraArgs else extra), False )
         return res
     
-    def _findAttribute(self,elem,attribute,extra=''):
-        self._checkError("No '%s' attribute found under '%s' tag%s" % (attribute, elem.tag,extra), attribute in elem.attrib )
+    def _findAttribute(self,elem,attribute,extra='',*extraArgs):
+        if attribute not in elem.attrib:
+            self._checkError("No '%s' attribute found under '%s' tag%s" % (attribute, elem.tag,extra % extraArgs if extraArgs else extra), False )
         return elem.attrib[attribute]
     
     def _writeAssignment(self,fd,lhs,rhs):
@@ -0,0 +1,135 @@
+
+from SolutionCVRPTWUI import SolutionCVRPTWUI as SolutionCVRPTWUI
+
+# Simple feasible solutions for an instance, used as test data for the parsers and the validator.
+# They are far from optimal: every request is planned on its own, only same-day pickups feed deliveries.
+
+# number of deliveries tried per trip that do not fit in it
+TRIP_CANDIDATES = 50
+
+# Delivery day per request id. The requests with the smallest window are planned first, on the day that
+# keeps the peak use of their tool lowest. A tool is in use from the delivery day to the pickup day; on
+# a day with pickups and deliveries of the same tool the picked up tools are assumed to feed the deliveries.
+def baselineSchedule(Instance):
+    numDays = Instance.Days + 2
+    atCustomer = [[0] * numDays for tool in Instance.Tools]
+    delivered = [[0] * numDays for tool in Instance.Tools]
+    pickedUp = [[0] * numDays for tool in Instance.Tools]
+
+    def plan(request,start,sign):
+        tool, count, finish = request.tool-1, sign*request.toolCount, start+request.numDays
+        delivered[tool][start] += count
+        pickedUp[tool][finish] += count
+        for day in range(start+1,finish+1):
+            atCustomer[tool][day] += count
+
+    def peakUse(request,start):
+        tool = request.tool-1
+        return max(atCustomer[tool][day] + max(0, delivered[tool][day] - pickedUp[tool][day]) for day in range(start,start+request.numDays+1))
+
+    schedule = {}
+    for request in sorted(Instance.Requests, key=lambda r: (r.toDay - r.fromDay, -r.numDays, r.fromDay, r.ID)):
+        best = None
+        for start in range(request.fromDay,request.toDay+1):
+            plan(request,start,1)
+            peak = peakUse(request,start)
+            plan(request,start,-1)
+            if best is None or peak < best[0]:
+                best = (peak, start)
+        plan(request,best[1],1)
+        schedule[request.ID] = best[1]
+    return schedule
+
+# Routes per day for a schedule: per tool, trips that first pick up tools and then deliver them, and
+# trips that deliver from the depot. The trips are combined into vehicles up to the maximum distance.
+def baselineRoutes(Instance,schedule):
+    depot = Instance.DepotCoordinate
+    requests = Instance.Requests
+    visits = {}
+    for ID, start in schedule.items():
+        request = requests[ID-1]
+        pickups, deliveries = visits.setdefault(start + request.numDays, {}).setdefault(request.tool, ([], []))
+        pickups.append(ID)
+        pickups, deliveries = visits.setdefault(start, {}).setdefault(request.tool, ([], []))
+        deliveries.append(ID)
+
+    routes = {}
+    for day in sorted(visits):
+        trips = []
+        for tool in sorted(visits[day]):
+            pickups, deliveries = visits[day][tool]
+            weight = Instance.Tools[tool-1].weight
+            pickups.sort(key=lambda ID: (-requests[ID-1].toolCount, ID))
+            deliveries.sort(key=lambda ID: (-requests[ID-1].toolCount, ID))
+            while pickups or deliveries:
+                trip = []
+                state = [depot, 0]
+
+                def fits(ID,load):
+                    node = requests[ID-1].node
+                    return not trip or (state[1] + Instance.getDistance(state[0],node) + Instance.getDistance(node,depot) <= Instance.MaxDistance and load*weight <= Instance.Capacity)
+
+                def visit(node):
+                    state[1] += Instance.getDistance(state[0],node)
+                    state[0] = node
+
+                # pick up tools until they cover the smallest delivery
+                load = 0
+                while pickups and fits(pickups[0],load + requests[pickups[0]-1].toolCount):
+                    ID = pickups.pop(0)
+                    visit(requests[ID-1].node)
+                    load += requests[ID-1].toolCount
+                    trip.append(-ID)
+                    if deliveries and load >= requests[deliveries[-1]-1].toolCount:
+                        break
+                # deliver the picked up tools, or tools from the depot when nothing was picked up,
+                # giving up after TRIP_CANDIDATES deliveries that do not fit
+                fromDepot = not trip
+                i = 0
+                while i < len(deliveries) and i < TRIP_CANDIDATES:
+                    ID = deliveries[i]
+                    count = requests[ID-1].toolCount
+                    if (fits(ID,load + count) if fromDepot else count <= load and fits(ID,load)):
+                        del deliveries[i]
+                        visit(requests[ID-1].node)
+                        load += count if fromDepot else -count
+                        trip.append(ID)
+                    else:
+                        i += 1
+                visit(depot)
+                trips.append((state[1], trip))
+
+        # first fit, the vehicles that have no room for the shortest trip are closed
+        shortest = min(distance for distance, trip in trips)
+        vehicles = []
+        available = []
+        for distance, trip in trips:
+            for vehicle in available:
+                if vehicle[0] + distance <= Instance.MaxDistance:
+                    vehicle[0] += distance
+                    vehicle[1].extend(trip + [0])
+                    break
+            else:
+                vehicle = [distance, [0] + trip + [0]]
+                vehicles.append(vehicle)
+                available.append(vehicle)
+            if vehicle[0] + shortest > Instance.MaxDistance:
+                available.remove(vehicle)
+        routes[day] = [vehicle[1] for vehicle in vehicles]
+    return routes
+
+def solutionText(Instance,routes):
+    LANG = SolutionCVRPTWUI.LANG.TXT
+    lines = ['%s = %s' % (LANG.dataset, Instance.Dataset), '%s = %s' % (LANG.name, Instance.Name), '']
+    for day in sorted(routes):
+        lines.append('%s = %d' % (LANG.day, day))
+        for i in range(len(routes[day])):
+            lines.append('\t'.join(str(e) for e in [i+1, 'R'] + routes[day][i]))
+        lines.append('')
+    return '\n'.join(lines) + '\n'
+
+# The baseline solution as a parsed and checked solution, check isValid(): when the tools of the instance
+# are scarce the schedule may need more tools than available.
+def baselineSolution(Instance,filename='baseline.sol.txt'):
+    routes = baselineRoutes(Instance,baselineSchedule(Instance))
+    return SolutionCVRPTWUI(filename,Instance,'txt',text=solutionText(Instance,routes))
@@ -0,0 +1,198 @@
+
+import argparse, glob, json, math, os, platform, shutil, sys, tempfile, time, tracemalloc
+from collections import OrderedDict
+from contextlib import redirect_stdout
+from InstanceCVRPTWUI import InstanceCVRPTWUI as InstanceCVRPTWUI
+from SolutionCVRPTWUI import SolutionCVRPTWUI as SolutionCVRPTWUI
+from baselineCVRPTWUI import baselineSolution
+import distanceCVRPTWUI as distances
+
+# Benchmarks of the parsers, the distance calculation, the writers and the validator over a set of instance
+# files, by default the Instances directory of the repository. Every benchmark is run --repeat times for the
+# time and once more under tracemalloc for the peak memory. The solutions are the baseline solutions of
+# baselineCVRPTWUI. The results are written as json, --compare reports the change against an earlier run.
+
+BENCHMARK_VERSION = 1
+INSTANCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Instances')
+BENCHMARKS = ['load.txt', 'load.txt.matrix', 'load.xml', 'load.xml.matrix', 'calculateDistances',
+              'write.txt', 'write.xml', 'validate.txt', 'validate.xml', 'write.solution.txt', 'write.solution.xml']
+
+def measure(function,repeat):
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    times.sort()
+    return min(times), times[len(times)//2], peak
+
+# The benchmarks of one instance file as (name, function) pairs, the files they read are written in workdir
+def instanceBenchmarks(filename,Instance,Solution,workdir,names,engine):
+    base = os.path.join(workdir, os.path.splitext(os.path.basename(filename))[0])
+    files = {'load.txt': filename}
+    if 'load.txt.matrix' in names:
+        files['load.txt.matrix'] = base + '.matrix.txt'
+        Instance.writeInstance(files['load.txt.matrix'],True)
+    if 'load.xml' in names:
+        files['load.xml'] = base + '.xml'
+        Instance.writeInstance(files['load.xml'],False)
+    if 'load.xml.matrix' in names:
+        files['load.xml.matrix'] = base + '.matrix.xml'
+        Instance.writeInstance(files['load.xml.matrix'],True)
+    solutions = {}
+    for extension in ('txt', 'xml'):
+        if 'validate.%s' % extension in names:
+            solutions[extension] = '%s.sol.%s' % (base, extension)
+            Solution.writeSolution(solutions[extension],False)
+
+    def load(name):
+        return lambda: InstanceCVRPTWUI(files[name],distanceEngine=engine)
+
+    def calculateDistances():
+        Instance.calcDistance = None
+        Instance.calculateDistances()
+
+    def validate(extension):
+        def run():
+            Result = SolutionCVRPTWUI(solutions[extension],Instance,extension)
+            if Result.isValid():
+                Result.areGivenValuesValid()
+        return run
+
+    functions = {'calculateDistances': calculateDistances,
+                 'write.txt': lambda: Instance.writeInstance(base + '.out.txt',False),
+                 'write.xml': lambda: Instance.writeInstance(base + '.out.xml',False),
+                 'write.solution.txt': lambda: Solution.writeSolution(base + '.out.sol.txt',False),
+                 'write.solution.xml': lambda: Solution.writeSolution(base + '.out.sol.xml',False)}
+    for name in files:
+        functions[name] = load(name)
+    for extension in solutions:
+        functions['validate.%s' % extension] = validate(extension)
+    return [(name, functions[name]) for name in BENCHMARKS if name in names]
+
+def runBenchmarks(filenames,names=BENCHMARKS,repeat=3,engine='list',log=None):
+    results = []
+    workdir = tempfile.mkdtemp(prefix='cvrptwui-benchmark-')
+    try:
+        for filename in filenames:
+            # the writers report every file they write
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                Instance = InstanceCVRPTWUI(filename,distanceEngine=engine)
+                if not Instance.isValid():
+                    raise ValueError('File %s is an invalid CVRPTWUI instance file: %s' % (filename, ' '.join(Instance.errorReport)))
+                Instance.calculateDistances()
+                Solution = baselineSolution(Instance)
+                for name, function in instanceBenchmarks(filename,Instance,Solution,workdir,names,engine):
+                    seconds, median, peak = measure(function,repeat)
+                    result = OrderedDict([('instance', os.path.basename(filename)), ('benchmark', name),
+                                          ('requests', len(Instance.Requests)), ('locations', len(Instance.Coordinates)),
+                                          ('days', Instance.Days), ('seconds', seconds), ('median', median), ('peakMemory', peak)])
+                    if name.startswith('validate'):
+                        result['solutionValid'] = Solution.isValid()
+                    results.append(result)
+                    if log:
+                        log(result)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def environment(repeat,engine):
+    return OrderedDict([('version', BENCHMARK_VERSION), ('python', platform.python_version()), ('platform', platform.platform()),
+                        ('numpy', distances.np.__version__ if distances.hasNumpy() else None), ('distanceEngine', engine),
+                        ('repeat', repeat), ('time', time.strftime('%Y-%m-%dT%H:%M:%S'))])
+
+# Instance files in a directory or matching a glob, from small to large
+def findInstanceFiles(pattern):
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '*.txt')
+    files = [f for f in glob.glob(pattern) if not f.endswith('.sol.txt') and not f.endswith('.sol.xml')]
+    def size(filename):
+        Instance = InstanceCVRPTWUI(filename)
+        return (len(Instance.Requests), len(Instance.Coordinates), Instance.Days, os.path.basename(filename))
+    return sorted(files, key=size)
+
+# Compares two result files on the benchmarks they have in common. Returns the lines of the report and
+# the number of benchmarks that got slower than threshold times the old time.
+def compareResults(old,new,threshold=1.1):
+    oldResults = dict(((r['instance'], r['benchmark']), r) for r in old['results'])
+    lines = ['%-36s %-20s %10s %10s %7s %7s' % ('Instance', 'Benchmark', 'Old (s)', 'New (s)', 'Time', 'Memory')]
+    ratios = OrderedDict()
+    slower = 0
+    for result in new['results']:
+        key = (result['instance'], result['benchmark'])
+        if key not in oldResults:
+            continue
+        previous = oldResults[key]
+        ratio = result['seconds'] / previous['seconds'] if previous['seconds'] > 0 else 1.0
+        memory = result['peakMemory'] / float(previous['peakMemory']) if previous['peakMemory'] > 0 else 1.0
+        ratios.setdefault(result['benchmark'], []).append(ratio)
+        flag = ''
+        if ratio > threshold:
+            slower += 1
+            flag = ' slower'
+        lines.append('%-36s %-20s %10.4f %10.4f %7.2f %7.2f%s' % (result['instance'], result['benchmark'], previous['seconds'], result['seconds'], ratio, memory, flag))
+    lines.append('')
+    lines.append('Geometric mean of the time ratios:')
+    for name, values in ratios.items():
+        lines.append('\t%-20s %7.2f (%d instances)' % (name, math.exp(sum(math.log(max(v, 1e-9)) for v in values) / len(values)), len(values)))
+    return lines, slower
+
+def DoWork(args):
+    names = args.benchmarks or BENCHMARKS
+    if args.skipMatrix:
+        names = [name for name in names if not name.endswith('.matrix')]
+    filenames = findInstanceFiles(args.instances)
+    if not filenames:
+        print('No instance files found for %s' % args.instances)
+        return 1
+
+    def log(result):
+        sys.stderr.write('%-36s %-20s %10.4f s %8.1f MB\n' % (result['instance'], result['benchmark'], result['seconds'], result['peakMemory'] / float(1 << 20)))
+
+    output = OrderedDict([('environment', environment(args.repeat,args.distanceEngine)),
+                          ('results', runBenchmarks(filenames,names,args.repeat,args.distanceEngine,None if args.quiet else log))])
+    if args.outputFile:
+        with open(args.outputFile, 'w') as fd:
+            json.dump(output, fd, indent=1)
+            fd.write('\n')
+    else:
+        print(json.dumps(output, indent=1))
+    if args.compare:
+        with open(args.compare) as fd:
+            lines, slower = compareResults(json.load(fd),output,args.threshold)
+        print('\n'.join(lines), file=sys.stderr if not args.outputFile else sys.stdout)
+        if slower:
+            return 2
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the CVRPTWUI parsers, writers and validator.')
+    parser.add_argument('--instances', '-i', metavar='INSTANCE_DIR_OR_GLOB', default=INSTANCE_DIR,
+                        help='The instance files, a directory or a glob (default: the Instances directory)')
+    parser.add_argument('--benchmarks', '-b', nargs='+', choices=BENCHMARKS, metavar='BENCHMARK',
+                        help='Run only these benchmarks: %s' % ', '.join(BENCHMARKS))
+    parser.add_argument('--skipMatrix', '-M', action='store_true',
+                        help='Skip loading the instance files with a distance matrix')
+    parser.add_argument('--repeat', '-r', type=int, default=3,
+                        help='Number of timed runs per benchmark, the fastest is reported (default: 3)')
+    parser.add_argument('--distanceEngine', choices=['list', 'numpy', 'lazy', 'condensed'], default='list',
+                        help='Storage of the calculated distance matrix')
+    parser.add_argument('--outputFile', '-o', metavar='RESULT_FILE',
+                        help='Write the json results to this file instead of the standard output')
+    parser.add_argument('--compare', '-c', metavar='OLD_RESULT_FILE',
+                        help='Compare the results with an earlier result file, exits with 2 when a benchmark got slower')
+    parser.add_argument('--threshold', type=float, default=1.1,
+                        help='Time ratio above which --compare reports a benchmark as slower (default: 1.1)')
+    parser.add_argument('--quiet', '-q', action='store_true',
+                        help='Do not log the results while running')
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error('--repeat must be at least 1')
+
+    sys.exit(DoWork(args))
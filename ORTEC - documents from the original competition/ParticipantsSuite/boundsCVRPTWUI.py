@@ -0,0 +1,76 @@
+
+from spatialCVRPTWUI import floorDistance
+
+# number of distance levels of the distance bound
+DISTANCE_LEVELS = 64
+
+# Lower bounds on the fields of SolutionCost that hold for every feasible solution of an instance. They
+# take time linear in the number of requests and the lengths of their windows; sorting the windows for
+# the number of vehicle days adds a log factor. No distance matrix is needed.
+#   ToolCount            per tool: the tools that are at a customer at the end of a day in every schedule
+#                        (RequestCalendar.inUse), the largest request and the tool-days of all requests
+#                        spread evenly over the horizon
+#   Distance             the round trips from the depot to the farthest visit of every day
+#   NumberOfVehicleDays  the fewest days that hit every delivery and pickup window, and the distance
+#                        divided by the maximum distance of a vehicle
+#   MaxNumberOfVehicles  the vehicle days over the number of days
+class LowerBounds(object):
+    def __init__(self,Instance):
+        self.ToolCount = self._toolCounts(Instance)
+        windows = self._visitWindows(Instance)
+        self.Distance = self._distance(Instance,windows)
+        daysHit = self._daysHittingWindows(sorted((last, first, dist) for first, last, dist in windows))
+        self.NumberOfVehicleDays = max(daysHit, -(-self.Distance // Instance.MaxDistance) if Instance.MaxDistance > 0 else daysHit)
+        self.MaxNumberOfVehicles = -(-self.NumberOfVehicleDays // Instance.Days) if Instance.Days > 0 else 0
+
+    @staticmethod
+    def _toolCounts(Instance):
+        calendar = Instance.buildCalendar()
+        counts = list(calendar.peakInUse)
+        toolDays = [0] * len(Instance.Tools)
+        for request in Instance.Requests:
+            counts[request.tool-1] = max(counts[request.tool-1], request.toolCount)
+            toolDays[request.tool-1] += request.toolCount * request.numDays
+        # a tool is at a customer on at most Days-1 nights, the first delivery is on day 1 at the earliest
+        nights = max(1, Instance.Days - 1)
+        return [max(count, -(-days // nights)) for count, days in zip(counts, toolDays)]
+
+    # (first day, last day, distance from the depot) of the delivery and the pickup of every request
+    @staticmethod
+    def _visitWindows(Instance):
+        depot = Instance.Coordinates[Instance.DepotCoordinate]
+        windows = []
+        for request in Instance.Requests:
+            node = Instance.Coordinates[request.node]
+            dist = floorDistance(depot.X,depot.Y,node.X,node.Y)
+            windows.append((request.fromDay, request.toDay, dist))
+            windows.append((request.fromDay + request.numDays, request.toDay + request.numDays, dist))
+        return windows
+
+    # Every day costs at least the round trip to its farthest visit. The days with a visit at distance tau
+    # or more hit all windows of those visits, so summed over the levels tau their number bounds the sum
+    # of the farthest distances per day. The levels are DISTANCE_LEVELS quantiles of the distances.
+    @staticmethod
+    def _distance(Instance,windows):
+        distances = sorted(set(dist for first, last, dist in windows))
+        levels = sorted(set(distances[(len(distances)-1) * k // DISTANCE_LEVELS] for k in range(1,DISTANCE_LEVELS+1))) if distances else []
+        byEnd = sorted((last, first, dist) for first, last, dist in windows)
+        total = previous = 0
+        for level in levels:
+            total += (level - previous) * LowerBounds._daysHittingWindows(byEnd,level)
+            previous = level
+        # the floored distances do not satisfy the triangle inequality: every leg of a route can be up to
+        # one shorter, so a trip with v visits can be v shorter than twice its farthest location
+        return max(0, 2 * total - len(windows))
+
+    # The fewest days that hit every window of the visits at distance minDist or more, windows sorted on
+    # their last day
+    @staticmethod
+    def _daysHittingWindows(byEnd,minDist=0):
+        count = 0
+        lastDay = None
+        for last, first, dist in byEnd:
+            if dist >= minDist and (lastDay is None or first > lastDay):
+                lastDay = last
+                count += 1
+        return count
@@ -0,0 +1,45 @@
+
+import sys
+from array import array
+from itertools import accumulate
+
+# The requests per day and the tools that are in use whatever the schedule, for days 1 to Days:
+#   deliveries(day)         ids of the requests that can be delivered on day, fromDay <= day <= toDay
+#   pickups(day)            ids of the requests that can be picked up on day, numDays after a delivery day
+#   inUse(tool,day)         number of tools that are at a customer at the end of day in every schedule:
+#                           the requests delivered at the latest on toDay <= day and picked up at the
+#                           earliest on fromDay + numDays > day
+# The ids are sorted, tools are numbered from 1 like Request.tool. Everything is precomputed, a lookup
+# is a list index.
+class RequestCalendar(object):
+    def __init__(self,Instance):
+        days = Instance.Days
+        self.days = days
+        self.deliverable = [array('i') for day in range(days+1)]
+        self.pickupable = [array('i') for day in range(days+1)]
+        changes = [[0] * (days+2) for tool in Instance.Tools]
+        for request in Instance.Requests:
+            for day in range(request.fromDay,request.toDay+1):
+                self.deliverable[day].append(request.ID)
+                self.pickupable[day + request.numDays].append(request.ID)
+            # at the customer from the end of toDay until fromDay + numDays
+            if request.toDay < request.fromDay + request.numDays:
+                changes[request.tool-1][request.toDay] += request.toolCount
+                changes[request.tool-1][request.fromDay + request.numDays] -= request.toolCount
+        self.inUseCounts = [array('q', accumulate(change[:days+1])) for change in changes]
+        self.peakInUse = [max(counts) for counts in self.inUseCounts]
+
+    def deliveries(self,day):
+        return self.deliverable[day]
+
+    def pickups(self,day):
+        return self.pickupable[day]
+
+    def inUse(self,tool,day):
+        return self.inUseCounts[tool-1][day]
+
+    # Estimate of the memory held by the calendar
+    @property
+    def nbytes(self):
+        lists = [self.deliverable, self.pickupable, self.inUseCounts]
+        return sum(sys.getsizeof(l) + sum(sys.getsizeof(a) for a in l) for l in lists) + sys.getsizeof(self.peakInUse)
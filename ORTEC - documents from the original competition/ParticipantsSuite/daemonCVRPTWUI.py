@@ -0,0 +1,179 @@
+
+import argparse, json, os, signal, sys
+from contextlib import redirect_stdout
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import UnixStreamServer
+from SolutionCVRPTWUI import SolutionCVRPTWUI as SolutionCVRPTWUI
+from SolutionCVRPTWUI import solutionResult, failedResult, instanceForSolution
+from registryCVRPTWUI import InstanceRegistry, REGISTRY_BUDGET
+
+# seconds a client may take to send a request, before its connection is closed
+REQUEST_TIMEOUT = 30
+# largest request body in bytes
+MAX_REQUEST_SIZE = 256 << 20
+
+# Validation service: keeps the instances loaded and validates solutions sent over HTTP, on localhost
+# or on a Unix domain socket. POST /validate with a json object:
+#   instance            path of the instance file on the server (optional when solutionFile is given)
+#   solution            the solution file contents, txt or xml
+#   solutionFile        or the path of the solution file on the server
+#   type                'txt' or 'xml', by default xml when the solution starts with '<'
+#   continueOnError     as --continueOnError of SolutionCVRPTWUI.py
+#   skipExtraDataCheck  as --skipExtraDataCheck of SolutionCVRPTWUI.py
+# The reply is the json object of solutionResult. GET /status returns the registry statistics.
+
+class ValidationError(Exception):
+    pass
+
+def validateRequest(registry,request):
+    if not isinstance(request, dict):
+        raise ValidationError('The request is not a json object.')
+    for field in ('solution', 'solutionFile', 'instance', 'type'):
+        if request.get(field) is not None and not isinstance(request[field], str):
+            raise ValidationError("'%s' should be a string." % field)
+    text = request.get('solution')
+    solution = request.get('solutionFile')
+    if (text is None) == (solution is None):
+        raise ValidationError("Give either 'solution' or 'solutionFile'.")
+    instance = request.get('instance') or (instanceForSolution(solution) if solution else None)
+    if not instance:
+        raise ValidationError("No 'instance' given and unable to determine one based on the solution file.")
+    filetype = request.get('type')
+    if filetype is not None and filetype not in ('txt', 'xml'):
+        raise ValidationError("The 'type' should be 'txt' or 'xml', found '%s'." % filetype)
+    if filetype is None and text is not None:
+        filetype = 'xml' if text.lstrip().startswith('<') else 'txt'
+    if solution is None:
+        solution = '<request>'
+
+    Instance = registry.get(instance)
+    if not Instance.isValid():
+        return failedResult(solution,instance,'File %s is an invalid CVRPTWUI instance file: %s' % (instance, ' '.join(Instance.errorReport)))
+    try:
+        # the parsers print crash messages, those belong in the log
+        with redirect_stdout(sys.stderr):
+            Solution = SolutionCVRPTWUI(solution,Instance,filetype,bool(request.get('continueOnError')),text)
+            return solutionResult(Solution,not request.get('skipExtraDataCheck'))
+    except Exception as e:
+        return failedResult(solution,instance,'Crash during solution validation: %s' % e)
+
+class ValidationHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        # a client that stops sending holds the daemon for at most this long
+        self.timeout = self.server.requestTimeout
+        BaseHTTPRequestHandler.setup(self)
+
+    def _reply(self,code,result):
+        body = json.dumps(result).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != '/status':
+            self._reply(404, {'error': 'Unknown path %s.' % self.path})
+            return
+        registry = self.server.registry
+        self._reply(200, {'instances': [key[0] for key in registry.entries], 'memoryUsage': registry.memoryUsage,
+                          'hits': registry.hits, 'misses': registry.misses})
+
+    def do_POST(self):
+        if self.path != '/validate':
+            self._reply(404, {'error': 'Unknown path %s.' % self.path})
+            return
+        length = self.headers.get('Content-Length')
+        if length is None or not length.strip().isdigit() or int(length) > self.server.maxRequestSize:
+            # the body is not read, so the connection can not be used for another request
+            self.close_connection = True
+            self._reply(400, {'error': 'Expected a Content-Length of at most %d bytes, found %s.' % (self.server.maxRequestSize, length)})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(length)).decode('utf-8'))
+            result = validateRequest(self.server.registry,request)
+        except (ValueError, ValidationError) as e:
+            self._reply(400, {'error': str(e)})
+            return
+        self._reply(200, result)
+
+    def address_string(self):
+        # the client address of a Unix domain socket is empty
+        return self.client_address[0] if self.client_address else self.server.server_address
+
+    def log_message(self,format,*args):
+        if not self.server.quiet:
+            BaseHTTPRequestHandler.log_message(self,format,*args)
+
+# The servers handle one client at a time: validation is cpu bound and the instances are shared without
+# locking (the lazy distances are cached in the instance), run more daemons to use more cores. A client
+# that does not send its request within requestTimeout seconds is disconnected.
+class ValidationServer(HTTPServer):
+    def __init__(self,address,registry,quiet=False,requestTimeout=REQUEST_TIMEOUT,maxRequestSize=MAX_REQUEST_SIZE):
+        HTTPServer.__init__(self,address,ValidationHandler)
+        self.registry = registry
+        self.quiet = quiet
+        self.requestTimeout = requestTimeout
+        self.maxRequestSize = maxRequestSize
+
+class UnixValidationServer(UnixStreamServer):
+    def __init__(self,path,registry,quiet=False,requestTimeout=REQUEST_TIMEOUT,maxRequestSize=MAX_REQUEST_SIZE):
+        if os.path.exists(path):
+            os.remove(path)
+        UnixStreamServer.__init__(self,path,ValidationHandler)
+        self.registry = registry
+        self.quiet = quiet
+        self.requestTimeout = requestTimeout
+        self.maxRequestSize = maxRequestSize
+
+def DoWork(args):
+    registry = InstanceRegistry(args.memoryBudget << 20,args.distanceEngine,args.distanceCache)
+    for instance in args.preload or []:
+        if not registry.get(instance).isValid():
+            print('File %s is an invalid CVRPTWUI instance file' % instance)
+    if args.socket:
+        server = UnixValidationServer(args.socket,registry,args.quiet,args.timeout,args.maxRequestSize << 20)
+        print('Validating solutions on %s' % args.socket)
+    else:
+        server = ValidationServer(('127.0.0.1', args.port),registry,args.quiet,args.timeout,args.maxRequestSize << 20)
+        print('Validating solutions on http://127.0.0.1:%d/validate' % server.server_address[1])
+    sys.stdout.flush()
+    # stopping with kill also removes the socket file
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Keep CVRPTWUI instances loaded and validate solutions sent over HTTP.')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--port', '-p', type=int, default=8765,
+                        help='Listen on this port of localhost (default: 8765)')
+    group.add_argument('--socket', '-u', metavar='SOCKET_FILE',
+                        help='Listen on a Unix domain socket instead')
+    parser.add_argument('--preload', '-i', metavar='INSTANCE_FILE', nargs='*',
+                        help='Instance files to load at startup')
+    parser.add_argument('--memoryBudget', '-m', type=int, default=REGISTRY_BUDGET >> 20, metavar='MB',
+                        help='Memory for the loaded instances in MB, the least recently used are dropped first (default: %d)' % (REGISTRY_BUDGET >> 20))
+    parser.add_argument('--distanceEngine', choices=['list', 'numpy', 'lazy', 'condensed'], default='list',
+                        help='Storage of the calculated distance matrix (numpy: compact integer array, lazy: only the distances that are used, condensed: upper triangle only)')
+    parser.add_argument('--distanceCache', action='store_true',
+                        help='Keep the calculated distances in a cache file next to the instance file (numpy engine only)')
+    parser.add_argument('--timeout', type=float, default=REQUEST_TIMEOUT, metavar='SECONDS',
+                        help='Disconnect a client that takes longer to send a request (default: %d)' % REQUEST_TIMEOUT)
+    parser.add_argument('--maxRequestSize', type=int, default=MAX_REQUEST_SIZE >> 20, metavar='MB',
+                        help='Largest request in MB (default: %d)' % (MAX_REQUEST_SIZE >> 20))
+    parser.add_argument('--quiet', '-q', action='store_true',
+                        help='Do not log the requests')
+    args = parser.parse_args()
+    if args.timeout <= 0 or args.maxRequestSize <= 0:
+        parser.error('--timeout and --maxRequestSize must be positive')
+
+    DoWork(args)
@@ -0,0 +1,348 @@
+
+from operator import add, sub, mul
+from SolutionCVRPTWUI import SolutionCVRPTWUI
+
+# Moves for DeltaEvaluator. Days are day numbers, vehicles are 0-based indices in the routes of a day and
+# positions are indices in a route, which starts and ends at the depot. A visit is a request number, positive
+# for the delivery and negative for the pickup, or 0 for a return to the depot. Inserting in the vehicle after
+# the last one of a day adds a new route.
+class Insert(object):
+    def __init__(self,day,vehicle,position,visit):
+        self.day = day
+        self.vehicle = vehicle
+        self.position = position
+        self.visit = visit
+
+    def changes(self,evaluator):
+        route = evaluator.route(self.day,self.vehicle,True)
+        if not 0 < self.position < len(route):
+            raise ValueError('Cannot insert at position %d of a route of length %d.' % (self.position,len(route)))
+        return {(self.day,self.vehicle): route[:self.position] + [self.visit] + route[self.position:]}
+
+class Remove(object):
+    def __init__(self,day,vehicle,position):
+        self.day = day
+        self.vehicle = vehicle
+        self.position = position
+
+    def changes(self,evaluator):
+        route = evaluator.route(self.day,self.vehicle)
+        evaluator.checkPosition(route,self.position)
+        return {(self.day,self.vehicle): route[:self.position] + route[self.position+1:]}
+
+# The position in the target route is counted after the visit is removed from the source route.
+class Relocate(object):
+    def __init__(self,fromDay,fromVehicle,fromPosition,toDay,toVehicle,toPosition):
+        self.fromDay = fromDay
+        self.fromVehicle = fromVehicle
+        self.fromPosition = fromPosition
+        self.toDay = toDay
+        self.toVehicle = toVehicle
+        self.toPosition = toPosition
+
+    def changes(self,evaluator):
+        source = evaluator.route(self.fromDay,self.fromVehicle)
+        evaluator.checkPosition(source,self.fromPosition)
+        visit = source[self.fromPosition]
+        source = source[:self.fromPosition] + source[self.fromPosition+1:]
+        if (self.fromDay,self.fromVehicle) == (self.toDay,self.toVehicle):
+            target = source
+        else:
+            target = evaluator.route(self.toDay,self.toVehicle,True)
+        if not 0 < self.toPosition < len(target):
+            raise ValueError('Cannot insert at position %d of a route of length %d.' % (self.toPosition,len(target)))
+        changes = {(self.fromDay,self.fromVehicle): source}
+        changes[(self.toDay,self.toVehicle)] = target[:self.toPosition] + [visit] + target[self.toPosition:]
+        return changes
+
+class Swap(object):
+    def __init__(self,day1,vehicle1,position1,day2,vehicle2,position2):
+        self.day1 = day1
+        self.vehicle1 = vehicle1
+        self.position1 = position1
+        self.day2 = day2
+        self.vehicle2 = vehicle2
+        self.position2 = position2
+
+    def changes(self,evaluator):
+        first = list(evaluator.route(self.day1,self.vehicle1))
+        evaluator.checkPosition(first,self.position1)
+        if (self.day1,self.vehicle1) == (self.day2,self.vehicle2):
+            evaluator.checkPosition(first,self.position2)
+            first[self.position1], first[self.position2] = first[self.position2], first[self.position1]
+            return {(self.day1,self.vehicle1): first}
+        second = list(evaluator.route(self.day2,self.vehicle2))
+        evaluator.checkPosition(second,self.position2)
+        first[self.position1], second[self.position2] = second[self.position2], first[self.position1]
+        return {(self.day1,self.vehicle1): first, (self.day2,self.vehicle2): second}
+
+# Keeps the routes of a solution with the values _calculateSolution derives from them, so the effect of a
+# move is found by recomputing the changed routes, their days and the tool balance from the first changed day on.
+# Consecutive depot visits in a changed route are merged and a route without requests is removed.
+class DeltaEvaluator(object):
+
+    class RouteState(object):
+        __slots__ = ('distance','peakLoad','depotVisits','startDepot','finishDepot','feasible')
+
+    class MovePlan(object):
+        def __init__(self):
+            self.routes = {}
+            self.routeStates = {}
+            self.dayStart = {}
+            self.dayFinish = {}
+            self.dayCount = {}
+            self.deliverDays = {}
+            self.pickupDays = {}
+            self.cost = None
+            self.violations = 0
+
+    def __init__(self,solution):
+        self.Instance = solution.Instance
+        self.Instance.buildArrays()
+        numDays = self.Instance.Days
+        numTools = len(self.Instance.Tools)
+        numRequests = len(self.Instance.Requests)
+
+        self.routes = dict((day.dayNumber, [list(vehicle.Route) for vehicle in day.Vehicles]) for day in solution.Days)
+        for day, routes in self.routes.items():
+            # the day is in the horizon, the xml parser keeps days without vehicles
+            self.route(day,0,allowNew=True)
+            for vehicle in range(len(routes)):
+                if self._normalize(routes[vehicle]) != routes[vehicle] or routes[vehicle][0] != 0 or routes[vehicle][-1] != 0:
+                    raise ValueError('Route of vehicle %d of day %d is not a valid route.' % (vehicle+1,day))
+        self.routeStates = dict((day, [self.evaluateRoute(route) for route in routes]) for day, routes in self.routes.items())
+        self.dayStart = [[0] * numTools for d in range(numDays+1)]
+        self.dayFinish = [[0] * numTools for d in range(numDays+1)]
+        self.dayCount = [0] * (numDays+1)
+        self.deliverDays = [[] for r in range(numRequests+1)]
+        self.pickupDays = [[] for r in range(numRequests+1)]
+        for day, routes in self.routes.items():
+            self.dayCount[day] = len(routes)
+            for route, state in zip(routes,self.routeStates[day]):
+                self.dayStart[day] = list(map(add, self.dayStart[day], state.startDepot))
+                self.dayFinish[day] = list(map(add, self.dayFinish[day], state.finishDepot))
+                for visit in route:
+                    if visit > 0:
+                        self.deliverDays[visit].append(day)
+                    elif visit < 0:
+                        self.pickupDays[-visit].append(day)
+        self.status = [[0] * numTools]
+        self.peak = [[0] * numTools]
+        self.status, self.peak = self._toolBalance(1, {}, {})
+
+        self.cost = SolutionCVRPTWUI.SolutionCost()
+        self.cost.MaxNumberOfVehicles = max(self.dayCount)
+        self.cost.NumberOfVehicleDays = sum(self.dayCount)
+        self.cost.Distance = sum(state.distance for states in self.routeStates.values() for state in states)
+        self.cost.ToolCount = list(self.peak[-1])
+        self.cost.calculateCost(self.Instance)
+        self.violations = sum(not state.feasible for states in self.routeStates.values() for state in states)
+        self.violations += sum(not self._isRequestFeasible(r, self.deliverDays[r], self.pickupDays[r]) for r in range(1,numRequests+1))
+        self.violations += self._toolViolations(self.cost.ToolCount)
+
+    def route(self,day,vehicle,allowNew=False):
+        if not 0 < day <= self.Instance.Days:
+            raise ValueError('Day %d is not in the horizon of %d days.' % (day,self.Instance.Days))
+        routes = self.routes.get(day, [])
+        if allowNew and vehicle == len(routes):
+            return [0, 0]
+        if not 0 <= vehicle < len(routes):
+            raise ValueError('Day %d has no vehicle %d.' % (day,vehicle))
+        return routes[vehicle]
+
+    def checkPosition(self,route,position):
+        if not 0 < position < len(route) - 1:
+            raise ValueError('Position %d is not a visit of a route of length %d.' % (position,len(route)))
+
+    # Same computation as SolutionCVRPTWUI._calculateSolution for one vehicle, without reporting errors: the
+    # highest load of the route, the depot visits and what the route takes from and brings to the depot.
+    def evaluateRoute(self,route):
+        instance = self.Instance
+        numTools = len(instance.Tools)
+        toolSize = instance.toolWeight
+        requestNode = instance.requestNode
+        requestTool = instance.requestTool
+        requestToolCount = instance.requestToolCount
+        getDistance = instance.getDistance
+        depot = instance.DepotCoordinate
+
+        state = self.RouteState()
+        distance = 0
+        peakLoad = None
+        lastCoord = None
+        currentTools = [0] * numTools
+        bringTools = [0] * numTools
+        depotVisits = [[0] * numTools]
+        for visit in route:
+            if visit == 0:
+                if lastCoord is not None:
+                    depotVisit = depotVisits[-1] = list(map(add, bringTools, depotVisits[-1]))
+                    departure = sum(map(mul, toolSize, depotVisit))
+                    if peakLoad is None or maxLoad - departure > peakLoad:
+                        peakLoad = maxLoad - departure
+                    depotVisits.append(list(map(sub, currentTools, bringTools)))
+                    currentTools = [0] * numTools
+                    bringTools = [0] * numTools
+                load = maxLoad = 0
+                coord = depot
+            else:
+                request = abs(visit)
+                tool = requestTool[request-1]-1
+                count = requestToolCount[request-1] if visit < 0 else -requestToolCount[request-1]
+                currentTools[tool] += count
+                if currentTools[tool] < bringTools[tool]:
+                    bringTools[tool] = currentTools[tool]
+                load += toolSize[tool] * count
+                if load > maxLoad:
+                    maxLoad = load
+                coord = requestNode[request-1]
+            if lastCoord is not None:
+                distance += getDistance(lastCoord,coord)
+            lastCoord = coord
+
+        state.startDepot = [0] * numTools
+        state.finishDepot = [0] * numTools
+        for t in range(numTools):
+            visitTotal = totalUsedAtStart = 0
+            for depotVisit in depotVisits:
+                visitTotal += depotVisit[t]
+                if visitTotal < 0:
+                    totalUsedAtStart -= visitTotal
+                    visitTotal = 0
+            state.startDepot[t] = -totalUsedAtStart
+            state.finishDepot[t] = visitTotal
+        state.distance = distance
+        state.peakLoad = peakLoad
+        state.depotVisits = depotVisits
+        state.feasible = peakLoad <= instance.Capacity and distance <= instance.MaxDistance
+        return state
+
+    def _normalize(self,route):
+        numRequests = len(self.Instance.Requests)
+        for visit in route:
+            if abs(visit) > numRequests:
+                raise ValueError('Unknown request %d.' % abs(visit))
+        route = [visit for i, visit in enumerate(route) if visit != 0 or i == 0 or route[i-1] != 0]
+        return route if len(route) >= 3 else None
+
+    def _isRequestFeasible(self,request,deliverDays,pickupDays):
+        if len(deliverDays) != 1 or len(pickupDays) != 1:
+            return False
+        req = self.Instance.Requests[request-1]
+        return req.fromDay <= deliverDays[0] <= req.toDay and pickupDays[0] - deliverDays[0] == req.numDays
+
+    def _toolViolations(self,toolCount):
+        return sum(count > tool.amount for count, tool in zip(toolCount,self.Instance.Tools))
+
+    # The tools at the depot after each day and the highest use up to each day, as in the last part of
+    # _calculateSolution, for the days from firstDay on. Index 0 is the state before the first day.
+    def _toolBalance(self,firstDay,dayStart,dayFinish):
+        statuses = self.status[:firstDay]
+        peaks = self.peak[:firstDay]
+        status = statuses[-1]
+        peak = peaks[-1]
+        for day in range(firstDay,self.Instance.Days+1):
+            status = list(map(add, status, dayStart[day] if day in dayStart else self.dayStart[day]))
+            peak = [max(p, -s) for p, s in zip(peak, status)]
+            status = list(map(add, status, dayFinish[day] if day in dayFinish else self.dayFinish[day]))
+            statuses.append(status)
+            peaks.append(peak)
+        return statuses, peaks
+
+    def _plan(self,move):
+        plan = self.MovePlan()
+        cost = plan.cost = SolutionCVRPTWUI.SolutionCost()
+        cost.Distance = self.cost.Distance
+        violations = self.violations
+        oldVisits = []
+        newVisits = []
+        for (day, vehicle), route in move.changes(self).items():
+            route = plan.routes[(day,vehicle)] = self._normalize(route)
+            if day not in plan.dayStart:
+                plan.dayStart[day] = list(self.dayStart[day])
+                plan.dayFinish[day] = list(self.dayFinish[day])
+                plan.dayCount[day] = self.dayCount[day]
+            if vehicle < self.dayCount[day]:
+                state = self.routeStates[day][vehicle]
+                cost.Distance -= state.distance
+                violations -= not state.feasible
+                plan.dayStart[day] = list(map(sub, plan.dayStart[day], state.startDepot))
+                plan.dayFinish[day] = list(map(sub, plan.dayFinish[day], state.finishDepot))
+                plan.dayCount[day] -= 1
+                oldVisits.extend((visit,day) for visit in self.routes[day][vehicle] if visit != 0)
+            if route is not None:
+                state = plan.routeStates[(day,vehicle)] = self.evaluateRoute(route)
+                cost.Distance += state.distance
+                violations += not state.feasible
+                plan.dayStart[day] = list(map(add, plan.dayStart[day], state.startDepot))
+                plan.dayFinish[day] = list(map(add, plan.dayFinish[day], state.finishDepot))
+                plan.dayCount[day] += 1
+                newVisits.extend((visit,day) for visit in route if visit != 0)
+
+        for visit, day in oldVisits + newVisits:
+            days = plan.deliverDays if visit > 0 else plan.pickupDays
+            if abs(visit) not in days:
+                days[abs(visit)] = list((self.deliverDays if visit > 0 else self.pickupDays)[abs(visit)])
+        for visit, day in oldVisits:
+            (plan.deliverDays if visit > 0 else plan.pickupDays)[abs(visit)].remove(day)
+        for visit, day in newVisits:
+            (plan.deliverDays if visit > 0 else plan.pickupDays)[abs(visit)].append(day)
+        for request in set(abs(visit) for visit, day in oldVisits + newVisits):
+            violations -= not self._isRequestFeasible(request, self.deliverDays[request], self.pickupDays[request])
+            violations += not self._isRequestFeasible(request, plan.deliverDays.get(request, self.deliverDays[request]), plan.pickupDays.get(request, self.pickupDays[request]))
+
+        dayCount = list(self.dayCount)
+        for day, count in plan.dayCount.items():
+            dayCount[day] = count
+        cost.MaxNumberOfVehicles = max(dayCount)
+        cost.NumberOfVehicleDays = sum(dayCount)
+        plan.status, plan.peak = self._toolBalance(min(plan.dayStart), plan.dayStart, plan.dayFinish)
+        cost.ToolCount = list(plan.peak[-1])
+        cost.calculateCost(self.Instance)
+        violations += self._toolViolations(cost.ToolCount) - self._toolViolations(self.cost.ToolCount)
+        plan.violations = violations
+        return plan
+
+    # Returns the change of the solution cost by the move, as a SolutionCost with differences, and whether the
+    # solution is feasible after the move. The routes are not changed.
+    def evaluate(self,move):
+        plan = self._plan(move)
+        delta = SolutionCVRPTWUI.SolutionCost()
+        delta.MaxNumberOfVehicles = plan.cost.MaxNumberOfVehicles - self.cost.MaxNumberOfVehicles
+        delta.NumberOfVehicleDays = plan.cost.NumberOfVehicleDays - self.cost.NumberOfVehicleDays
+        delta.Distance = plan.cost.Distance - self.cost.Distance
+        delta.ToolCount = list(map(sub, plan.cost.ToolCount, self.cost.ToolCount))
+        delta.Cost = plan.cost.Cost - self.cost.Cost
+        return (delta, plan.violations == 0)
+
+    def apply(self,move):
+        plan = self._plan(move)
+        removed = []
+        for (day, vehicle), route in plan.routes.items():
+            routes = self.routes.setdefault(day, [])
+            states = self.routeStates.setdefault(day, [])
+            if vehicle == len(routes):
+                routes.append(route)
+                states.append(plan.routeStates.get((day,vehicle)))
+            else:
+                routes[vehicle] = route
+                states[vehicle] = plan.routeStates.get((day,vehicle))
+            if route is None:
+                removed.append((day,vehicle))
+        for day, vehicle in sorted(removed, reverse=True):
+            del self.routes[day][vehicle]
+            del self.routeStates[day][vehicle]
+        for day in plan.dayStart:
+            self.dayStart[day] = plan.dayStart[day]
+            self.dayFinish[day] = plan.dayFinish[day]
+            self.dayCount[day] = plan.dayCount[day]
+        for request, days in plan.deliverDays.items():
+            self.deliverDays[request] = days
+        for request, days in plan.pickupDays.items():
+            self.pickupDays[request] = days
+        self.status, self.peak = plan.status, plan.peak
+        self.cost = plan.cost
+        self.violations = plan.violations
+
+    def isFeasible(self):
+        return self.violations == 0
@@ -0,0 +1,271 @@
+
+import math, os, mmap, struct, hashlib, tempfile
+from array import array
+from collections import OrderedDict
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# storage of the calculated distances, see InstanceCVRPTWUI
+ENGINES = ['list', 'numpy', 'lazy', 'condensed']
+# rows of the matrix computed per broadcast, keeps the temporaries around 32MB
+BLOCK_ELEMENTS = 1 << 22
+# number of pairs kept by LazyDistance
+LAZY_CACHE_SIZE = 1 << 18
+
+# distance cache file: magic, version, ndim, dtype, shape, sha1 of the coordinates, padded to 64 bytes
+CACHE_MAGIC = b'CVRPDIST'
+CACHE_VERSION = 1
+CACHE_HEADER = struct.Struct('<8sHH4sQQ20s12x')
+CACHE_EXTENSION = '.dist'
+
+def hasNumpy():
+    return np is not None
+
+def compactIntType(maxValue):
+    for dtype in (np.int8, np.int16, np.int32):
+        if maxValue <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+def calculateDistanceArray(coordinates):
+    numLocs = len(coordinates)
+    X = np.fromiter((c.X for c in coordinates), dtype=np.int64, count=numLocs)
+    Y = np.fromiter((c.Y for c in coordinates), dtype=np.int64, count=numLocs)
+    if numLocs == 0:
+        return np.zeros((0,0), dtype=np.int8)
+
+    # the diagonal of the bounding box bounds every distance, so the type can be chosen up front
+    maxDist = int(np.floor(np.sqrt(float((X.max()-X.min())**2 + (Y.max()-Y.min())**2))))
+    res = np.empty((numLocs,numLocs), dtype=compactIntType(maxDist))
+    step = max(1, BLOCK_ELEMENTS // numLocs)
+    for start in range(0,numLocs,step):
+        end = min(numLocs,start+step)
+        dx = np.subtract.outer(X[start:end], X)
+        dx *= dx
+        dy = np.subtract.outer(Y[start:end], Y)
+        dy *= dy
+        dx += dy
+        # same as math.floor(math.sqrt(...)): int64 to float64 is exact for these magnitudes
+        res[start:end] = np.floor(np.sqrt(dx))
+    return res
+
+def _givenArray(given):
+    try:
+        return np.asarray(given, dtype=np.int64), None
+    except TypeError:
+        # links that were not in the xml file are None
+        given = np.array(given, dtype=object)
+        missing = np.equal(given, None)
+        given[missing] = -1
+        return given.astype(np.int64), missing
+
+# Compares the given distance matrix with the calculated one. Returns the differing cells in row-major order
+# as (i, j, given, calculated), with None for a missing given distance, at most limit of them (all when limit
+# is None), the number of differing cells and the number of pairs i < j where the given matrix is not symmetric.
+def compareDistanceMatrices(given,calculated,limit=1):
+    if np is None:
+        return _compareDistanceLists(given,calculated,limit)
+    try:
+        G, missing = _givenArray(given)
+    except OverflowError:
+        # distances outside of int64 are only possible in lists
+        return _compareDistanceLists(given,calculated,limit)
+    C = np.asarray(calculated)
+    differs = G != C
+    asymmetric = G != G.T
+    if missing is not None:
+        differs |= missing
+        asymmetric &= ~(missing | missing.T)
+    cells = np.flatnonzero(differs)
+    numLocs = C.shape[0]
+    differences = []
+    for cell in (cells if limit is None else cells[:limit]).tolist():
+        i, j = divmod(cell, numLocs)
+        differences.append((i, j, None if missing is not None and missing[i,j] else int(G[i,j]), int(C[i,j])))
+    return differences, len(cells), int(np.count_nonzero(np.triu(asymmetric, 1)))
+
+def _compareDistanceLists(given,calculated,limit):
+    if hasattr(calculated, 'tolist'):
+        calculated = calculated.tolist()
+    differences = []
+    numDifferences = asymmetric = 0
+    for i, (row, calcRow, column) in enumerate(zip(given, calculated, zip(*given))):
+        if row != calcRow:
+            for j in range(len(row)):
+                if row[j] != calcRow[j]:
+                    numDifferences += 1
+                    if limit is None or len(differences) < limit:
+                        differences.append((i, j, row[j], calcRow[j]))
+        if row != list(column):
+            asymmetric += sum(1 for j in range(i+1, len(row)) if row[j] != column[j] and row[j] is not None and column[j] is not None)
+    return differences, numDifferences, asymmetric
+
+# Position of the distance between i and j, i < j, in the upper triangle stored row by row: rowStart(i) + j
+def rowStart(i,numLocs):
+    return i*numLocs - i*(i+1)//2 - i - 1
+
+def compactTypecode(maxValue):
+    for typecode in ('h', 'i', 'q'):
+        if maxValue < 1 << (8*array(typecode).itemsize - 1):
+            return typecode
+    return 'q'
+
+# Symmetric distances with a zero diagonal, stored as the upper triangle without the diagonal,
+# in half of the memory of the full matrix. Indexing as matrix[i][j] builds the whole row, use get.
+class CondensedDistance(object):
+    def __init__(self,values,numLocs):
+        self.values = values
+        self.numLocs = numLocs
+        self.rowStarts = [rowStart(i,numLocs) for i in range(numLocs)]
+        
+    def get(self,i,j):
+        if i < j:
+            return self.values[self.rowStarts[i] + j]
+        if j < i:
+            return self.values[self.rowStarts[j] + i]
+        return 0
+    
+    # the distances from i to i+1, ..., numLocs-1
+    def upper(self,i):
+        start = self.rowStarts[i]
+        return self.values[start+i+1:start+self.numLocs].tolist()
+    
+    def row(self,i):
+        values, rowStarts = self.values, self.rowStarts
+        return [values[rowStarts[j] + i] for j in range(i)] + [0] + self.upper(i)
+    
+    # the full matrix as a list of rows
+    def matrix(self):
+        if np is None:
+            return [self.row(i) for i in range(self.numLocs)]
+        return self.fullArray().tolist()
+    
+    # the full matrix as an int64 numpy array
+    def fullArray(self):
+        res = np.zeros((self.numLocs,self.numLocs), dtype=np.int64)
+        upper = np.triu_indices(self.numLocs, 1)
+        res[upper] = np.frombuffer(self.values, dtype=self.values.typecode)
+        res.T[upper] = res[upper]
+        return res
+    
+    @property
+    def nbytes(self):
+        return len(self.values) * self.values.itemsize
+    
+    def __getitem__(self,i):
+        return self.row(i)
+    
+    def __iter__(self):
+        return (self.row(i) for i in range(self.numLocs))
+    
+    def __len__(self):
+        return self.numLocs
+
+def calculateCondensedDistances(coordinates):
+    numLocs = len(coordinates)
+    if numLocs == 0:
+        return CondensedDistance(array('h'), 0)
+    X = [c.X for c in coordinates]
+    Y = [c.Y for c in coordinates]
+    # the diagonal of the bounding box bounds every distance
+    typecode = compactTypecode(int(math.floor(math.sqrt(float((max(X)-min(X))**2 + (max(Y)-min(Y))**2)))))
+    if np is None:
+        values = array(typecode)
+        for i in range(numLocs):
+            xI, yI = X[i], Y[i]
+            values.extend(int(math.floor( math.sqrt( pow(xI-X[j],2) + pow(yI-Y[j],2) ) )) for j in range(i+1,numLocs))
+        return CondensedDistance(values, numLocs)
+    X = np.array(X, dtype=np.int64)
+    Y = np.array(Y, dtype=np.int64)
+    res = np.empty(numLocs*(numLocs-1)//2, dtype=np.dtype(typecode))
+    for i in range(numLocs-1):
+        dx = X[i+1:] - X[i]
+        dy = Y[i+1:] - Y[i]
+        start = rowStart(i,numLocs) + i + 1
+        res[start:start+numLocs-i-1] = np.floor(np.sqrt(dx*dx + dy*dy))
+    values = array(typecode)
+    values.frombytes(res.tobytes())
+    return CondensedDistance(values, numLocs)
+
+# The distances from i to i+1, ..., numLocs-1 of any distance matrix
+def upperRow(matrix,i):
+    if isinstance(matrix, CondensedDistance):
+        return matrix.upper(i)
+    return matrix[i][i+1:]
+
+def coordinateHash(coordinates):
+    values = array('q')
+    for c in coordinates:
+        values.extend((c.ID,c.X,c.Y))
+    return hashlib.sha1(values.tobytes()).digest()
+
+def loadDistanceCache(filename,digest):
+    try:
+        fd = open(filename, 'rb')
+    except (IOError,OSError):
+        return None
+    with fd:
+        header = fd.read(CACHE_HEADER.size)
+        if len(header) != CACHE_HEADER.size:
+            return None
+        magic, version, ndim, dtype, rows, cols, fileDigest = CACHE_HEADER.unpack(header)
+        if magic != CACHE_MAGIC or version != CACHE_VERSION or fileDigest != digest or ndim not in (1,2):
+            return None
+        dtype = np.dtype(dtype.decode('ascii').strip())
+        shape = (rows,cols) if ndim == 2 else (rows,)
+        count = rows*cols if ndim == 2 else rows
+        if os.fstat(fd.fileno()).st_size != CACHE_HEADER.size + count*dtype.itemsize:
+            return None
+        if count == 0:
+            return np.zeros(shape, dtype=dtype)
+        # the array keeps the map alive, closing the file does not unmap it
+        mm = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+    return np.frombuffer(mm, dtype=dtype, count=count, offset=CACHE_HEADER.size).reshape(shape)
+
+def writeDistanceCache(filename,digest,matrix):
+    rows = matrix.shape[0]
+    cols = matrix.shape[1] if matrix.ndim == 2 else 0
+    header = CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, matrix.ndim, matrix.dtype.str.encode('ascii').ljust(4), rows, cols, digest)
+    # write to a temporary file first, so a concurrent reader never sees a partial cache
+    fdnum, tmpname = tempfile.mkstemp(prefix=os.path.basename(filename), dir=os.path.dirname(os.path.abspath(filename)))
+    try:
+        with os.fdopen(fdnum, 'wb') as fd:
+            fd.write(header)
+            fd.write(np.ascontiguousarray(matrix).tobytes())
+        os.chmod(tmpname, 0o644)
+        os.replace(tmpname, filename)
+    except:
+        os.remove(tmpname)
+        raise
+
+class LazyDistance(object):
+    def __init__(self,coordinates,maxCacheSize=LAZY_CACHE_SIZE):
+        self.X = [c.X for c in coordinates]
+        self.Y = [c.Y for c in coordinates]
+        self.numLocs = len(coordinates)
+        self.maxCacheSize = maxCacheSize
+        self.cache = OrderedDict()
+        
+    def get(self,i,j):
+        # the distances are symmetric, so (i,j) and (j,i) share a cache entry
+        key = i*self.numLocs + j if i <= j else j*self.numLocs + i
+        cache = self.cache
+        dist = cache.get(key)
+        if dist is not None:
+            cache.move_to_end(key)
+            return dist
+        dist = int(math.floor( math.sqrt( pow(self.X[i]-self.X[j],2) + pow(self.Y[i]-self.Y[j],2) ) ))
+        cache[key] = dist
+        if len(cache) > self.maxCacheSize:
+            cache.popitem(last=False)
+        return dist
+        
+    # number of distances in the cache
+    @property
+    def cacheSize(self):
+        return len(self.cache)
+
+    def __len__(self):
+        return self.numLocs
@@ -0,0 +1,106 @@
+
+import argparse, math, random
+from InstanceCVRPTWUI import InstanceCVRPTWUI as InstanceCVRPTWUI
+from baselineCVRPTWUI import baselineSolution
+
+# Synthetic instances with their baseline solution, used as test data for the parsers and the validator.
+
+DISTRIBUTIONS = ['uniform', 'clustered']
+
+def _locations(rnd,numLocations,distribution,size,clusters):
+    if distribution == 'uniform':
+        return [(rnd.randint(0,size), rnd.randint(0,size)) for i in range(numLocations)]
+    centers = [(rnd.randint(0,size), rnd.randint(0,size)) for i in range(clusters)]
+    spread = size / (4.0 * math.sqrt(clusters))
+    locations = []
+    for i in range(numLocations):
+        x, y = rnd.choice(centers)
+        locations.append((min(size, max(0, int(rnd.gauss(x,spread)))), min(size, max(0, int(rnd.gauss(y,spread))))))
+    return locations
+
+# A random instance in the style of the competition instances, the same seed gives the same instance.
+# Coordinate 0 is the depot in the middle, the requests are spread over numLocations other coordinates.
+# Every request fits in a vehicle on its own and every location can be visited in a single trip. The
+# number of tools is what the baseline solution uses, which is returned with the instance.
+def generateInstance(numRequests,days=65,numTools=2,numLocations=None,distribution='uniform',seed=0,
+                     size=10000,clusters=10,capacity=45,maxWindow=3,maxNumDays=3,maxToolCount=3,distanceEngine='lazy'):
+    if days < maxWindow + maxNumDays + 1:
+        raise ValueError('At least %d days are needed for windows of %d days and rentals of %d days.' % (maxWindow + maxNumDays + 1, maxWindow, maxNumDays))
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError('Unknown distribution %s.' % distribution)
+    rnd = random.Random(seed)
+    if numLocations is None:
+        numLocations = numRequests
+
+    Instance = InstanceCVRPTWUI(distanceEngine=distanceEngine)
+    Instance.Dataset = 'Synthetic CVRPTWUI instances'
+    Instance.Name = '%s instance with %d requests over %d days (seed %d)' % (distribution, numRequests, days, seed)
+    Instance.Days = days
+    Instance.Capacity = capacity
+    Instance.DepotCoordinate = 0
+    Instance.VehicleCost = 200000
+    Instance.VehicleDayCost = 4000
+    Instance.DistanceCost = 1
+
+    Instance.Coordinates.append(Instance.Coordinate(0,size//2,size//2))
+    for x, y in _locations(rnd,numLocations,distribution,size,clusters):
+        Instance.Coordinates.append(Instance.Coordinate(len(Instance.Coordinates),x,y))
+    for i in range(numTools):
+        weight = rnd.randint(1,capacity // maxToolCount)
+        Instance.Tools.append(Instance.Tool(i+1,weight,numRequests * maxToolCount,rnd.choice([10, 20, 50]) * 1000000))
+    for i in range(numRequests):
+        numDays = rnd.randint(1,maxNumDays)
+        window = rnd.randint(0,maxWindow - 1)
+        fromDay = rnd.randint(1,days - numDays - window)
+        Instance.Requests.append(Instance.Request(i+1,rnd.randint(1,numLocations),fromDay,fromDay + window,numDays,rnd.randint(1,numTools),rnd.randint(1,maxToolCount)))
+
+    depot = Instance.Coordinates[0]
+    farthest = max(math.sqrt((c.X - depot.X)**2 + (c.Y - depot.Y)**2) for c in Instance.Coordinates)
+    Instance.MaxDistance = int(math.ceil(2 * farthest / 1000.0)) * 1000
+
+    Solution = baselineSolution(Instance)
+    for tool, count in zip(Instance.Tools, Solution.calcCost.ToolCount):
+        tool.amount = max(count, maxToolCount)
+    return Instance, Solution
+
+def _solutionFile(filename):
+    for extension in ('.txt', '.xml', '.bin'):
+        if filename.endswith(extension):
+            return filename[:-len(extension)] + '.sol' + extension
+    return filename + '.sol.txt'
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate a synthetic CVRPTWUI instance with a baseline solution.')
+    parser.add_argument('--requests', '-r', type=int, required=True,
+                        help='Number of requests')
+    parser.add_argument('--days', '-d', type=int, default=65,
+                        help='Number of days (default: 65)')
+    parser.add_argument('--tools', '-t', type=int, default=2,
+                        help='Number of tool types (default: 2)')
+    parser.add_argument('--locations', '-l', type=int,
+                        help='Number of request locations besides the depot (default: the number of requests)')
+    parser.add_argument('--distribution', choices=DISTRIBUTIONS, default='uniform',
+                        help='Spatial distribution of the locations (default: uniform)')
+    parser.add_argument('--clusters', type=int, default=10,
+                        help='Number of clusters of the clustered distribution (default: 10)')
+    parser.add_argument('--seed', '-s', type=int, default=0,
+                        help='Seed of the random generator (default: 0)')
+    parser.add_argument('--outputFile', '-o', metavar='NEW_INSTANCE_FILE', required=True,
+                        help='Write the instance to this file, the type follows from the extension (.txt, .xml or .bin)')
+    parser.add_argument('--solutionFile', '-x', metavar='NEW_SOLUTION_FILE',
+                        help='Write the baseline solution to this file (default: the instance file name with .sol before the extension)')
+    parser.add_argument('--writeMatrix', '-m', action='store_true',
+                        help='Write the matrix in the instance file')
+    args = parser.parse_args()
+    if args.requests < 1 or args.tools < 1 or (args.locations is not None and args.locations < 1) or args.clusters < 1:
+        parser.error('The number of requests, tools, locations and clusters must be positive')
+
+    try:
+        Instance, Solution = generateInstance(args.requests,args.days,args.tools,args.locations,args.distribution,args.seed,clusters=args.clusters)
+    except ValueError as e:
+        parser.error(str(e))
+    Instance.writeInstance(args.outputFile,args.writeMatrix)
+    if Solution.isValid():
+        Solution.writeSolution(args.solutionFile or _solutionFile(args.outputFile),False)
+    else:
+        print('The baseline solution is invalid:\n\t' + '\n\t'.join(Solution.errorReport))
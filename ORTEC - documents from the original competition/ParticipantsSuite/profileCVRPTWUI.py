@@ -0,0 +1,119 @@
+
+import json, sys, time, tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Phase instrumentation. The parsers and the validator mark their phases with phase(); every subscriber is
+# called with one event per finished phase: an OrderedDict with the phase name, the wall time in seconds,
+# the peak memory in bytes and the extra information given to phase(). Without subscribers a phase costs
+# next to nothing.
+# When tracemalloc is tracing the peak memory is the peak of the traced memory during the phase, under
+# 'tracedPeakMemory', which slows down the phases a lot. Otherwise it is the peak resident size of the process
+# so far, under 'processPeakMemory' (None when it is not available): it only rises, so a phase that does not
+# raise it shows the peak of an earlier phase.
+
+_subscribers = []
+_stack = []
+
+def subscribe(callback):
+    _subscribers.append(callback)
+
+def unsubscribe(callback):
+    _subscribers.remove(callback)
+
+def _memoryKey(traced):
+    return 'tracedPeakMemory' if traced else 'processPeakMemory'
+
+def _peakMemory():
+    if not tracemalloc.is_tracing():
+        if resource is None:
+            return None
+        # kilobytes on Linux, bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    peak = tracemalloc.get_traced_memory()[1]
+    # the peak is reset for every phase, so the enclosing phases keep their own maximum
+    for outer in _stack:
+        outer[1] = max(outer[1], peak)
+    return peak
+
+@contextmanager
+def phase(name,**info):
+    if not _subscribers:
+        yield
+        return
+    if tracemalloc.is_tracing():
+        _peakMemory()
+        tracemalloc.reset_peak()
+    current = [name, 0]
+    _stack.append(current)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        traced = tracemalloc.is_tracing()
+        peak = _peakMemory()
+        _stack.pop()
+        event = OrderedDict()
+        event['phase'] = name
+        event['seconds'] = seconds
+        event[_memoryKey(traced)] = None if peak is None else max(peak, current[1])
+        event.update(info)
+        for callback in list(_subscribers):
+            callback(event)
+
+# Runs every item of a loop as a phase, info gives the extra information of an item
+def phases(name,items,info=None):
+    if not _subscribers:
+        return items
+    return _phaseItems(name,items,info)
+
+def _phaseItems(name,items,info):
+    for item in items:
+        with phase(name,**(info(item) if info else {})):
+            yield item
+
+# Collects the events, for the --profile option of the command line tools
+class PhaseRecorder(object):
+    def __init__(self,traceMemory=False):
+        self.traceMemory = traceMemory
+        self.events = []
+        self.startedTracing = False
+
+    def start(self):
+        if self.traceMemory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.startedTracing = True
+        self.memoryKey = _memoryKey(tracemalloc.is_tracing())
+        subscribe(self.events.append)
+
+    def stop(self):
+        unsubscribe(self.events.append)
+        if self.startedTracing:
+            tracemalloc.stop()
+            self.startedTracing = False
+
+    # the events per phase name, in the order the phases were first seen
+    def summary(self):
+        phases = OrderedDict()
+        for event in self.events:
+            total = phases.setdefault(event['phase'], OrderedDict([('phase', event['phase']), ('count', 0), ('seconds', 0.0), (self.memoryKey, None)]))
+            total['count'] += 1
+            total['seconds'] += event['seconds']
+            if event.get(self.memoryKey) is not None:
+                total[self.memoryKey] = max(total[self.memoryKey] or 0, event[self.memoryKey])
+        return list(phases.values())
+
+    def report(self,format='table'):
+        if format == 'json':
+            return json.dumps({'phases': self.summary(), 'events': self.events})
+        label = 'Traced peak MB' if self.memoryKey == 'tracedPeakMemory' else 'Process peak MB'
+        lines = ['%-30s %6s %10s %15s' % ('Phase', 'Count', 'Seconds', label)]
+        for total in self.summary():
+            peak = '%15.1f' % (total[self.memoryKey] / float(1 << 20)) if total[self.memoryKey] is not None else '%15s' % '-'
+            lines.append('%-30s %6d %10.3f %s' % (total['phase'], total['count'], total['seconds'], peak))
+        return '\n'.join(lines)
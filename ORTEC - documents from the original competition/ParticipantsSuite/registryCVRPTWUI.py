@@ -0,0 +1,110 @@
+
+import os, sys, threading
+from collections import OrderedDict
+from InstanceCVRPTWUI import InstanceCVRPTWUI as InstanceCVRPTWUI
+
+# default memory budget of an InstanceRegistry in bytes
+REGISTRY_BUDGET = 1 << 30
+# size of an int object that is not shared, as used in the distance lists
+INT_SIZE = sys.getsizeof(1 << 20)
+
+def _matrixSize(matrix):
+    if matrix is None:
+        return 0
+    if hasattr(matrix, 'nbytes'):
+        return matrix.nbytes
+    # a list of rows: the row lists plus one int object per distance
+    return sys.getsizeof(matrix) + sum(sys.getsizeof(row) + INT_SIZE*len(row) for row in matrix)
+
+def _recordsSize(records):
+    if not records:
+        return 0
+    return sys.getsizeof(records) + len(records) * (sys.getsizeof(records[0]) + INT_SIZE*len(records[0].__slots__))
+
+# Estimate of the memory held by an instance, dominated by the distance matrices for the large instances.
+# Without a matrix (the lazy engine) most of it is in the structures that the registry builds.
+def instanceSize(Instance):
+    size = _matrixSize(Instance.ReadDistance) + _matrixSize(Instance.calcDistance)
+    size += _recordsSize(Instance.Tools) + _recordsSize(Instance.Requests) + _recordsSize(Instance.Coordinates)
+    if Instance.requestNode is not None:
+        size += 8 * (4*len(Instance.Requests) + len(Instance.Tools) + 2*len(Instance.Coordinates))
+    if Instance.lazyDistance is not None:
+        size += Instance.lazyDistance.maxCacheSize * (INT_SIZE + 100)
+    if Instance.spatialIndex is not None:
+        size += Instance.spatialIndex.nbytes
+    if Instance.calendar is not None:
+        size += Instance.calendar.nbytes
+    return size
+
+# Keeps parsed instances in memory, so loading the same file again returns the same object.
+# An entry is keyed by the absolute path, the modification time and the size of the file, so a
+# changed file is read again. The least recently used instances are dropped when the estimated
+# memory use exceeds maxBytes; the last loaded instance is always kept.
+# The instances are shared: treat them as read-only.
+class InstanceRegistry(object):
+    def __init__(self,maxBytes=REGISTRY_BUDGET,distanceEngine='list',distanceCache=False):
+        self.maxBytes = maxBytes
+        self.distanceEngine = distanceEngine
+        self.distanceCache = distanceCache
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.memoryUsage = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def _fileKey(path,filetype):
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        return (path, st.st_mtime_ns, st.st_size, filetype)
+
+    # Returns the instance for the file with its distances calculated. Invalid instances, or
+    # files that cannot be read, are returned as parsed but not kept, check isValid().
+    def get(self,path,filetype=None):
+        try:
+            key = self._fileKey(path,filetype)
+        except OSError:
+            return InstanceCVRPTWUI(path,filetype,distanceEngine=self.distanceEngine,distanceCache=self.distanceCache)
+        with self.lock:
+            Instance = self.entries.get(key)
+            if Instance is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return Instance
+            self.misses += 1
+            # parsing holds the lock, so concurrent requests for the same file read it only once
+            Instance = InstanceCVRPTWUI(key[0],filetype,distanceEngine=self.distanceEngine,distanceCache=self.distanceCache)
+            if not Instance.isValid():
+                return Instance
+            if Instance.distanceEngine != 'lazy':
+                Instance.calculateDistances()
+            Instance.buildArrays()
+            Instance.buildSpatialIndex()
+            Instance.buildCalendar()
+            # an older version of the same file is not used anymore
+            for oldKey in [k for k in self.entries if k[0] == key[0] and k[3] == filetype]:
+                self._remove(oldKey)
+            self.entries[key] = Instance
+            self.sizes[key] = instanceSize(Instance)
+            self.memoryUsage += self.sizes[key]
+            while self.memoryUsage > self.maxBytes and len(self.entries) > 1:
+                self._remove(next(iter(self.entries)))
+            return Instance
+
+    def _remove(self,key):
+        del self.entries[key]
+        self.memoryUsage -= self.sizes.pop(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.sizes.clear()
+            self.memoryUsage = 0
+
+    def __contains__(self,path):
+        path = os.path.abspath(path)
+        return any(key[0] == path for key in self.entries)
+
+    def __len__(self):
+        return len(self.entries)
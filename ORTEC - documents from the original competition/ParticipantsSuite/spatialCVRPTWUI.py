@@ -0,0 +1,127 @@
+
+import math, sys
+from array import array
+
+# average number of coordinates per grid cell when the cell size is not given
+POINTS_PER_CELL = 2
+
+# The floored euclidean distance of InstanceCVRPTWUI.calculateDistances
+def floorDistance(x1,y1,x2,y2):
+    return int(math.floor( math.sqrt( pow(x1-x2,2) + pow(y1-y2,2) ) ))
+
+# Grid buckets over (a subset of) the coordinates for nearest neighbour and radius queries, without a
+# distance matrix. The results agree with the distances of calculateDistances and are ordered on the
+# distance, then on the coordinate id. A query only looks at the cells around the point, so on evenly
+# spread coordinates it takes time in the number of results instead of the number of coordinates.
+class GridIndex(object):
+    def __init__(self,coordinates,ids=None,cellSize=None):
+        self.X = [c.X for c in coordinates]
+        self.Y = [c.Y for c in coordinates]
+        self.ids = list(range(len(coordinates)) if ids is None else ids)
+        if cellSize is None:
+            cellSize = self._defaultCellSize()
+        self.cellSize = cellSize
+        self.cells = {}
+        for i in self.ids:
+            self.cells.setdefault((self.X[i] // cellSize, self.Y[i] // cellSize), []).append(i)
+        cellX = [cell[0] for cell in self.cells] or [0]
+        cellY = [cell[1] for cell in self.cells] or [0]
+        self.minCell = (min(cellX), min(cellY))
+        self.maxCell = (max(cellX), max(cellY))
+
+    def _defaultCellSize(self):
+        if not self.ids:
+            return 1
+        X = [self.X[i] for i in self.ids]
+        Y = [self.Y[i] for i in self.ids]
+        area = max(1, max(X) - min(X)) * max(1, max(Y) - min(Y))
+        return max(1, int(math.sqrt(area * POINTS_PER_CELL / float(len(self.ids)))))
+
+    # Estimate of the memory held by the index, the coordinate values are shared with the instance
+    @property
+    def nbytes(self):
+        size = sys.getsizeof(self.X) + sys.getsizeof(self.Y) + sys.getsizeof(self.ids) + sys.getsizeof(self.cells)
+        for cell, ids in self.cells.items():
+            size += sys.getsizeof(cell) + sys.getsizeof(cell[0]) + sys.getsizeof(cell[1]) + sys.getsizeof(ids)
+        return size
+
+    # the cells at Chebyshev distance ring of cell (cx,cy)
+    @staticmethod
+    def _ring(cx,cy,ring):
+        if ring == 0:
+            yield (cx, cy)
+            return
+        for x in range(cx-ring,cx+ring+1):
+            yield (x, cy-ring)
+            yield (x, cy+ring)
+        for y in range(cy-ring+1,cy+ring):
+            yield (cx-ring, y)
+            yield (cx+ring, y)
+
+    def nearestToPoint(self,x,y,k,skip=None):
+        X, Y, cells, cellSize = self.X, self.Y, self.cells, self.cellSize
+        cx, cy = x // cellSize, y // cellSize
+        lastRing = max(cx - self.minCell[0], self.maxCell[0] - cx, cy - self.minCell[1], self.maxCell[1] - cy)
+        found = []
+        for ring in range(lastRing+1):
+            for cell in self._ring(cx,cy,ring):
+                for i in cells.get(cell, ()):
+                    if i != skip:
+                        found.append((floorDistance(X[i],Y[i],x,y), i))
+            if len(found) >= k:
+                found.sort()
+                del found[k:]
+                # the coordinates outside the rings so far are more than ring cells away
+                if not found or found[-1][0] < ring * cellSize:
+                    break
+        found.sort()
+        return [i for dist, i in found[:k]]
+
+    # the k closest indexed coordinates to coordinate i, without i itself
+    def nearest(self,i,k):
+        return self.nearestToPoint(self.X[i],self.Y[i],k,i)
+
+    def withinRadiusOfPoint(self,x,y,radius,skip=None):
+        X, Y, cells, cellSize = self.X, self.Y, self.cells, self.cellSize
+        # a floored distance of at most radius means at most radius per axis for integer coordinates
+        found = []
+        for cx in range((x - radius) // cellSize, (x + radius) // cellSize + 1):
+            for cy in range((y - radius) // cellSize, (y + radius) // cellSize + 1):
+                for i in cells.get((cx, cy), ()):
+                    if i != skip:
+                        dist = floorDistance(X[i],Y[i],x,y)
+                        if dist <= radius:
+                            found.append((dist, i))
+        found.sort()
+        return [i for dist, i in found]
+
+    # the indexed coordinates at distance radius or less of coordinate i, without i itself
+    def withinRadius(self,i,radius):
+        return self.withinRadiusOfPoint(self.X[i],self.Y[i],radius,i)
+
+    # The k nearest indexed coordinates of every coordinate as one array, see CandidateLists
+    def candidateLists(self,k):
+        k = max(0, min(k, len(self.ids) - 1))
+        values = array('i')
+        for i in range(len(self.X)):
+            values.extend(self.nearest(i,k))
+        return CandidateLists(values,k)
+
+# Fixed length candidate lists of all coordinates in one flat array, row i holds the candidates of coordinate i
+class CandidateLists(object):
+    def __init__(self,values,k):
+        self.values = values
+        self.k = k
+
+    def row(self,i):
+        return self.values[i*self.k:(i+1)*self.k].tolist()
+
+    @property
+    def nbytes(self):
+        return len(self.values) * self.values.itemsize
+
+    def __getitem__(self,i):
+        return self.row(i)
+
+    def __len__(self):
+        return len(self.values) // self.k if self.k else 0